@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 """
 PostgreSQL Database Initialization Script
-Creates tables for User, Game, and UserGameBridge
+Creates tables for User, Game, and UserGameBridge, and the monthly-partitioned
+match tables (run with --maintain to roll partitions forward / retire old ones)
 """
 
 import psycopg2
 from psycopg2 import sql
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -98,47 +100,433 @@ def create_tables():
     """)
     print("MatchTemplate table created/verified")
 
-     # Create Match table
+    create_match_tables(cursor)
+
+    # Idempotency keys for bulk ingest (DB_API /ingest/matches). No foreign
+    # key to Match: keys are claimed before the match rows are copied in.
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Match (
-            MatchID SERIAL PRIMARY KEY,
-            TemplateID INTEGER NOT NULL,
-            MatchDateTime TIMESTAMP NOT NULL,
-            WinningTeam INTEGER,
-            FOREIGN KEY (TemplateID) REFERENCES MatchTemplate(TemplateID) ON DELETE CASCADE
+        CREATE TABLE IF NOT EXISTS IngestKey (
+            Key VARCHAR(128) PRIMARY KEY,
+            MatchID INTEGER NOT NULL,
+            CreatedAt TIMESTAMP NOT NULL DEFAULT now()
         )
     """)
-    print("Match table created/verified")
+    print("IngestKey table created/verified")
 
+    # Steam friend graph (match_service friend index and crawler): one row
+    # per entry of a crawled player's friend list, and the crawl schedule
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS UserMatchBridge (
-            UserID INTEGER NOT NULL,
-            MatchID INTEGER NOT NULL,
-            Team INTEGER NOT NULL,
-            KDA DECIMAL(5,2),
-            ADR DECIMAL(6,2),
-            Rating DECIMAL(4,2),
-            PRIMARY KEY (UserID, MatchID),
-            FOREIGN KEY (UserID) REFERENCES "User"(UserID) ON DELETE CASCADE,
-            FOREIGN KEY (MatchID) REFERENCES Match(MatchID) ON DELETE CASCADE
+        CREATE TABLE IF NOT EXISTS FriendEdge (
+            Src VARCHAR(20) NOT NULL,
+            Dst VARCHAR(20) NOT NULL,
+            PRIMARY KEY (Src, Dst)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS FriendCrawl (
+            SteamID VARCHAR(20) PRIMARY KEY,
+            Priority SMALLINT NOT NULL,
+            CrawledAt DOUBLE PRECISION,
+            Status TEXT,
+            Failures SMALLINT NOT NULL DEFAULT 0
         )
     """)
-    print("UserMatchBridge table created/verified")
+    cursor.execute("ALTER TABLE FriendCrawl ADD COLUMN IF NOT EXISTS Failures SMALLINT NOT NULL DEFAULT 0")
+    # Never-crawled players first, then stale ones; each by priority and age
+    cursor.execute("DROP INDEX IF EXISTS idx_friendcrawl_due")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_friendcrawl_next
+        ON FriendCrawl((CrawledAt IS NOT NULL), Priority, CrawledAt)""")
+    print("FriendEdge and FriendCrawl tables created/verified")
+
+    create_user_match_stats(cursor)
     
     # Create indexes for better performance
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_username ON \"User\"(UserName)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_gamename ON Game(GameName)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_usergamebridge_userid ON UserGameBridge(UserID)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_usergamebridge_gameid ON UserGameBridge(GameID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_templateid ON Match(TemplateID)")
+    # Match tables: BRIN on time (tiny, and partitions are filled in time
+    # order), plus the lookup paths of the stats triggers and match pages.
+    # The UserMatchBridge primary key (UserID, MatchID, MatchDateTime)
+    # already serves per-user history by (UserID, MatchID).
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_datetime_brin ON Match USING BRIN (MatchDateTime)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usermatchbridge_datetime_brin ON UserMatchBridge USING BRIN (MatchDateTime)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_usermatchbridge_matchid_team ON UserMatchBridge(MatchID, Team)")
     print("Indexes created/verified")
+
+    maintain_partitions(cursor)
     
     cursor.close()
     conn.close()
 
 
+def create_match_tables(cursor):
+    """
+    Match and UserMatchBridge, range-partitioned by month on MatchDateTime.
+    UserMatchBridge carries its match's MatchDateTime so both tables share
+    partition bounds; recent-history queries only touch recent partitions.
+    An existing unpartitioned pair of tables is migrated in place.
+    """
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('match')")
+    row = cursor.fetchone()
+    legacy = row is not None and row[0] == 'r'
+
+    cursor.execute("BEGIN")
+    try:
+        if legacy:
+            cursor.execute("ALTER TABLE UserMatchBridge RENAME TO usermatchbridge_unpartitioned")
+            cursor.execute("ALTER TABLE Match RENAME TO match_unpartitioned")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Match (
+                MatchID SERIAL,
+                TemplateID INTEGER NOT NULL,
+                MatchDateTime TIMESTAMP NOT NULL,
+                WinningTeam INTEGER,
+                PRIMARY KEY (MatchID, MatchDateTime),
+                FOREIGN KEY (TemplateID) REFERENCES MatchTemplate(TemplateID) ON DELETE CASCADE
+            ) PARTITION BY RANGE (MatchDateTime)
+        """)
+        print("Match table created/verified")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS UserMatchBridge (
+                UserID INTEGER NOT NULL,
+                MatchID INTEGER NOT NULL,
+                MatchDateTime TIMESTAMP NOT NULL,
+                Team INTEGER NOT NULL,
+                KDA DECIMAL(5,2),
+                ADR DECIMAL(6,2),
+                Rating DECIMAL(4,2),
+                PRIMARY KEY (UserID, MatchID, MatchDateTime),
+                FOREIGN KEY (UserID) REFERENCES "User"(UserID) ON DELETE CASCADE,
+                FOREIGN KEY (MatchID, MatchDateTime) REFERENCES Match(MatchID, MatchDateTime) ON DELETE CASCADE
+            ) PARTITION BY RANGE (MatchDateTime)
+        """)
+        print("UserMatchBridge table created/verified")
+
+        # Rows outside every monthly partition (a month not created yet, or
+        # retired by maintain_partitions) land here instead of failing
+        cursor.execute("CREATE TABLE IF NOT EXISTS match_default PARTITION OF Match DEFAULT")
+        cursor.execute("CREATE TABLE IF NOT EXISTS usermatchbridge_default PARTITION OF UserMatchBridge DEFAULT")
+        # Bumped whenever maintain_partitions retires a month, so writers that
+        # cache which partitions exist (DB_API ingest) know to look again
+        cursor.execute("CREATE SEQUENCE IF NOT EXISTS match_partition_epoch")
+
+        # Creates the month's partition of both tables; callable by writers
+        # (DB_API ingest) before loading matches for a month not seen yet.
+        # Rows of that month already in the DEFAULT partitions are moved into
+        # the new ones (a partition cannot be created while DEFAULT holds rows
+        # of its range); UserMatchStats is left unchanged by the move.
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION ensure_match_partition(p_month DATE) RETURNS void AS $$
+            DECLARE
+                lo DATE := date_trunc('month', p_month)::date;
+                hi DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::date;
+                suffix TEXT := to_char(date_trunc('month', p_month), 'YYYY_MM');
+                fk TEXT;
+            BEGIN
+                IF to_regclass('match_p' || suffix) IS NOT NULL THEN
+                    RETURN;
+                END IF;
+                PERFORM pg_advisory_xact_lock(hashtext('match_partitions'));
+                IF to_regclass('match_p' || suffix) IS NOT NULL THEN
+                    RETURN;
+                END IF;
+                IF NOT EXISTS (SELECT 1 FROM match_default WHERE MatchDateTime >= lo AND MatchDateTime < hi) THEN
+                    EXECUTE format('CREATE TABLE %I PARTITION OF Match FOR VALUES FROM (%L) TO (%L)',
+                                   'match_p' || suffix, lo, hi);
+                    EXECUTE format('CREATE TABLE %I PARTITION OF UserMatchBridge FOR VALUES FROM (%L) TO (%L)',
+                                   'usermatchbridge_p' || suffix, lo, hi);
+                    RETURN;
+                END IF;
+
+                -- Take the DEFAULT partitions out (bridge first, and without its
+                -- FK, as in maintain_partitions) with their triggers off
+                ALTER TABLE UserMatchBridge DETACH PARTITION usermatchbridge_default;
+                FOR fk IN SELECT conname FROM pg_constraint
+                          WHERE conrelid = 'usermatchbridge_default'::regclass AND contype = 'f' LOOP
+                    EXECUTE format('ALTER TABLE usermatchbridge_default DROP CONSTRAINT %I', fk);
+                END LOOP;
+                ALTER TABLE Match DETACH PARTITION match_default;
+                ALTER TABLE match_default DISABLE TRIGGER USER;
+                ALTER TABLE usermatchbridge_default DISABLE TRIGGER USER;
+
+                EXECUTE format('CREATE TABLE %I PARTITION OF Match FOR VALUES FROM (%L) TO (%L)',
+                               'match_p' || suffix, lo, hi);
+                EXECUTE format('CREATE TABLE %I PARTITION OF UserMatchBridge FOR VALUES FROM (%L) TO (%L)',
+                               'usermatchbridge_p' || suffix, lo, hi);
+                -- The moved bridge rows are counted again when they are
+                -- re-inserted: take their contribution out first
+                PERFORM usermatchstats_apply(b.UserID, b.Team, m.WinningTeam, b.KDA, b.ADR, b.Rating, -1)
+                FROM usermatchbridge_default b
+                JOIN match_default m ON m.MatchID = b.MatchID AND m.MatchDateTime = b.MatchDateTime
+                WHERE b.MatchDateTime >= lo AND b.MatchDateTime < hi;
+                INSERT INTO Match (MatchID, TemplateID, MatchDateTime, WinningTeam)
+                SELECT MatchID, TemplateID, MatchDateTime, WinningTeam FROM match_default
+                WHERE MatchDateTime >= lo AND MatchDateTime < hi;
+                INSERT INTO UserMatchBridge (UserID, MatchID, MatchDateTime, Team, KDA, ADR, Rating)
+                SELECT UserID, MatchID, MatchDateTime, Team, KDA, ADR, Rating FROM usermatchbridge_default
+                WHERE MatchDateTime >= lo AND MatchDateTime < hi;
+                DELETE FROM usermatchbridge_default WHERE MatchDateTime >= lo AND MatchDateTime < hi;
+                DELETE FROM match_default WHERE MatchDateTime >= lo AND MatchDateTime < hi;
+
+                ALTER TABLE match_default ENABLE TRIGGER USER;
+                ALTER TABLE usermatchbridge_default ENABLE TRIGGER USER;
+                ALTER TABLE Match ATTACH PARTITION match_default DEFAULT;
+                ALTER TABLE UserMatchBridge ATTACH PARTITION usermatchbridge_default DEFAULT;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+
+        if legacy:
+            cursor.execute("""
+                SELECT ensure_match_partition(m::date)
+                FROM generate_series((SELECT date_trunc('month', MIN(MatchDateTime)) FROM match_unpartitioned),
+                                     (SELECT MAX(MatchDateTime) FROM match_unpartitioned),
+                                     INTERVAL '1 month') AS m
+            """)
+            # The stats triggers are not on the new tables yet, so copying
+            # rows over leaves UserMatchStats as it is
+            cursor.execute("""
+                INSERT INTO Match (MatchID, TemplateID, MatchDateTime, WinningTeam)
+                SELECT MatchID, TemplateID, MatchDateTime, WinningTeam FROM match_unpartitioned
+            """)
+            cursor.execute("""
+                INSERT INTO UserMatchBridge (UserID, MatchID, MatchDateTime, Team, KDA, ADR, Rating)
+                SELECT b.UserID, b.MatchID, m.MatchDateTime, b.Team, b.KDA, b.ADR, b.Rating
+                FROM usermatchbridge_unpartitioned b JOIN match_unpartitioned m ON m.MatchID = b.MatchID
+            """)
+            cursor.execute("""
+                SELECT setval(pg_get_serial_sequence('match', 'matchid'),
+                              GREATEST((SELECT MAX(MatchID) FROM match_unpartitioned), 1))
+            """)
+            cursor.execute("DROP TABLE usermatchbridge_unpartitioned")
+            cursor.execute("DROP TABLE match_unpartitioned")
+            print("Match and UserMatchBridge migrated to monthly partitions")
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+
+def maintain_partitions(cursor, months_ahead=None, retain_months=None, archive=None):
+    """
+    Create partitions for the current and next months_ahead months, and
+    detach partitions older than retain_months (0 keeps everything).
+    Detached partitions are moved to the "archive" schema, or dropped when
+    archive is false, and match_partition_epoch is bumped so DB_API forgets
+    that they existed. UserMatchStats keeps counting archived matches; the
+    DEFAULT partitions are never retired.
+    Run this periodically (python init_db.py --maintain).
+    """
+    if months_ahead is None:
+        months_ahead = int(os.getenv('MATCH_PARTITIONS_AHEAD', '3'))
+    if retain_months is None:
+        retain_months = int(os.getenv('MATCH_RETENTION_MONTHS', '0'))
+    if archive is None:
+        archive = os.getenv('MATCH_RETENTION_MODE', 'archive') != 'drop'
+
+    cursor.execute("""
+        SELECT ensure_match_partition((date_trunc('month', now()) + make_interval(months => m))::date)
+        FROM generate_series(0, %s) AS m
+    """, (months_ahead,))
+    print(f"Match partitions verified through {months_ahead} month(s) ahead")
+    if retain_months <= 0:
+        return
+
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'match'::regclass AND c.relname LIKE 'match\\_p%%'
+          AND c.relname < 'match_p' || to_char(date_trunc('month', now()) - make_interval(months => %s), 'YYYY_MM')
+        ORDER BY c.relname
+    """, (retain_months,))
+    for (partition,) in cursor.fetchall():
+        suffix = partition[len('match_p'):]
+        bridge = f"usermatchbridge_p{suffix}"
+        cursor.execute("BEGIN")
+        try:
+            # Bridge rows first: the match partition can only leave once
+            # nothing in UserMatchBridge references it
+            cursor.execute(sql.SQL("ALTER TABLE UserMatchBridge DETACH PARTITION {}").format(sql.Identifier(bridge)))
+            cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+                           (bridge,))
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                    sql.Identifier(bridge), sql.Identifier(constraint)))
+            cursor.execute(sql.SQL("ALTER TABLE Match DETACH PARTITION {}").format(sql.Identifier(partition)))
+            for table in (bridge, partition):
+                if archive:
+                    cursor.execute("CREATE SCHEMA IF NOT EXISTS archive")
+                    cursor.execute(sql.SQL("ALTER TABLE {} SET SCHEMA archive").format(sql.Identifier(table)))
+                else:
+                    cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(table)))
+            cursor.execute("SELECT nextval('match_partition_epoch')")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        print(f"Partition {suffix} {'archived' if archive else 'dropped'}")
+
+
+def create_user_match_stats(cursor):
+    """Create the per-user match rollup and the triggers that keep it current"""
+    cursor.execute("SELECT to_regclass('usermatchstats')")
+    fresh = cursor.fetchone()[0] is None
+
+    # One row per user, updated on every UserMatchBridge insert/delete and
+    # whenever a match result changes, so per-user aggregates are a PK lookup.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS UserMatchStats (
+            UserID INTEGER PRIMARY KEY,
+            Matches INTEGER NOT NULL DEFAULT 0,
+            Wins INTEGER NOT NULL DEFAULT 0,
+            Losses INTEGER NOT NULL DEFAULT 0,
+            SumKDA DECIMAL(12,2) NOT NULL DEFAULT 0,
+            SumADR DECIMAL(14,2) NOT NULL DEFAULT 0,
+            SumRating DECIMAL(12,2) NOT NULL DEFAULT 0,
+            FOREIGN KEY (UserID) REFERENCES "User"(UserID) ON DELETE CASCADE
+        )
+    """)
+
+    # Add (sign = 1) or remove (sign = -1) one bridge row's contribution.
+    # A NULL WinningTeam (undecided match) counts as neither win nor loss.
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION usermatchstats_apply(
+            p_user INTEGER, p_team INTEGER, p_winner INTEGER,
+            p_kda DECIMAL, p_adr DECIMAL, p_rating DECIMAL, p_sign INTEGER
+        ) RETURNS void AS $$
+        BEGIN
+            IF p_sign < 0 THEN
+                -- Removals only adjust an existing row: inserting here could
+                -- create a negative row or, mid cascade-delete of the user,
+                -- violate the FK to "User"
+                UPDATE UserMatchStats SET
+                    Matches = Matches - 1,
+                    Wins = Wins - CASE WHEN p_winner = p_team THEN 1 ELSE 0 END,
+                    Losses = Losses - CASE WHEN p_winner <> p_team THEN 1 ELSE 0 END,
+                    SumKDA = SumKDA - COALESCE(p_kda, 0),
+                    SumADR = SumADR - COALESCE(p_adr, 0),
+                    SumRating = SumRating - COALESCE(p_rating, 0)
+                WHERE UserID = p_user;
+                RETURN;
+            END IF;
+            INSERT INTO UserMatchStats AS s (UserID, Matches, Wins, Losses, SumKDA, SumADR, SumRating)
+            VALUES (
+                p_user, p_sign,
+                CASE WHEN p_winner = p_team THEN p_sign ELSE 0 END,
+                CASE WHEN p_winner <> p_team THEN p_sign ELSE 0 END,
+                p_sign * COALESCE(p_kda, 0), p_sign * COALESCE(p_adr, 0), p_sign * COALESCE(p_rating, 0)
+            )
+            ON CONFLICT (UserID) DO UPDATE SET
+                Matches = s.Matches + EXCLUDED.Matches,
+                Wins = s.Wins + EXCLUDED.Wins,
+                Losses = s.Losses + EXCLUDED.Losses,
+                SumKDA = s.SumKDA + EXCLUDED.SumKDA,
+                SumADR = s.SumADR + EXCLUDED.SumADR,
+                SumRating = s.SumRating + EXCLUDED.SumRating;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION usermatchbridge_stats_trigger() RETURNS trigger AS $$
+        DECLARE
+            winner INTEGER;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT WinningTeam INTO winner FROM Match
+                WHERE MatchID = NEW.MatchID AND MatchDateTime = NEW.MatchDateTime;
+                PERFORM usermatchstats_apply(NEW.UserID, NEW.Team, winner, NEW.KDA, NEW.ADR, NEW.Rating, 1);
+            ELSE
+                -- When the match itself is being deleted, match_stats_trigger
+                -- has already removed this row's contribution.
+                SELECT WinningTeam INTO winner FROM Match
+                WHERE MatchID = OLD.MatchID AND MatchDateTime = OLD.MatchDateTime;
+                IF FOUND THEN
+                    PERFORM usermatchstats_apply(OLD.UserID, OLD.Team, winner, OLD.KDA, OLD.ADR, OLD.Rating, -1);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION match_stats_trigger() RETURNS trigger AS $$
+        DECLARE
+            b RECORD;
+        BEGIN
+            FOR b IN SELECT * FROM UserMatchBridge
+                     WHERE MatchID = OLD.MatchID AND MatchDateTime = OLD.MatchDateTime LOOP
+                PERFORM usermatchstats_apply(b.UserID, b.Team, OLD.WinningTeam, b.KDA, b.ADR, b.Rating, -1);
+                IF TG_OP = 'UPDATE' THEN
+                    PERFORM usermatchstats_apply(b.UserID, b.Team, NEW.WinningTeam, b.KDA, b.ADR, b.Rating, 1);
+                END IF;
+            END LOOP;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    cursor.execute("DROP TRIGGER IF EXISTS usermatchbridge_stats ON UserMatchBridge")
+    cursor.execute("""
+        CREATE TRIGGER usermatchbridge_stats
+        AFTER INSERT OR DELETE ON UserMatchBridge
+        FOR EACH ROW EXECUTE FUNCTION usermatchbridge_stats_trigger()
+    """)
+    cursor.execute("DROP TRIGGER IF EXISTS match_stats ON Match")
+    cursor.execute("""
+        CREATE TRIGGER match_stats
+        BEFORE DELETE OR UPDATE OF WinningTeam ON Match
+        FOR EACH ROW EXECUTE FUNCTION match_stats_trigger()
+    """)
+
+    if fresh:
+        # Existing data: backfill once, the triggers keep it current afterwards
+        cursor.execute("""
+            INSERT INTO UserMatchStats (UserID, Matches, Wins, Losses, SumKDA, SumADR, SumRating)
+            SELECT b.UserID,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE m.WinningTeam = b.Team),
+                   COUNT(*) FILTER (WHERE m.WinningTeam <> b.Team),
+                   COALESCE(SUM(b.KDA), 0), COALESCE(SUM(b.ADR), 0), COALESCE(SUM(b.Rating), 0)
+            FROM UserMatchBridge b
+            JOIN Match m ON m.MatchID = b.MatchID AND m.MatchDateTime = b.MatchDateTime
+            GROUP BY b.UserID
+        """)
+    print("UserMatchStats rollup and triggers created/verified")
+
+
+def run_maintenance():
+    """Partition upkeep only, for a periodic job"""
+    conn = psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432'),
+        user=os.getenv('POSTGRES_USER', 'postgres'),
+        password=os.getenv('POSTGRES_PASSWORD', ''),
+        database=os.getenv('DB_NAME', 'nsarg')
+    )
+    conn.autocommit = True
+    cursor = conn.cursor()
+    maintain_partitions(cursor)
+    cursor.close()
+    conn.close()
+
+
 def main():
     """Main function to initialize the database"""
     try:
+        if '--maintain' in sys.argv[1:]:
+            print("Running partition maintenance...")
+            run_maintenance()
+            print("Partition maintenance completed successfully!")
+            return 0
+
         print("Starting database initialization...")
         create_database()
         create_tables()
@@ -1,8 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import psycopg2
+import psycopg2.extras
+import base64
+import itertools
+import json
 import os
+import re
+
+from ingest import NameCache, ensure_partitions, ingest_matches, match_months, parse_match
+from instrumentation import instrument, query_operation
+from pool import ConnectionPool, PoolTimeout
+from query_cache import QueryCache
 
 app = Flask(__name__)
+metrics = instrument(app, "db_api")
 
 def get_db_connection():
     conn = psycopg2.connect(
@@ -14,6 +25,30 @@ def get_db_connection():
     )
     return conn
 
+pool = ConnectionPool(
+    get_db_connection,
+    maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', '5')),
+    max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+    healthcheck_idle=float(os.getenv('DB_POOL_HEALTHCHECK_IDLE', '30')),
+    stmt_cache_size=int(os.getenv('DB_STMT_CACHE_SIZE', '100')),
+    on_query=metrics.observe_query,
+)
+
+# Opt-in ("cache": true) result cache for read queries sent to /execute_sql
+query_cache = QueryCache(
+    max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '2000')),
+    max_bytes=int(os.getenv('QUERY_CACHE_MAX_MB', '64')) << 20,
+    ttl=float(os.getenv('QUERY_CACHE_TTL_S', '30')),
+)
+
+INGEST_MAX_MATCHES = int(os.getenv('INGEST_MAX_MATCHES', '50000'))
+names = NameCache(max_entries=int(os.getenv('INGEST_NAME_CACHE_SIZE', '200000')))
+
+metrics.gauges('db_pool', pool.snapshot)
+metrics.gauges('query_cache', query_cache.snapshot)
+metrics.gauges('ingest_names', names.snapshot)
+
 
 @app.route('/execute_sql', methods=['POST'])
 def execute_sql():
@@ -21,8 +56,11 @@ def execute_sql():
     Expects JSON body:
     {
         "query": "SELECT * FROM \"User\" WHERE UserID = %s",
-        "params": [1]
+        "params": [1],
+        "cache": true       (optional: serve/store a read from the result
+                             cache; a number sets the TTL in seconds)
     }
+    Writes invalidate cached results of the tables they touch.
     """
     data = request.get_json()
     if not data or 'query' not in data:
@@ -30,25 +68,317 @@ def execute_sql():
 
     query = data['query']
     params = data.get('params', [])
+    ttl = data.get('cache')
+    try:
+        ttl = None if isinstance(ttl, bool) or ttl is None else float(ttl)
+        if ttl is not None and not ttl > 0:
+            raise ValueError(ttl)
+    except (TypeError, ValueError):
+        return jsonify({"error": "'cache' must be true or a positive TTL in seconds"}), 400
+    plan = query_cache.plan(query, params) if data.get('cache') else None
+    if plan is not None:
+        body = query_cache.get(plan)
+        if body is not None:
+            return Response(body, mimetype='application/json')
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(query, params)
-        # Try to fetch results if it's a SELECT
-        if cur.description:
-            columns = [desc[0] for desc in cur.description]
-            rows = cur.fetchall()
-            results = [dict(zip(columns, row)) for row in rows]
-            response = {"results": results}
+        with pool.connection() as pc:
+            cur = pc.conn.cursor()
+            pool.execute(pc, cur, query, params)
+            response = _cursor_result(cur)
+            cur.close()
+        body = app.json.dumps(response)
+        if plan is not None:
+            query_cache.put(plan, body, len(body), ttl=ttl)
         else:
-            conn.commit()
-            response = {"rowcount": cur.rowcount}
-        cur.close()
-        conn.close()
-        return jsonify(response)
+            query_cache.invalidate_query(query)
+        return Response(body, mimetype='application/json')
+    except PoolTimeout as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@app.route('/execute_batch', methods=['POST'])
+def execute_batch():
+    """
+    Runs an ordered list of statements in one transaction on one connection.
+    Expects JSON body:
+    {
+        "statements": [
+            {"query": "CREATE TABLE IF NOT EXISTS ..."},
+            {"query": "INSERT INTO \"Match\"(\"UserID\",\"Won\") VALUES (%s,%s)",
+             "many": [[1, true], [1, false]]},
+            {"query": "SELECT COUNT(*) AS c FROM \"Match\" WHERE \"UserID\"=%s", "params": [1]}
+        ]
+    }
+    Returns {"results": [...]} with one entry per statement, in order. If any
+    statement fails the whole batch is rolled back.
+    """
+    data = request.get_json()
+    statements = (data or {}).get('statements')
+    if not isinstance(statements, list) or not statements:
+        return jsonify({"error": "Missing 'statements' list in request body"}), 400
+    for i, stmt in enumerate(statements):
+        if not isinstance(stmt, dict) or 'query' not in stmt:
+            return jsonify({"error": "Missing 'query' in statement", "statement": i}), 400
+
+    i = 0
+    try:
+        with pool.connection() as pc:
+            cur = pc.conn.cursor()
+            out = []
+            for i, stmt in enumerate(statements):
+                if 'many' in stmt:
+                    with metrics.time_query(query_operation(stmt['query'])):
+                        out.append(_execute_many(cur, stmt['query'], stmt['many']))
+                else:
+                    pool.execute(pc, cur, stmt['query'], stmt.get('params', []))
+                    out.append(_cursor_result(cur))
+            cur.close()
+        for stmt in statements:
+            query_cache.invalidate_query(stmt['query'])
+        return jsonify({"results": out})
+    except PoolTimeout as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e), "statement": i}), 500
+
+
+_VALUES_ROW = re.compile(r"\bVALUES\s*(\((?:\s*%s\s*,)*\s*%s\s*\))", re.IGNORECASE)
+
+def _execute_many(cur, query, rows):
+    """Run one statement for many parameter rows in as few round-trips as possible"""
+    if not rows:
+        return {"rowcount": 0}
+    match = _VALUES_ROW.search(query)
+    if match and len(_VALUES_ROW.findall(query)) == 1:
+        # Single-row INSERT ... VALUES (%s,...) -> one multi-row VALUES list
+        sql = query[:match.start(1)] + "%s" + query[match.end(1):]
+        fetch = bool(re.search(r"\bRETURNING\b", query, re.IGNORECASE))
+        returned = psycopg2.extras.execute_values(
+            cur, sql, rows, template=match.group(1), page_size=len(rows), fetch=fetch)
+        if fetch:
+            columns = [desc[0] for desc in cur.description]
+            return {"results": [dict(zip(columns, row)) for row in returned]}
+        return {"rowcount": cur.rowcount}
+    # Anything else is paged into multi-statement round-trips; the server
+    # only reports the rowcount of the last page, so return the row count sent.
+    psycopg2.extras.execute_batch(cur, query, rows)
+    return {"batched": len(rows)}
+
+
+def _cursor_result(cur):
+    # Try to fetch results if it's a SELECT
+    if cur.description:
+        columns = [desc[0] for desc in cur.description]
+        rows = cur.fetchall()
+        return {"results": [dict(zip(columns, row)) for row in rows]}
+    return {"rowcount": cur.rowcount}
+
+
+STREAM_CHUNK_SIZE = int(os.getenv('DB_STREAM_CHUNK_SIZE', '1000'))
+_cursor_ids = itertools.count(1)
+
+
+@app.route('/stream_sql', methods=['POST'])
+def stream_sql():
+    """
+    Streams a large SELECT through a server-side cursor instead of
+    materialising it. Expects JSON body:
+    {
+        "query": "SELECT * FROM UserMatchBridge WHERE UserID = %s",
+        "params": [1],
+        "format": "ndjson" | "columnar",   (default "ndjson")
+        "chunk_size": 1000                  (rows per fetchmany)
+    }
+    "ndjson" sends one JSON object per row, one per line.
+    "columnar" sends {"columns": [...], "rows": [[...], ...]} so column
+    names are not repeated per row.
+    """
+    data = request.get_json()
+    if not data or 'query' not in data:
+        return jsonify({"error": "Missing 'query' in request body"}), 400
+    fmt = data.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'columnar'):
+        return jsonify({"error": "format must be 'ndjson' or 'columnar'"}), 400
+    chunk_size = max(1, int(data.get('chunk_size', STREAM_CHUNK_SIZE)))
+
+    try:
+        pc = pool.getconn()
+    except PoolTimeout as e:
+        return jsonify({"error": str(e)}), 503
+
+    # Open the cursor and fetch the first chunk before streaming starts, so
+    # SQL errors still come back as a normal JSON error response.
+    try:
+        cur = pc.conn.cursor(name=f"stream_{next(_cursor_ids)}")
+        cur.itersize = chunk_size
+        with metrics.time_query(query_operation(data['query'])):  # to the first chunk
+            cur.execute(data['query'], data.get('params', []))
+            first = cur.fetchmany(chunk_size)
+        columns = [desc[0] for desc in cur.description]
+    except Exception as e:
+        discard = False
+        try:
+            pc.conn.rollback()
+        except Exception:
+            discard = True  # broken connection: free the slot instead of pooling it
+        pool.putconn(pc, discard=discard)
+        return jsonify({"error": str(e)}), 500
+
+    dumps = app.json.dumps
+
+    def generate():
+        discard = False
+        try:
+            rows = first
+            if fmt == 'columnar':
+                yield '{"columns": ' + dumps(columns) + ', "rows": ['
+                sep = ''
+                while rows:
+                    yield sep + ','.join(dumps(list(row)) for row in rows)
+                    sep = ','
+                    rows = cur.fetchmany(chunk_size)
+                yield ']}\n'
+            else:
+                while rows:
+                    yield ''.join(dumps(dict(zip(columns, row))) + '\n' for row in rows)
+                    rows = cur.fetchmany(chunk_size)
+            cur.close()
+        except Exception:
+            discard = True
+            raise
+        finally:
+            # Client disconnects land here too; never return a half-read cursor
+            try:
+                pc.conn.rollback()
+            except Exception:
+                discard = True
+            pool.putconn(pc, discard=discard)
+
+    mimetype = 'application/json' if fmt == 'columnar' else 'application/x-ndjson'
+    return Response(generate(), mimetype=mimetype)
+
+
+HISTORY_MAX_LIMIT = 1000
+
+
+@app.route('/users/<int:user_id>/matches', methods=['GET'])
+def user_match_history(user_id):
+    """
+    Keyset-paginated match history for one user, newest first.
+    Query params: limit (default 100, max 1000), after (next_token from the
+    previous page). Returns {"results": [...], "next_token": str | null}.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), HISTORY_MAX_LIMIT)
+        after = _decode_token(request.args.get('after'))
+    except ValueError:
+        return jsonify({"error": "invalid 'limit' or 'after'"}), 400
+
+    query = (
+        "SELECT b.MatchID, b.Team, b.KDA, b.ADR, b.Rating, m.MatchDateTime, m.WinningTeam "
+        "FROM UserMatchBridge b "
+        "JOIN Match m ON m.MatchID = b.MatchID AND m.MatchDateTime = b.MatchDateTime "
+        "WHERE b.UserID = %s AND b.MatchID < %s "
+        "ORDER BY b.MatchID DESC LIMIT %s"
+    )
+    try:
+        with pool.connection() as pc:
+            cur = pc.conn.cursor()
+            # Fetch one extra row to know whether another page exists
+            pool.execute(pc, cur, query, [user_id, after, limit + 1])
+            results = _cursor_result(cur)["results"]
+            cur.close()
+    except PoolTimeout as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    next_token = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_token = _encode_token(results[-1]["matchid"])
+    return jsonify({"results": results, "next_token": next_token})
+
+
+_MAX_MATCH_ID = 2**31 - 1  # Match.MatchID is SERIAL (int4)
+
+def _encode_token(match_id):
+    raw = json.dumps({"m": match_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _decode_token(token):
+    if not token:
+        return _MAX_MATCH_ID
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return int(json.loads(raw)["m"])
+    except Exception:
+        raise ValueError("bad token")
+
+
+@app.route('/ingest/matches', methods=['POST'])
+def ingest():
+    """
+    Bulk-load scoreboards into Match and UserMatchBridge in one transaction.
+    Expects JSON body:
+    {
+        "matches": [
+            {"players": [{"player": "...", "team": "CT", "Kills": 20, "Deaths": 10,
+                          "Assists": 3, "DMG": 2400, "steam_id": "7656..."}, ...],
+             "CT_score": 13, "T_score": 11,
+             "idempotency_key": "...",      (optional, default: hash of the match)
+             "played_at": "2024-05-01T20:00:00Z", "game": "...", "match_type": "..."}
+        ]
+    }
+    Unknown players are created when they carry a steam_id and skipped (listed
+    in "unknown_players") otherwise; "user_ids" lists the players that got rows. Matches whose key was already ingested
+    are reported as "duplicate" with their existing match_id.
+    """
+    data = request.get_json(silent=True) or {}
+    matches = data.get('matches')
+    if not isinstance(matches, list) or not matches:
+        return jsonify({"error": "Missing 'matches' list in request body"}), 400
+    if len(matches) > INGEST_MAX_MATCHES:
+        return jsonify({"error": f"at most {INGEST_MAX_MATCHES} matches per request"}), 400
+    try:
+        parsed = [parse_match(m) for m in matches]
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"invalid match: {e}"}), 400
+
+    for attempt in range(2):
+        try:
+            with pool.connection() as pc:
+                cur = pc.conn.cursor()
+                # New partitions in their own short transaction, so their
+                # exclusive locks are released before the load starts
+                partitions = ensure_partitions(cur, match_months(parsed), names)
+                pc.conn.commit()
+                names.update(partitions)
+                with metrics.time_query("INGEST"):
+                    summary, learned = ingest_matches(cur, parsed, names)
+                cur.close()
+            names.update(learned)
+            if summary["inserted"] or learned.get("users") or learned.get("games") or learned.get("templates"):
+                query_cache.invalidate({"User", "game", "matchtemplate", "match", "usermatchbridge", "ingestkey"})
+            return jsonify(summary)
+        except (psycopg2.errors.ForeignKeyViolation, psycopg2.errors.CheckViolation) as e:
+            # A cached id points at a deleted user or template: re-resolve once
+            names.clear()
+            if attempt:
+                return jsonify({"error": str(e)}), 500
+        except PoolTimeout as e:
+            return jsonify({"error": str(e)}), 503
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Connection pool, prepared-statement, query result and ingest name cache counters"""
+    return jsonify(dict(pool.snapshot(), query_cache=query_cache.snapshot(), ingest_names=names.snapshot()))
+
 if __name__ == '__main__':
     app.run(debug=False, host="0.0.0.0")
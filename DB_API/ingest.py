@@ -0,0 +1,264 @@
+"""
+Bulk ingest of scoreboards into Match / UserMatchBridge.
+
+Scoreboards arrive in the shape save_cs2_scoreboard produces ({"players":
+[...], "CT_score", "T_score"}). Users, games and match templates are
+resolved for the whole batch with one query per table, through a name -> id
+cache shared by all requests; match and bridge rows are then streamed in
+with COPY. Every match carries an idempotency key (given by the client, or
+a hash of its contents) recorded in IngestKey (see DB/init_db.py), so a
+retried request never inserts the same match twice.
+"""
+
+import datetime
+import io
+import threading
+
+import psycopg2.extras
+
+from ingest_key import match_key
+
+TEAMS = {"CT": 1, "T": 2, 1: 1, 2: 2}
+DEFAULT_GAME = "Counter-Strike 2"
+DEFAULT_MATCH_TYPE = "competitive"
+TEMPLATE_DEFAULTS = ("most rounds won", 5, 5)  # Win_condition, playersCount_Team1/2
+
+
+def _number(value, limit, digits=2):
+    """Round to the column's scale and clamp to its DECIMAL range"""
+    return max(-limit, min(limit, round(float(value), digits)))
+
+
+def parse_match(match):
+    """Validated, normalised form of one scoreboard; raises ValueError"""
+    if not isinstance(match, dict) or not isinstance(match.get("players"), list):
+        raise ValueError("each match needs a 'players' list")
+    ct, t = int(match.get("CT_score", 0)), int(match.get("T_score", 0))
+    rounds = ct + t
+    played_at = match.get("played_at")
+    played_at = datetime.datetime.fromisoformat(played_at) if played_at else datetime.datetime.now(datetime.timezone.utc)
+    if played_at.tzinfo is not None:  # MatchDateTime is a UTC TIMESTAMP
+        played_at = played_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    players = []
+    for p in match["players"]:
+        name = str(p.get("player") or "").strip()
+        team = TEAMS.get(p.get("team"))
+        if not name or team is None:
+            raise ValueError(f"player needs a name and a team of CT or T: {p!r}")
+        kills, deaths, assists = float(p.get("Kills", 0)), float(p.get("Deaths", 0)), float(p.get("Assists", 0))
+        players.append({
+            "name": name[:100],
+            "steam_id": p.get("steam_id"),
+            "team": team,
+            "kda": _number((kills + assists) / max(deaths, 1), 999.99),
+            "adr": _number(float(p.get("DMG", 0)) / rounds, 9999.99) if rounds else None,
+            "rating": _number(p["Rating"], 99.99) if p.get("Rating") is not None else None,
+        })
+    return {
+        "key": match_key(match),
+        "game": str(match.get("game") or DEFAULT_GAME),
+        "match_type": str(match.get("match_type") or DEFAULT_MATCH_TYPE),
+        "played_at": played_at,
+        "winner": 1 if ct > t else 2 if t > ct else None,
+        "players": players,
+    }
+
+
+class NameCache:
+    """Process-wide name -> id maps for users, games, match templates and partitions"""
+
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self._maps = {"users": {}, "games": {}, "templates": {}, "partitions": {}}
+        self._epochs = {}  # kind -> database epoch its entries are valid for
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "resets": 0}
+
+    def lookup(self, kind, names):
+        """(found {name: id}, names not cached)"""
+        with self._lock:
+            cached = self._maps[kind]
+            found = {n: cached[n] for n in names if n in cached}
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(names) - len(found)
+        return found, [n for n in names if n not in found]
+
+    def update(self, learned):
+        """Remember ids resolved by a transaction, once it has committed"""
+        with self._lock:
+            for kind, ids in learned.items():
+                cached = self._maps[kind]
+                if len(cached) + len(ids) > self.max_entries:
+                    cached.clear()
+                cached.update(ids)
+
+    def sync_epoch(self, kind, epoch):
+        """Forget kind's entries if the database's epoch for them has moved"""
+        with self._lock:
+            if self._epochs.get(kind) != epoch:
+                if kind in self._epochs:
+                    self._maps[kind].clear()
+                    self.stats["resets"] += 1
+                self._epochs[kind] = epoch
+
+    def clear(self):
+        with self._lock:
+            for cached in self._maps.values():
+                cached.clear()
+            self.stats["resets"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, **{kind: len(ids) for kind, ids in self._maps.items()})
+
+
+def _resolve_games(cur, names, cache, learned):
+    found, missing = cache.lookup("games", names)
+    if missing:
+        psycopg2.extras.execute_values(
+            cur, "INSERT INTO Game (GameName) VALUES %s ON CONFLICT (GameName) DO NOTHING",
+            [(n,) for n in missing])
+        cur.execute("SELECT GameName, GameID FROM Game WHERE GameName = ANY(%s)", (missing,))
+        learned["games"] = dict(cur.fetchall())
+        found.update(learned["games"])
+    return found
+
+
+def _resolve_templates(cur, pairs, cache, learned):
+    found, missing = cache.lookup("templates", pairs)
+    fresh = {}
+    for game_id, match_type in missing:
+        cur.execute("SELECT MIN(TemplateID) FROM MatchTemplate WHERE GameID = %s AND match_type = %s",
+                    (game_id, match_type))
+        template_id = cur.fetchone()[0]
+        if template_id is None:
+            cur.execute("""INSERT INTO MatchTemplate (GameID, match_type, Win_condition,
+                               playersCount_Team1, playersCount_Team2)
+                           VALUES (%s, %s, %s, %s, %s) RETURNING TemplateID""",
+                        (game_id, match_type, *TEMPLATE_DEFAULTS))
+            template_id = cur.fetchone()[0]
+        fresh[(game_id, match_type)] = template_id
+    learned["templates"] = fresh
+    found.update(fresh)
+    return found
+
+
+def _resolve_users(cur, steam_ids, cache, learned):
+    """Ids of existing users; unknown names are created when a steam_id was sent"""
+    found, missing = cache.lookup("users", list(steam_ids))
+    if missing:
+        new = [(n, steam_ids[n]) for n in missing if steam_ids[n]]
+        if new:
+            psycopg2.extras.execute_values(
+                cur, 'INSERT INTO "User" (UserName, User_Steam_ID) VALUES %s ON CONFLICT DO NOTHING', new)
+        cur.execute('SELECT UserName, UserID FROM "User" WHERE UserName = ANY(%s)', (missing,))
+        learned["users"] = dict(cur.fetchall())
+        found.update(learned["users"])
+    return found
+
+
+def match_months(matches):
+    """First days of the months parsed matches were played in"""
+    return sorted({m["played_at"].date().replace(day=1) for m in matches})
+
+
+def ensure_partitions(cur, months, cache):
+    """
+    Create the monthly Match/UserMatchBridge partitions a batch writes into.
+    Commit this in its own short transaction before the load: creating a
+    partition locks both parent tables exclusively, which must not last for
+    a whole COPY. Cached months are skipped unless partition maintenance has
+    retired a month since (match_partition_epoch moved). Returns learned
+    ids for cache.update() after the commit.
+    """
+    cur.execute("SELECT last_value FROM match_partition_epoch")
+    cache.sync_epoch("partitions", cur.fetchone()[0])
+    _, missing = cache.lookup("partitions", months)
+    for month in missing:
+        cur.execute("SELECT ensure_match_partition(%s)", (month,))
+    return {"partitions": dict.fromkeys(missing, True)}
+
+
+def _copy(cur, table, columns, rows):
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(r"\N" if v is None else str(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def ingest_matches(cur, matches, cache):
+    """
+    Load parsed matches (see parse_match) in the cursor's transaction; run
+    ensure_partitions for them first. Rows of a month without a partition
+    land in the DEFAULT partitions.
+    Returns (summary, learned); pass learned to cache.update() after commit.
+    """
+    learned = {}
+    results = [None] * len(matches)
+    first = {}  # key -> index of its first occurrence in this batch
+    for i, m in enumerate(matches):
+        first.setdefault(m["key"], i)
+    unique = [matches[i] for i in sorted(first.values())]
+
+    games = _resolve_games(cur, sorted({m["game"] for m in unique}), cache, learned)
+    templates = _resolve_templates(cur, sorted({(games[m["game"]], m["match_type"]) for m in unique}),
+                                   cache, learned)
+    steam_ids = {}
+    for m in unique:
+        for p in m["players"]:
+            if not steam_ids.get(p["name"]):
+                steam_ids[p["name"]] = p["steam_id"]
+    users = _resolve_users(cur, steam_ids, cache, learned)
+
+    # Claim keys with freshly reserved match ids; keys that already exist
+    # (an earlier or concurrent copy of this request) are skipped
+    cur.execute("SELECT nextval(pg_get_serial_sequence('match', 'matchid')) FROM generate_series(1, %s)",
+                (len(unique),))
+    reserved = [row[0] for row in cur.fetchall()]
+    claimed = dict(psycopg2.extras.execute_values(
+        cur, "INSERT INTO IngestKey (Key, MatchID) VALUES %s ON CONFLICT (Key) DO NOTHING RETURNING Key, MatchID",
+        [(m["key"], match_id) for m, match_id in zip(unique, reserved)], page_size=len(unique), fetch=True))
+    existing = {}
+    if len(claimed) < len(unique):
+        cur.execute("SELECT Key, MatchID FROM IngestKey WHERE Key = ANY(%s)",
+                    ([m["key"] for m in unique if m["key"] not in claimed],))
+        existing = dict(cur.fetchall())
+
+    match_rows, bridge_rows, unknown = [], [], set()
+    for m in unique:
+        match_id = claimed.get(m["key"])
+        if match_id is None:
+            continue
+        played_at = m["played_at"].isoformat()
+        match_rows.append((match_id, templates[(games[m["game"]], m["match_type"])], played_at, m["winner"]))
+        seen = set()
+        for p in m["players"]:
+            user_id = users.get(p["name"])
+            if user_id is None:
+                unknown.add(p["name"])
+            elif user_id not in seen:  # (UserID, MatchID) is the primary key
+                seen.add(user_id)
+                bridge_rows.append((user_id, match_id, played_at, p["team"], p["kda"], p["adr"], p["rating"]))
+    if match_rows:
+        _copy(cur, "Match", ("MatchID", "TemplateID", "MatchDateTime", "WinningTeam"), match_rows)
+    if bridge_rows:
+        _copy(cur, "UserMatchBridge", ("UserID", "MatchID", "MatchDateTime", "Team", "KDA", "ADR", "Rating"),
+              bridge_rows)
+
+    for i, m in enumerate(matches):
+        if first[m["key"]] == i and m["key"] in claimed:
+            results[i] = {"key": m["key"], "match_id": claimed[m["key"]], "status": "inserted"}
+        else:
+            match_id = claimed.get(m["key"], existing.get(m["key"]))
+            results[i] = {"key": m["key"], "match_id": match_id, "status": "duplicate"}
+    summary = {
+        "inserted": len(match_rows),
+        "duplicates": len(matches) - len(match_rows),
+        "player_rows": len(bridge_rows),
+        "unknown_players": sorted(unknown),
+        "user_ids": sorted({row[0] for row in bridge_rows}),  # whose stats changed
+        "matches": results,
+    }
+    return summary, learned
@@ -0,0 +1,308 @@
+"""
+Connection pool and prepared-statement cache for the DB API.
+
+A bounded, thread-safe pool of psycopg2 connections. Connections are
+health-checked when they have been idle for a while and recycled once they
+reach a maximum age, so a restarted database or a stale socket never reaches
+a request. Every pooled connection carries its own LRU cache of server-side
+prepared statements keyed by query text and parameter types.
+
+Parameters are declared with the type psycopg2 would have given the inlined
+literal (int4/int8/numeric/boolean, "unknown" for strings and the rest), so
+a prepared query returns the same types as a plain one. Queries Postgres
+will not prepare that way (tuple parameters for IN %s, untyped %s IS NULL,
+...) fall back to a plain execute and are remembered as unpreparable.
+"""
+
+import decimal
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the timeout"""
+
+
+class PooledConnection:
+    """A psycopg2 connection plus the bookkeeping the pool needs"""
+
+    def __init__(self, conn, stmt_cache_size):
+        self.conn = conn
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.statements = OrderedDict()  # (query text, parameter types) -> prepared statement name
+        self.unpreparable = set()        # keys whose PREPARE failed; always run plain
+        self.stale = []                  # statement names to DEALLOCATE once the transaction is usable
+        self.stmt_cache_size = stmt_cache_size
+        self._next_stmt = 0
+
+    def new_statement_name(self):
+        self._next_stmt += 1
+        return f"s{self._next_stmt}"
+
+
+class ConnectionPool:
+    """Bounded pool with health checks, recycling and hit/miss counters"""
+
+    def __init__(self, connect, maxconn=10, timeout=5.0,
+                 max_lifetime=1800.0, healthcheck_idle=30.0, stmt_cache_size=100, on_query=None):
+        self._connect = connect
+        self._on_query = on_query  # called with (query, seconds) after every execute()
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.healthcheck_idle = healthcheck_idle
+        self.stmt_cache_size = stmt_cache_size
+
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self.stats = {
+            "pool_hits": 0,        # checkout served by an idle connection
+            "pool_misses": 0,      # checkout had to open a new connection
+            "pool_waits": 0,       # checkout had to wait for a release
+            "pool_timeouts": 0,
+            "healthcheck_failures": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "stmt_hits": 0,
+            "stmt_misses": 0,
+            "stmt_evictions": 0,
+            "stmt_fallbacks": 0,   # PREPARE rejected; ran as a plain query
+        }
+
+    # ---- Checkout / release ----------------------------------
+    def _open(self):
+        return PooledConnection(self._connect(), self.stmt_cache_size)
+
+    def _close(self, pc):
+        try:
+            pc.conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, pc):
+        if pc.conn.closed:
+            return False
+        if time.monotonic() - pc.last_used < self.healthcheck_idle:
+            return True
+        try:
+            with pc.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            pc.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            pc = self._reserve(deadline)
+            if pc is None:
+                break
+            # Health check outside the lock so a dead socket does not stall other threads
+            if time.monotonic() - pc.created > self.max_lifetime:
+                self._drop(pc, "recycled")
+            elif not self._is_healthy(pc):
+                self._drop(pc, "healthcheck_failures")
+            else:
+                with self._cond:
+                    self.stats["pool_hits"] += 1
+                return pc
+
+        # A slot was reserved for a new connection; open it outside the lock
+        try:
+            pc = self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats["pool_misses"] += 1
+        return pc
+
+    def _reserve(self, deadline):
+        """Return an idle connection, or None after reserving a slot for a new one"""
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.maxconn:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["pool_timeouts"] += 1
+                    raise PoolTimeout(f"no connection available within {self.timeout}s")
+                self.stats["pool_waits"] += 1
+                self._cond.wait(remaining)
+
+    def _drop(self, pc, reason):
+        self._close(pc)
+        with self._cond:
+            self.stats[reason] += 1
+            self._size -= 1
+            self._cond.notify()
+
+    def putconn(self, pc, discard=False):
+        with self._cond:
+            if discard or pc.conn.closed:
+                self.stats["discarded"] += 1
+                self._close(pc)
+                self._size -= 1
+            else:
+                pc.last_used = time.monotonic()
+                self._idle.append(pc)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commit on success, roll back on error"""
+        pc = self.getconn()
+        discard = False
+        try:
+            yield pc
+            pc.conn.commit()
+        except Exception:
+            try:
+                pc.conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.putconn(pc, discard=discard)
+
+    def snapshot(self):
+        with self._cond:
+            out = dict(self.stats)
+            out.update({"size": self._size, "idle": len(self._idle),
+                        "in_use": self._size - len(self._idle), "max": self.maxconn})
+        return out
+
+    # ---- Prepared statements ---------------------------------
+    def execute(self, pc, cur, query, params):
+        """Run query on cur, through a cached server-side prepared statement when possible"""
+        if self._on_query is None:
+            return self._execute(pc, cur, query, params)
+        started = time.perf_counter()
+        try:
+            self._execute(pc, cur, query, params)
+        finally:
+            self._on_query(query, time.perf_counter() - started)
+
+    def _execute(self, pc, cur, query, params):
+        types = _param_types(params) if params and _preparable(query) else None
+        key = (query, types)
+        if types is None or key in pc.unpreparable:
+            cur.execute(query, params)
+            return
+        if pc.stale and pc.conn.get_transaction_status() != TRANSACTION_STATUS_INERROR:
+            # Statements dropped after a failed EXECUTE; the transaction has since been rolled back
+            for old in pc.stale:
+                cur.execute(f"DEALLOCATE {old}")
+            pc.stale.clear()
+
+        name = pc.statements.get(key)
+        if name is not None:
+            pc.statements.move_to_end(key)
+            with self._cond:
+                self.stats["stmt_hits"] += 1
+        else:
+            name = self._prepare(pc, cur, query, types)
+            if name is None:
+                pc.unpreparable.add(key)
+                if len(pc.unpreparable) > 10 * pc.stmt_cache_size:
+                    pc.unpreparable.clear()
+                cur.execute(query, params)
+                return
+            pc.statements[key] = name
+            with self._cond:
+                self.stats["stmt_misses"] += 1
+            if len(pc.statements) > pc.stmt_cache_size:
+                _, old = pc.statements.popitem(last=False)
+                cur.execute(f"DEALLOCATE {old}")
+                with self._cond:
+                    self.stats["stmt_evictions"] += 1
+
+        placeholders = ", ".join(["%s"] * len(params))
+        try:
+            cur.execute(f"EXECUTE {name} ({placeholders})", params)
+        except Exception as e:
+            code = getattr(e, "pgcode", None) or ""
+            if code == "26000":  # the statement is gone server-side (e.g. DISCARD ALL)
+                pc.statements.pop(key, None)
+            elif code.startswith("0A"):
+                # "cached plan must not change result type": the table changed
+                # underneath the plan; re-prepare next time and drop the old one
+                # once the caller has rolled back
+                pc.statements.pop(key, None)
+                pc.stale.append(name)
+            raise  # data errors (unique violations, ...) leave the statement valid
+
+    def _prepare(self, pc, cur, query, types):
+        """PREPARE under a savepoint; None (transaction intact) if Postgres rejects it"""
+        name = pc.new_statement_name()
+        cur.execute("SAVEPOINT pool_prepare")
+        try:
+            cur.execute(f"PREPARE {name} ({', '.join(types)}) AS {_to_positional(query)}")
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT pool_prepare")
+            cur.execute("RELEASE SAVEPOINT pool_prepare")
+            with self._cond:
+                self.stats["stmt_fallbacks"] += 1
+            return None
+        cur.execute("RELEASE SAVEPOINT pool_prepare")
+        return name
+
+
+_PREPARABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+
+def _preparable(query):
+    # Only plain DML with positional %s parameters; skip named params,
+    # escaped percent signs and anything that is not a single statement.
+    return (
+        bool(_PREPARABLE.match(query))
+        and "%(" not in query
+        and "%%" not in query
+        and ";" not in query.rstrip().rstrip(";")
+    )
+
+
+def _param_types(params):
+    """
+    PREPARE parameter types matching how psycopg2 would inline each value,
+    or None when a value cannot be passed as one parameter (tuples expand
+    to a list for IN %s).
+    """
+    if not isinstance(params, (list, tuple)):
+        return None
+    types = []
+    for value in params:
+        if isinstance(value, tuple):
+            return None
+        if isinstance(value, bool):
+            types.append("boolean")
+        elif isinstance(value, int):
+            types.append("int4" if -2**31 <= value < 2**31 else "int8" if -2**63 <= value < 2**63 else "numeric")
+        elif isinstance(value, float):
+            types.append("numeric" if math.isfinite(value) else "float8")
+        elif isinstance(value, decimal.Decimal):
+            types.append("numeric")
+        else:
+            types.append("unknown")  # strings, NULL, arrays, ...: inferred from context as for a literal
+    return tuple(types)
+
+
+def _to_positional(query):
+    """Rewrite psycopg2 %s placeholders to Postgres $1, $2, ..."""
+    counter = iter(range(1, query.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", query)
+
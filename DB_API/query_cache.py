@@ -0,0 +1,213 @@
+"""
+Opt-in result cache for read queries.
+
+Entries are keyed by the normalised query text plus its parameters and kept
+in a bounded LRU (entry count and approximate JSON size) with a per-entry
+TTL. Each entry remembers the tables its query reads. Writes that go through
+the API invalidate every entry reading a table they touch - the target of
+INSERT/UPDATE/DELETE/TRUNCATE/COPY at the head of a statement, plus tables
+changed by triggers and cascades on it - and DDL clears the whole cache.
+Monthly partitions of Match and UserMatchBridge count as their parent. A per-table generation
+counter keeps a read that raced with a write from storing its stale result.
+Writes made outside the API are only bounded by the TTL, and read tables
+are found by FROM / JOIN (and comma-separated FROM lists), so callers should
+only opt in for plain reads.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# Tables a write to the key table also changes, through the triggers and
+# ON DELETE CASCADE foreign keys in DB/init_db.py
+DEPENDENTS = {
+    "User": {"usergamebridge", "usermatchbridge", "usermatchstats"},
+    "game": {"usergamebridge", "matchtemplate"},
+    "matchtemplate": {"match"},
+    "match": {"usermatchbridge", "usermatchstats"},
+    "usermatchbridge": {"usermatchstats"},
+}
+
+_IDENT = r'(?:"[^"]+"|[A-Za-z_][\w$]*)'
+_NAME = rf'{_IDENT}(?:\s*\.\s*{_IDENT})?'
+# Only at the start of a statement or a CTE / subquery body, so FOR UPDATE
+# SKIP LOCKED and ON CONFLICT DO UPDATE SET name no tables
+_WRITE = re.compile(
+    rf'(?:^|[;()])\s*(?:INSERT\s+INTO|UPDATE(?:\s+ONLY)?|DELETE\s+FROM(?:\s+ONLY)?'
+    rf'|TRUNCATE(?:\s+TABLE)?(?:\s+ONLY)?|COPY)\s+({_NAME}(?:\s*,\s*{_NAME})*)', re.IGNORECASE)
+_DDL = re.compile(r'^\s*(?:CREATE|ALTER|DROP|GRANT|REVOKE|COMMENT|DO)\b', re.IGNORECASE)
+_READ = re.compile(r'^\s*(?:SELECT|WITH)\b', re.IGNORECASE)
+_FROM = re.compile(rf'\b(?:FROM|JOIN)\s+(?:ONLY\s+|LATERAL\s+)?({_NAME})', re.IGNORECASE)
+_FROM_LIST = re.compile(rf'\s*,\s*({_NAME})(?:\s+(?:AS\s+)?{_IDENT})?', re.IGNORECASE)
+_ALIAS = re.compile(rf'\s+(?:AS\s+)?(?!(?:WHERE|JOIN|ON|GROUP|ORDER|LIMIT|UNION|LEFT|RIGHT|INNER|FULL|CROSS|'
+                    rf'NATURAL|HAVING|WINDOW|OFFSET|FETCH|FOR|USING)\b){_IDENT}', re.IGNORECASE)
+# Results that change without any table changing
+_VOLATILE = re.compile(r'\b(?:now|random|nextval|setval|currval|clock_timestamp|statement_timestamp|'
+                       r'timeofday|gen_random_uuid|pg_advisory\w*)\s*\(|\bcurrent_(?:timestamp|date|time)\b'
+                       r'|\bFOR\s+(?:UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b', re.IGNORECASE)
+# Partitions created by ensure_match_partition, and the DEFAULT ones
+_PARTITION = re.compile(r'^(match|usermatchbridge)_(?:p\d{4}_\d{2}|default)$')
+_SPACE = re.compile(r"""('(?:[^']|'')*'|"[^"]*")|\s+""")
+
+
+def normalise(query):
+    """Collapse whitespace outside string literals and quoted identifiers"""
+    return _SPACE.sub(lambda m: m.group(1) or " ", query).strip().rstrip(";").strip()
+
+
+def _table(name):
+    """
+    Postgres identifier rules: quoted names keep their case, bare names fold
+    to lower case; a partition is reported as its parent table
+    """
+    last = re.split(r'\s*\.\s*(?=(?:"[^"]+"|[A-Za-z_][\w$]*)\s*$)', name.strip())[-1]
+    table = last[1:-1] if last.startswith('"') else last.lower()
+    partition = _PARTITION.match(table)
+    return partition.group(1) if partition else table
+
+
+def read_tables(query):
+    """Tables named after FROM / JOIN, including comma-separated FROM lists"""
+    tables = set()
+    for m in _FROM.finditer(query):
+        tables.add(_table(m.group(1)))
+        pos = m.end()
+        alias = _ALIAS.match(query, pos)
+        if alias:
+            pos = alias.end()
+        more = _FROM_LIST.match(query, pos)
+        while more:
+            tables.add(_table(more.group(1)))
+            more = _FROM_LIST.match(query, more.end())
+    return tables
+
+
+def written_tables(query):
+    """Target tables of the writes in query; None means "unknown, drop everything" (DDL)"""
+    if _DDL.match(query):
+        return None
+    return {_table(name) for m in _WRITE.finditer(query) for name in re.split(r'\s*,\s*', m.group(1))}
+
+
+class QueryCache:
+    def __init__(self, max_entries=2000, max_bytes=64 << 20, ttl=30.0, dependents=DEPENDENTS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._dependents = dependents
+        self._entries = OrderedDict()          # key -> (expires, size, tables, value)
+        self._by_table = defaultdict(set)      # table -> keys reading it
+        self._generation = defaultdict(int)    # table -> writes seen
+        self._epoch = 0                        # bumped by clear()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0,
+                      "evictions": 0, "invalidations": 0, "uncacheable": 0, "stale_skips": 0}
+
+    # ---- Reads -----------------------------------------------
+    def plan(self, query, params):
+        """
+        (key, tables, generation token) for a cacheable read, or None.
+        Take the plan before running the query and hand it to put() after.
+        """
+        if not _READ.match(query) or _VOLATILE.search(query) or written_tables(query) != set():
+            with self._lock:
+                self.stats["uncacheable"] += 1
+            return None
+        text = normalise(query)
+        key = text + "\x00" + json.dumps(params, sort_keys=True, default=str)
+        tables = frozenset(read_tables(text))
+        with self._lock:
+            token = (self._epoch, tuple(self._generation[t] for t in sorted(tables)))
+        return key, tables, token
+
+    def get(self, plan):
+        key = plan[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[3]
+
+    def put(self, plan, value, size, ttl=None):
+        key, tables, token = plan
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if token != (self._epoch, tuple(self._generation[t] for t in sorted(tables))):
+                self.stats["stale_skips"] += 1  # a write landed while the query ran
+                return
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), size, tables, value)
+            self._bytes += size
+            for table in tables:
+                self._by_table[table].add(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[1]
+        for table in entry[2]:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    # ---- Writes ----------------------------------------------
+    def invalidate_query(self, query):
+        """Invalidate whatever a (committed) statement may have changed"""
+        tables = written_tables(query)
+        if tables is None:
+            self.clear()
+        elif tables:
+            self.invalidate(tables)
+
+    def invalidate(self, tables):
+        pending, affected = list(tables), set()
+        while pending:
+            table = pending.pop()
+            if table not in affected:
+                affected.add(table)
+                pending.extend(self._dependents.get(table, ()))
+        with self._lock:
+            for table in affected:
+                self._generation[table] += 1
+                for key in list(self._by_table.get(table, ())):
+                    self._drop(key)
+                    self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+            self._epoch += 1
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self.stats)
+            lookups = out["hits"] + out["misses"]
+            out.update({
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_ratio": round(out["hits"] / lookups, 4) if lookups else 0.0,
+            })
+        return out
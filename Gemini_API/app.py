@@ -1,17 +1,71 @@
 from flask import Flask, request, jsonify
+import os
+
+from coaching import CoachEngine
+from instrumentation import instrument
+
 app = Flask(__name__)
+metrics = instrument(app, "gemini_api")
+
+# Thresholds and tips come from config and are compiled once at startup
+RULES_PATH = os.getenv("COACH_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "coach_rules.json"))
+engine = CoachEngine.from_file(RULES_PATH, memo_size=int(os.getenv("COACH_MEMO_SIZE", "10000")))
+BATCH_MAX_PLAYERS = int(os.getenv("COACH_BATCH_MAX_PLAYERS", "5000"))
+metrics.gauges("coach", engine.snapshot)
+
+
+def _stats(player, rounds=None):
+    """(kills, deaths, adr) for a /coach body or a scoreboard row (Kills, Deaths, DMG)"""
+    kills = float(player.get("kills", player.get("Kills", 0)))
+    deaths = float(player.get("deaths", player.get("Deaths", 1)))
+    if "adr" in player:
+        adr = float(player["adr"])
+    elif "DMG" in player and rounds:
+        adr = round(float(player["DMG"]) / rounds, 1)
+    else:
+        adr = 0.0
+    return kills, deaths, adr
 
 @app.post("/coach")
 def coach():
     data = request.get_json(force=True, silent=True) or {}
-    kills  = float(data.get("kills", 0))
-    deaths = float(data.get("deaths", 1))
-    adr    = float(data.get("adr", 0))
-    tips = []
-    if deaths and kills/deaths < 1: tips.append("Improve survival: trade with a buddy, avoid dry peeks.")
-    if adr < 70: tips.append("Utility/impact low: practice nades, pre-aim common angles.")
-    if kills < 15: tips.append("Aim: 10-min KovaaK/Aim Lab + DM warmup.")
-    return jsonify({"kdr": round(kills/max(deaths,1),2), "adr": adr, "tips": tips or ["Solid performance—keep it up!"]})
+    return jsonify(engine.score([_stats(data)])[0])
+
+@app.post("/coach/batch")
+def coach_batch():
+    """
+    Coach a whole team, scoreboard or match history in one call.
+    Body: {"players": [{"kills", "deaths", "adr", ...}, ...]} or a scoreboard as
+    sent to save_cs2_scoreboard ({"players": [{"player", "Kills", "Deaths", "DMG", ...}],
+    "CT_score", "T_score"}); ADR is then DMG over rounds played, or over "rounds" if given.
+    Returns {"results": [{"player"?, "kdr", "adr", "tips"}, ...]} in input order.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    players = data.get("players")
+    if not isinstance(players, list) or not all(isinstance(p, dict) for p in players):
+        return jsonify({"error": "players must be a list of objects"}), 400
+    if len(players) > BATCH_MAX_PLAYERS:
+        return jsonify({"error": f"at most {BATCH_MAX_PLAYERS} players per request"}), 400
+    try:
+        rounds = data.get("rounds")
+        if rounds is None and "CT_score" in data and "T_score" in data:
+            rounds = int(data["CT_score"]) + int(data["T_score"])
+        stats = [_stats(p, float(rounds) if rounds else None) for p in players]
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"bad stats: {e}"}), 400
+    try:
+        advice = engine.score(stats)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    results = []
+    for player, item in zip(players, advice):
+        name = player.get("player", player.get("name"))
+        results.append(dict({"player": name}, **item) if name is not None else item)
+    return jsonify({"results": results})
+
+@app.get("/coach/stats")
+def coach_stats():
+    return jsonify(engine.snapshot())
 
 @app.get("/health")
 def health():
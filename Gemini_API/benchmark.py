@@ -0,0 +1,62 @@
+"""
+Compare save_cs2_scoreboard (one match per call) with the bulk
+save_cs2_scoreboards on synthetic matches.
+
+    python benchmark.py --matches 10000
+"""
+
+import argparse
+import random
+import time
+
+from functions import save_cs2_scoreboard, save_cs2_scoreboards
+
+
+def synthetic_matches(n, seed=0):
+    rng = random.Random(seed)
+    matches = []
+    for m in range(n):
+        players = []
+        for i in range(10):
+            players.append({
+                "player": f"player{m}_{i}",
+                "team": "CT" if i < 5 else "T",
+                "Kills": rng.randint(0, 35),
+                "Deaths": rng.randint(0, 25),
+                "Assists": rng.randint(0, 12),
+                "HeadshotPerc": rng.randint(0, 100),
+                "DMG": rng.randint(0, 3500),
+            })
+        matches.append({"players": players, "CT_score": rng.randint(0, 13), "T_score": rng.randint(0, 13)})
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    matches = synthetic_matches(args.matches)
+
+    loop_times, bulk_times = [], []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        expected = [save_cs2_scoreboard(**match) for match in matches]
+        loop_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        got = save_cs2_scoreboards(matches)
+        bulk_times.append(time.perf_counter() - started)
+
+    if got != expected:
+        raise SystemExit("bulk output differs from save_cs2_scoreboard")
+    loop, bulk = min(loop_times), min(bulk_times)
+    print(f"{args.matches} matches, best of {args.repeat}")
+    print(f"save_cs2_scoreboard loop  {loop * 1000:9.1f} ms  {args.matches / loop:10.0f} matches/s")
+    print(f"save_cs2_scoreboards bulk {bulk * 1000:9.1f} ms  {args.matches / bulk:10.0f} matches/s")
+    print(f"speedup {loop / bulk:.2f}x, outputs identical")
+
+
+if __name__ == "__main__":
+    main()
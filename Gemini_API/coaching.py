@@ -0,0 +1,107 @@
+"""
+Rule-based coaching tips.
+
+Rules are loaded from JSON (see coach_rules.json) and compiled once into
+arrays of (metric, comparison, threshold) conditions. Scoring a batch builds
+one metric matrix for all players and evaluates every rule against it in a
+single pass; players with identical stats share one evaluation, and results
+are memoized across requests.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Raw inputs, in column order
+INPUTS = ("kills", "deaths", "adr")
+
+_OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+        "==": np.equal, "!=": np.not_equal}
+
+
+def _metrics(stats):
+    """Derived metrics for an (n, len(INPUTS)) array of raw stats"""
+    kills, deaths, adr = stats.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kd = np.where(deaths != 0, kills / np.where(deaths != 0, deaths, 1), np.inf)
+    return {
+        "kills": kills,
+        "deaths": deaths,
+        "adr": adr,
+        "kd": kd,                                # kills per death, inf without deaths
+        "kdr": kills / np.maximum(deaths, 1),    # the ratio reported to the player
+    }
+
+
+class CoachEngine:
+    def __init__(self, rules, default_tip, memo_size=10000):
+        self.default_tip = default_tip
+        self.tips = []
+        self._conditions = []  # (rule index, metric, ufunc, threshold)
+        for i, rule in enumerate(rules):
+            self.tips.append(rule["tip"])
+            for metric, op, value in rule["when"]:
+                if op not in _OPS:
+                    raise ValueError(f"rule {rule.get('id', i)}: unknown operator {op!r}")
+                self._conditions.append((i, metric, _OPS[op], float(value)))
+        unknown = {metric for _, metric, _, _ in self._conditions} - set(_metrics(np.zeros((0, len(INPUTS)))))
+        if unknown:
+            raise ValueError(f"unknown metrics in coaching rules: {sorted(unknown)}")
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"scored": 0, "memo_hits": 0, "evaluated": 0}
+
+    @classmethod
+    def from_file(cls, path, memo_size=10000):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config["rules"], config["default_tip"], memo_size)
+
+    def _evaluate(self, stats):
+        """Advice for each row of stats, all rules in one pass"""
+        metrics = _metrics(stats)
+        fired = np.ones((len(stats), len(self.tips)), dtype=bool)
+        for i, metric, op, value in self._conditions:
+            fired[:, i] &= op(metrics[metric], value)
+        # Python's round() on the ratio, as /coach always reported it: np.round
+        # scales by 100 first and rounds some ratios the other way (1/40 -> 0.02)
+        kdr = [round(kills / max(deaths, 1), 2) for kills, deaths in stats[:, :2].tolist()]
+        return [
+            {"kdr": kdr[row], "adr": stats[row, 2].item(),
+             "tips": [self.tips[i] for i in np.flatnonzero(fired[row])] or [self.default_tip]}
+            for row in range(len(stats))
+        ]
+
+    def score(self, stats):
+        """
+        Coaching advice for many players.
+        stats: sequence of (kills, deaths, adr) tuples of floats.
+        Returns one {"kdr", "adr", "tips"} dict per player (shared between
+        identical tuples; copy before modifying).
+        """
+        keys = [tuple(row) for row in stats]
+        with self._lock:
+            found = {key: self._memo[key] for key in set(keys) if key in self._memo}
+            for key in found:
+                self._memo.move_to_end(key)
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing:
+            fresh = self._evaluate(np.array(missing, dtype=np.float64).reshape(-1, len(INPUTS)))
+            found.update(zip(missing, fresh))
+            with self._lock:
+                for key, advice in zip(missing, fresh):
+                    self._memo[key] = advice
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        with self._lock:
+            self.stats["scored"] += len(keys)
+            self.stats["evaluated"] += len(missing)
+            self.stats["memo_hits"] += len(keys) - len(missing)
+        return [found[key] for key in keys]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, memo_entries=len(self._memo), rules=len(self.tips))
@@ -1,6 +1,9 @@
 import json
+import numbers
 from typing import List, Dict, Any
 
+import numpy as np
+
 def save_cs2_scoreboard(players: List[Dict[str, Any]], CT_score: int, T_score: int) -> Dict[str, Any]:
     """
     Saves the Counter-Strike 2 scoreboard information, including player stats and team scores.
@@ -73,3 +76,152 @@ def save_cs2_scoreboard(players: List[Dict[str, Any]], CT_score: int, T_score: i
         }
     
     return scoreboard_data
+
+
+_STATS = ("Kills", "Deaths", "Assists", "DMG", "HeadshotPerc")
+
+
+def save_cs2_scoreboards(scoreboards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Bulk version of save_cs2_scoreboard for many matches at once.
+
+    Player stats are packed into (matches x max players) NumPy arrays once, and
+    totals, team splits, averages and top performers are computed column-wise
+    for all matches together. Sums accumulate players left to right, exactly as
+    Python's sum() does, so every match's output is identical to
+    save_cs2_scoreboard(**scoreboard), including int vs float results.
+
+    Args:
+        scoreboards: List of {"players": [...], "CT_score": int, "T_score": int}
+
+    Returns:
+        One scoreboard summary per input, in the same order
+
+    Raises:
+        TypeError: if a player's stat is None or not a number; the message
+            names the scoreboard's index, the player and the field
+    """
+    n = len(scoreboards)
+    rosters = [board["players"] for board in scoreboards]
+    counts = np.fromiter((len(players) for players in rosters), dtype=np.int64, count=n)
+    width = int(counts.max()) if n else 0
+    valid = np.arange(width) < counts[:, None]
+
+    # One flat pass per column, scattered into the padded (n, width) layout
+    flat = [player for players in rosters for player in players]
+    rows = np.repeat(np.arange(n), counts)
+    cols = np.arange(len(flat)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    def column(values, fill):
+        values = np.array(values)
+        if values.dtype == object or values.dtype.kind not in "iufb":
+            values = values.astype(np.float64)
+        if values.dtype.kind == "b":
+            values = values.astype(np.int64)
+        if len(values) == n * width:
+            return values.reshape(n, width)  # every match has the same roster size
+        out = np.full((n, width), fill if values.dtype.kind == "f" else 0, dtype=values.dtype)
+        out[rows, cols] = values
+        return out
+
+    stats = {}
+    is_float = {}
+    for stat in _STATS:
+        raw = [player.get(stat, 0) for player in flat]
+        # NumPy would turn None into NaN and fail much later, far from the bad row
+        bad = next((i for i, v in enumerate(raw) if not isinstance(v, numbers.Real)), None)
+        if bad is not None:
+            raise TypeError(f"scoreboard {int(rows[bad])}: player {flat[bad].get('player')!r} "
+                            f"has no numeric {stat} (got {raw[bad]!r})")
+        stats[stat] = column(raw, 0.0)
+        # Keep per-value types when floats are mixed in, so int-only sums stay ints
+        is_float[stat] = (column([isinstance(v, float) for v in raw], False).astype(bool)
+                          if stats[stat].dtype.kind == "f" else None)
+    teams = [player.get("team") for player in flat]
+    in_team = {team: column([t == team for t in teams], False).astype(bool) for team in ("CT", "T")}
+
+    def total(stat, mask):
+        """Per-match sum over masked players, as Python ints/floats"""
+        values = stats[stat]
+        if is_float[stat] is None:
+            return np.where(mask, values, 0).sum(axis=1).tolist()
+        # Float addition is order-dependent: add players left to right like sum()
+        acc = np.zeros(n, dtype=values.dtype)
+        for j in range(width):
+            acc += np.where(mask[:, j], values[:, j], 0)
+        floats = (is_float[stat] & mask).any(axis=1)
+        return [float(v) if f else int(v) for v, f in zip(acc.tolist(), floats.tolist())]
+
+    totals = {stat: total(stat, valid) for stat in _STATS}
+    team_totals = {
+        team: {stat: total(stat, mask) for stat in ("Kills", "Deaths", "Assists", "DMG")}
+        for team, mask in in_team.items()
+    }
+    team_counts = {team: mask.sum(axis=1).tolist() for team, mask in in_team.items()}
+
+    def leader(stat):
+        """Index of the first player with the highest value, per match"""
+        values = stats[stat]
+        floor = -np.inf if values.dtype.kind == "f" else np.iinfo(values.dtype).min
+        return np.where(valid, values, floor).argmax(axis=1).tolist() if width else [0] * n
+
+    top_kills, top_damage, top_headshot = leader("Kills"), leader("DMG"), leader("HeadshotPerc")
+
+    results = []
+    rows_out = zip(scoreboards, rosters, top_kills, top_damage, top_headshot,
+                   *(totals[stat] for stat in _STATS),
+                   *(team_totals[team][stat] for team in ("CT", "T") for stat in ("Kills", "Deaths", "Assists", "DMG")),
+                   team_counts["CT"], team_counts["T"])
+    for (board, players, i_kills, i_damage, i_headshot, kills, deaths, assists, damage, headshots,
+         ct_kills, ct_deaths, ct_assists, ct_damage, t_kills, t_deaths, t_assists, t_damage,
+         ct_count, t_count) in rows_out:
+        CT_score, T_score = board["CT_score"], board["T_score"]
+        scoreboard_data = {
+            "players": players,
+            "CT_score": CT_score,
+            "T_score": T_score,
+            "total_players": len(players),
+            "match_summary": {
+                "total_kills": kills,
+                "total_deaths": deaths,
+                "total_assists": assists,
+                "total_damage": damage,
+                "average_headshot_percentage": headshots / len(players) if players else 0
+            },
+            "team_stats": {
+                "CT": {
+                    "score": CT_score,
+                    "player_count": ct_count,
+                    "total_kills": ct_kills,
+                    "total_deaths": ct_deaths,
+                    "total_assists": ct_assists,
+                    "total_damage": ct_damage
+                },
+                "T": {
+                    "score": T_score,
+                    "player_count": t_count,
+                    "total_kills": t_kills,
+                    "total_deaths": t_deaths,
+                    "total_assists": t_assists,
+                    "total_damage": t_damage
+                }
+            }
+        }
+        if players:
+            top_killer, top_dmg, top_hs = players[i_kills], players[i_damage], players[i_headshot]
+            scoreboard_data["top_performers"] = {
+                "most_kills": {
+                    "player": top_killer.get("player"),
+                    "kills": top_killer.get("Kills", 0)
+                },
+                "most_damage": {
+                    "player": top_dmg.get("player"),
+                    "damage": top_dmg.get("DMG", 0)
+                },
+                "best_headshot_percentage": {
+                    "player": top_hs.get("player"),
+                    "headshot_percentage": top_hs.get("HeadshotPerc", 0)
+                }
+            }
+        results.append(scoreboard_data)
+    return results
@@ -0,0 +1,84 @@
+"""
+Throughput benchmark for scoreboard OCR over the images in testImages/.
+
+    python benchmark.py                       # in-process, serial vs process pool
+    python benchmark.py --url http://localhost:5003/ocr --concurrency 8
+
+Each image is recognised --repeat times per mode; results are printed as
+images per second and mean/p95 latency.
+"""
+
+import argparse
+import os
+import pathlib
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import scoreboard
+
+IMAGES = pathlib.Path(__file__).resolve().parent.parent / "testImages"
+
+
+def _timed(data):
+    started = time.perf_counter()
+    scoreboard.read_scoreboard(data)
+    return time.perf_counter() - started
+
+
+def _post(url, name, data):
+    import requests
+    started = time.perf_counter()
+    response = requests.post(url, files={"file": (name, data)}, timeout=60)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def report(mode, wall, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{mode:<22} {len(latencies) / wall:8.1f} img/s   "
+          f"mean {statistics.mean(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", default=str(IMAGES))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--url", help="benchmark a running /ocr endpoint instead")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel requests with --url")
+    args = parser.parse_args()
+
+    files = sorted(pathlib.Path(args.images).glob("*.jpg"))
+    if not files:
+        parser.error(f"no .jpg images in {args.images}")
+    batch = [(f.name, f.read_bytes()) for f in files] * args.repeat
+    print(f"{len(files)} images x {args.repeat} = {len(batch)} recognitions")
+
+    if args.url:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            started = time.perf_counter()
+            latencies = list(pool.map(lambda item: _post(args.url, *item), batch))
+            report(f"http x{args.concurrency}", time.perf_counter() - started, latencies)
+        return
+
+    for name, data in batch[:len(files)]:
+        result = scoreboard.read_scoreboard(data)
+        print(f"  {name}: layout={result['layout']} players={len(result['players'])} "
+              f"CT {result['CT_score']} - {result['T_score']} T")
+
+    started = time.perf_counter()
+    latencies = [_timed(data) for _, data in batch]
+    report("serial", time.perf_counter() - started, latencies)
+
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_timed, [data for _, data in batch[:workers]]))  # warm up workers
+        started = time.perf_counter()
+        latencies = list(pool.map(_timed, [data for _, data in batch], chunksize=4))
+        report(f"process pool x{workers}", time.perf_counter() - started, latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,277 @@
-from flask import Flask, request, jsonify
-from PIL import Image
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, TimeoutError, wait
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
+from PIL import UnidentifiedImageError
+import base64
 import io
+import json
+import os
+import tempfile
+import time
+
+import phash
+import scoreboard
+from instrumentation import instrument
+
+# Recognition is CPU-bound: run it in worker processes so one upload does not
+# hold the GIL for every other request this server is handling
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT_S", "30"))
+pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+
+SPOOL_DIR = os.getenv("OCR_SPOOL_DIR") or None  # default: the system temp dir
+BATCH_MAX_IMAGES = int(os.getenv("OCR_BATCH_MAX_IMAGES", "500"))
+# Images decoded/queued ahead of the workers; bounds temp files held at once
+BATCH_INFLIGHT = int(os.getenv("OCR_BATCH_INFLIGHT", str(OCR_WORKERS * 2)))
+
+# Results of earlier uploads, reused for re-uploads of the same screenshot
+dedup = phash.PHashCache(
+    max_entries=int(os.getenv("OCR_CACHE_ENTRIES", "4096")),
+    max_distance=int(os.getenv("OCR_CACHE_MAX_DISTANCE", "8")),
+    tolerance=int(os.getenv("OCR_CACHE_TOLERANCE", "6")),
+    path=os.getenv("OCR_CACHE_PATH") or None,
+)
+
+
+class SpoolingRequest(Request):
+    """
+    Write file uploads straight to named temp files so workers can open them
+    by path. The files outlive the request (a streamed batch response keeps
+    using them), so views remove them with remove_spooled().
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spooled = tempfile.NamedTemporaryFile("w+b", prefix="ocr-", dir=SPOOL_DIR, delete=False)
+        self.__dict__.setdefault("spooled", []).append(spooled.name)
+        return spooled
+
+    def remove_spooled(self):
+        for path in self.__dict__.pop("spooled", ()):
+            _remove(path)
+
 
 app = Flask(__name__)
+app.request_class = SpoolingRequest
+metrics = instrument(app, "ocr")
+metrics.gauges("ocr_cache", dedup.snapshot)
+
+
+def _source(upload):
+    """Path of a spooled upload (nothing to copy to the worker), else its bytes"""
+    name = getattr(upload.stream, "name", None)
+    if isinstance(name, str):
+        if not upload.stream.closed:
+            upload.stream.flush()
+        return name
+    return upload.read()
+
+
+def _remove(path):
+    if path:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
 
 @app.post("/ocr")
 def ocr():
-    # PoC stub: accept an image, pretend to extract stats, return constants
-    if "file" not in request.files:
-        return jsonify({"error": "missing file"}), 400
-    _ = Image.open(io.BytesIO(request.files["file"].read()))  # ensures it's a real image
-    return jsonify({"kda": 1.05, "adr": 62.3, "rounds": 24})
+    """
+    Extract a CS2 scoreboard from an uploaded screenshot.
+    multipart "file", optional form field "layout" (whole | scores_only; detected
+    from the aspect ratio otherwise). Returns the arguments of save_cs2_scoreboard:
+    {"players": [...], "CT_score": n, "T_score": n} plus "layout", "took_ms"
+    and "cache" (hit, hash_ms, ...).
+    """
+    started = time.perf_counter()
+    try:
+        # Inside the try: parsing the form may already have spooled other fields' files
+        if "file" not in request.files:
+            return jsonify({"error": "missing file"}), 400
+        source = _source(request.files["file"])
+        fp = pool.submit(phash.fingerprint, source, request.form.get("layout")).result(timeout=OCR_TIMEOUT)
+        result = _cached(fp)
+        if result is None:
+            # Only the spooled path crosses to the worker again, never decoded pixels
+            result = _store(fp, pool.submit(scoreboard.read_scoreboard, source, fp[2]).result(timeout=OCR_TIMEOUT))
+    except (ValueError, UnidentifiedImageError) as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError:
+        return jsonify({"error": "ocr timed out"}), 504
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        request.remove_spooled()
+    result["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(result)
+
+
+def _cached(fp):
+    """Copy of the cached result for a fingerprint, with cache metadata, or None"""
+    phash_, sig, layout, hash_ms = fp
+    hit = dedup.get(phash_, sig, hash_ms)
+    if hit is None:
+        return None
+    result, distance = hit
+    return dict(result, layout=layout, cache={
+        "hit": True, "distance": distance, "hash_ms": hash_ms, "hit_ratio": dedup.snapshot()["hit_ratio"],
+    })
+
+
+def _store(fp, result):
+    """Cache a fresh result and add cache metadata to the copy being returned"""
+    phash_, sig, _, hash_ms = fp
+    dedup.put(phash_, sig, result)
+    return dict(result, cache={"hit": False, "hash_ms": hash_ms, "hit_ratio": dedup.snapshot()["hit_ratio"]})
+
+
+@app.post("/ocr/batch")
+def ocr_batch():
+    """
+    Extract many scoreboards in one request; results stream back as NDJSON in
+    completion order, one line per image:
+    {"index": i, "name": ..., "result": {...}} or {"index": i, "name": ..., "error": "..."}.
+
+    Accepts either
+      multipart/form-data with any number of file fields (images, or base64
+      text files like testImages/*.base64.txt), or
+      a text body with one image per line: raw base64, or
+      {"name": ..., "data": "<base64>"}; lines are read as workers free up.
+    Optional ?layout= applies to every image.
+    """
+    layout = request.args.get("layout") or request.form.get("layout")
+    if request.mimetype == "multipart/form-data":
+        uploads = request.files.getlist("file") or [f for _, f in request.files.items(multi=True)]
+        error = None if uploads else "missing file"
+        if len(uploads) > BATCH_MAX_IMAGES:
+            error = f"at most {BATCH_MAX_IMAGES} images per request"
+        if error:
+            request.remove_spooled()
+            return jsonify({"error": error}), 400
+        items = (_from_upload(upload) for upload in uploads)
+    else:
+        items = _from_lines(request.stream)
+
+    def generate():
+        # future -> (index, name, source, temp path to remove or None, fingerprint);
+        # fingerprint is None while the future is still computing it
+        pending = {}
+        try:
+            try:
+                for index, (name, source, cleanup) in enumerate(items):
+                    if index >= BATCH_MAX_IMAGES:
+                        _remove(cleanup)
+                        yield json.dumps({"error": f"at most {BATCH_MAX_IMAGES} images per request"}) + "\n"
+                        break
+                    if isinstance(source, Exception):
+                        yield json.dumps({"index": index, "name": name, "error": str(source)}) + "\n"
+                        continue
+                    pending[pool.submit(phash.fingerprint, source, layout)] = (index, name, source, cleanup, None)
+                    while len(pending) >= BATCH_INFLIGHT:
+                        yield from _drain(pending)
+            except OSError as e:
+                yield json.dumps({"error": f"upload failed: {e}"}) + "\n"
+            while pending:
+                yield from _drain(pending)
+        finally:
+            # Client went away mid-stream: drop queued work and its temp files
+            for future, (_, _, _, cleanup, _) in pending.items():
+                future.cancel()
+                _remove(cleanup)
+            request.remove_spooled()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _drain(pending):
+    done, _ = wait(pending, timeout=OCR_TIMEOUT, return_when=FIRST_COMPLETED)
+    if not done:
+        # Nothing finished within the timeout: fail the oldest instead of hanging
+        done = [min(pending, key=lambda f: pending[f][0])]
+    for future in done:
+        index, name, source, cleanup, fp = pending.pop(future)
+        line = {"index": index, "name": name}
+        if not future.done():
+            future.cancel()
+            line["error"] = "ocr timed out"
+        else:
+            try:
+                if fp is None:
+                    fp = future.result()
+                    line["result"] = _cached(fp)
+                    if line["result"] is None:
+                        # Not seen before: queue the actual recognition on the same temp file
+                        pending[pool.submit(scoreboard.read_scoreboard, source, fp[2])] = (
+                            index, name, source, cleanup, fp)
+                        continue
+                else:
+                    line["result"] = _store(fp, future.result())
+            except UnidentifiedImageError:
+                line["error"] = "not a readable image"
+            except Exception as e:
+                line["error"] = str(e)
+        _remove(cleanup)
+        yield json.dumps(line) + "\n"
+
+
+def _from_upload(upload):
+    """
+    (name, source, temp path to remove) for one multipart file; source is
+    a ValueError if the upload cannot be decoded.
+    """
+    source = _source(upload)
+    if upload.mimetype == "text/plain" or (upload.filename or "").endswith(".txt"):
+        try:
+            with open(source, "rb") if isinstance(source, str) else io.BytesIO(source) as text:
+                return (upload.filename, *_decode_to_file(iter(lambda: text.read(1 << 16), b"")))
+        except ValueError as e:
+            return upload.filename, e, None
+    return upload.filename, source, None
+
+
+def _from_lines(stream):
+    """(name, source, temp path to remove) per line of a request body, as for _from_upload"""
+    for number, line in enumerate(stream):
+        line = line.strip()
+        if not line:
+            continue
+        name = f"line {number + 1}"
+        try:
+            if line.startswith(b"{"):
+                item = json.loads(line)
+                name, line = item.get("name", name), item["data"].encode()
+            yield (name, *_decode_to_file([line]))
+        except (ValueError, KeyError, AttributeError) as e:
+            yield name, ValueError(f"bad input: {e}"), None
+
+
+def _decode_to_file(chunks):
+    """Decode base64 text into a temp file; returns (path, path) so it is removed after use"""
+    out = tempfile.NamedTemporaryFile("wb", prefix="ocr-", suffix=".img", dir=SPOOL_DIR, delete=False)
+    try:
+        with out:
+            rest = b""
+            for chunk in chunks:
+                data = rest + b"".join(chunk.split())
+                usable = len(data) - len(data) % 4
+                out.write(base64.b64decode(data[:usable], validate=True))
+                rest = data[usable:]
+            if rest:
+                out.write(base64.b64decode(rest + b"=" * (-len(rest) % 4), validate=True))
+    except Exception:
+        _remove(out.name)
+        raise ValueError("invalid base64 image") from None
+    return out.name, out.name
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit ratio, hash time and size of the duplicate-screenshot cache"""
+    return jsonify(dedup.snapshot())
+
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return {"ok": True, "workers": OCR_WORKERS, "names": scoreboard.tesseract_available()}
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5003)
@@ -0,0 +1,205 @@
+"""
+Near-duplicate detection for scoreboard screenshots.
+
+Players re-upload the same screenshot, often re-saved or rescaled. Every
+image gets a 128-bit perceptual hash (dHash + aHash of the downscaled
+grayscale table) that is stable under re-encoding, plus an ink signature:
+the number of text pixels in every stat cell and round-history slot.
+
+A perceptual hash alone cannot tell two screenshots of the same match a
+few kills apart - a changed digit is invisible at hash resolution - so a
+cached result is only reused when the hash is within max_distance bits
+*and* no cell's ink count differs by more than tolerance pixels.
+
+Lookups do not scan the cache: the hash is split into max_distance + 1
+chunks, and by the pigeonhole principle any hash within max_distance bits
+equals the query on at least one of them, so only entries sharing a chunk
+value are compared.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+import scoreboard
+
+HASH_SIZE = 8     # 8x8 grid -> 64-bit aHash and 64-bit dHash
+HASH_BITS = 2 * HASH_SIZE * HASH_SIZE
+TEXT_INK = 140    # same brightness cut-off as the digit masks
+
+
+def _ahash(gray):
+    small = np.asarray(Image.fromarray(gray).resize((HASH_SIZE, HASH_SIZE), Image.BOX))
+    return small > small.mean()
+
+
+def _dhash(gray):
+    small = np.asarray(Image.fromarray(gray).resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX))
+    return small[:, 1:] > small[:, :-1]
+
+
+def _bits_to_int(bits):
+    return int("".join("1" if b else "0" for b in bits.ravel()), 2)
+
+
+def signature(table):
+    """Text pixels per name/stat cell and per round-history slot"""
+    counts = []
+    for top in scoreboard.TEAM_TOPS.values():
+        for i in range(scoreboard.TEAM_ROWS):
+            y0, y1 = top + i * scoreboard.ROW_PITCH, top + (i + 1) * scoreboard.ROW_PITCH
+            for x0, x1 in (scoreboard.NAME_COLUMN, *scoreboard.STAT_COLUMNS.values()):
+                counts.append(int((table[y0:y1, x0:x1] > TEXT_INK).sum()))
+    for y0, y1 in scoreboard.ROUND_BANDS.values():
+        for half in scoreboard.ROUND_HALVES:
+            for slot in range(12):
+                x0 = half + slot * scoreboard.ROUND_SLOT
+                counts.append(int((table[y0:y1, x0:x0 + scoreboard.ROUND_SLOT] > scoreboard.ROUND_INK).sum()))
+    return np.array(counts, dtype=np.int32)
+
+
+def fingerprint(source, layout=None):
+    """
+    (phash, signature, layout, hash_ms) for image bytes or a file path.
+    Runs in the OCR worker pool, like read_scoreboard; only these few values
+    come back, so a cache miss sends read_scoreboard the spooled path rather
+    than a decoded table.
+    """
+    started = time.perf_counter()
+    rgb, layout = scoreboard.load_table(source, layout)
+    table = scoreboard.grayscale(rgb)
+    gray = table.astype(np.uint8)
+    phash = (_bits_to_int(_dhash(gray)) << 64) | _bits_to_int(_ahash(gray))
+    return phash, signature(table), layout, round((time.perf_counter() - started) * 1000, 3)
+
+
+class _Entry:
+    __slots__ = ("phash", "signature", "result")
+
+    def __init__(self, phash, signature, result):
+        self.phash = phash
+        self.signature = signature
+        self.result = result
+
+
+class PHashCache:
+    """Bounded LRU of OCR results keyed by fingerprint, optionally persisted to SQLite"""
+
+    def __init__(self, max_entries=4096, max_distance=8, tolerance=6, path=None):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.tolerance = tolerance
+        self._entries = OrderedDict()  # id -> _Entry, least recently used first
+        # Hash chunk boundaries and, per chunk, chunk value -> ids of the entries having it
+        chunks = min(max_distance + 1, HASH_BITS)
+        bounds = [HASH_BITS * i // chunks for i in range(chunks + 1)]
+        self._chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._buckets = [{} for _ in self._chunks]
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "hash_ms_total": 0.0}
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS ocr_results(
+                id INTEGER PRIMARY KEY,
+                phash TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                result TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT id, phash, signature, result FROM ocr_results ORDER BY last_access DESC LIMIT ?",
+                (max_entries,)).fetchall()
+            for row_id, phash, sig, result in reversed(rows):
+                self._add(row_id, _Entry(int(phash, 16), np.frombuffer(sig, dtype=np.int32), json.loads(result)))
+            self._next_id = self._db.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM ocr_results").fetchone()[0]
+            # Drop whatever no longer fits (max_entries may have shrunk)
+            self._db.execute("""DELETE FROM ocr_results WHERE id NOT IN
+                (SELECT id FROM ocr_results ORDER BY last_access DESC LIMIT ?)""", (max_entries,))
+            self._db.commit()
+
+    def _add(self, entry_id, entry):
+        self._entries[entry_id] = entry
+        for bucket, (shift, mask) in zip(self._buckets, self._chunks):
+            bucket.setdefault((entry.phash >> shift) & mask, set()).add(entry_id)
+
+    def _drop(self, entry_id, entry):
+        for bucket, (shift, mask) in zip(self._buckets, self._chunks):
+            key = (entry.phash >> shift) & mask
+            ids = bucket[key]
+            ids.discard(entry_id)
+            if not ids:
+                del bucket[key]
+
+    def _candidates(self, phash):
+        """Ids of the entries sharing at least one hash chunk with phash"""
+        found = set()
+        for bucket, (shift, mask) in zip(self._buckets, self._chunks):
+            found.update(bucket.get((phash >> shift) & mask, ()))
+        return found
+
+    def get(self, phash, sig, hash_ms=0.0):
+        """
+        Cached result for a near-identical image, or None.
+        Returns (result, hamming distance) on a hit.
+        """
+        with self._lock:
+            self.stats["hash_ms_total"] += hash_ms
+            best = None
+            for entry_id in self._candidates(phash):
+                entry = self._entries[entry_id]
+                distance = (entry.phash ^ phash).bit_count()
+                if distance > self.max_distance or (best and distance >= best[1]):
+                    continue
+                if len(entry.signature) == len(sig) and np.abs(entry.signature - sig).max() <= self.tolerance:
+                    best = (entry_id, distance)
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            entry_id, distance = best
+            self._entries.move_to_end(entry_id)
+            self.stats["hits"] += 1
+            if self._db is not None:
+                self._db.execute("UPDATE ocr_results SET last_access=? WHERE id=?", (time.time(), entry_id))
+                self._db.commit()
+            return self._entries[entry_id].result, distance
+
+    def put(self, phash, sig, result):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._add(entry_id, _Entry(phash, sig, result))
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                old_id, old = self._entries.popitem(last=False)
+                self._drop(old_id, old)
+                evicted.append(old_id)
+            self.stats["evictions"] += len(evicted)
+            if self._db is not None:
+                self._db.execute("INSERT INTO ocr_results(id, phash, signature, result, last_access) VALUES(?,?,?,?,?)",
+                                 (entry_id, format(phash, "032x"), sig.astype(np.int32).tobytes(),
+                                  json.dumps(result), time.time()))
+                self._db.executemany("DELETE FROM ocr_results WHERE id=?", [(i,) for i in evicted])
+                self._db.commit()
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self.stats)
+            hash_ms = out.pop("hash_ms_total")
+            lookups = out["hits"] + out["misses"]
+            out.update({
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_ratio": round(out["hits"] / lookups, 4) if lookups else 0.0,
+                "mean_hash_ms": round(hash_ms / lookups, 3) if lookups else 0.0,
+                "persistent": self._db is not None,
+            })
+        return out
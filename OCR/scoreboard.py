@@ -0,0 +1,302 @@
+"""
+Scoreboard extraction for CS2 end-of-round screenshots.
+
+The scoreboard table always has the same geometry relative to its top-left
+corner, so each supported layout is just the table's origin and reference
+width. Cells are cropped at fixed offsets, preprocessed with NumPy
+(grayscale, per-cell Otsu threshold, height-normalised resize) and digits
+are recognised by template matching against the scoreboard font. Player
+names need a real text engine: Tesseract is used when it is installed,
+otherwise names fall back to their table position.
+
+Team scores are not printed in every layout, so they are counted from the
+round-history strip instead (one skull per round won, CT above, T below).
+"""
+
+import io
+import shutil
+
+import numpy as np
+from PIL import Image
+
+try:
+    import pytesseract
+except ImportError:  # optional: only needed for player names
+    pytesseract = None
+
+# ---- Layouts -----------------------------------------------
+# Table coordinates are in pixels of the table at its reference size
+# (scores_only.jpg); other resolutions are resampled to it first.
+TABLE_SIZE = (680, 354)
+LAYOUTS = {
+    # full 4:3 screenshot with the scoreboard open (scoreboard_whole.jpg)
+    "whole": {"size": (1280, 960), "origin": (371, 343)},
+    # the table cropped on its own (scores_only.jpg)
+    "scores_only": {"size": (680, 354), "origin": (0, 0)},
+}
+
+ROW_PITCH = 23
+TEAM_ROWS = 5
+TEAM_TOPS = {"CT": 2, "T": 237}
+NAME_COLUMN = (46, 330)
+STAT_COLUMNS = {
+    "Kills": (440, 488),
+    "Deaths": (488, 532),
+    "Assists": (532, 576),
+    "HeadshotPerc": (576, 626),
+    "DMG": (626, 680),
+}
+
+# Round history: 12 slots per half, 18 px apart, with a gap between halves
+ROUND_SLOT = 18
+ROUND_HALVES = (54, 290)
+ROUND_BANDS = {"CT": (165, 183), "T": (193, 211)}
+ROUND_INK = 110        # skull pixels are brighter than this
+ROUND_MIN_PIXELS = 20  # an empty slot has next to none
+# CT skulls are tinted blue and T skulls orange; the neutral trophy icon is neither
+ROUND_TINT = {"CT": (-1.0, 0.0, 1.0), "T": (1.0, 0.0, -1.0)}
+ROUND_MIN_TINT = 12
+
+# ---- Digit templates ---------------------------------------
+GLYPH_H, GLYPH_W = 12, 10
+
+# Mean of every labelled digit in testImages/ at 1x, 1.25x, 1.5x and 2x,
+# one hex digit (0-15) per pixel of a GLYPH_H x GLYPH_W glyph
+_TEMPLATE_HEX = {
+    "0": "0158a841000bdeeec8000ee748ed000ed515de000ec505dd000ec515dd000ec505dd000ed505ed000ec505dd000ed626ed000deb9bec0009deeec600",
+    "1": "011475000006bdd810000bcde910000449d910000008d910000008d910000008d910000008d910000008d910000128d92100068cec86200ceeeeed50",
+    "2": "015786200009ddddb5000dd748da000db415dc00054116dc0000147ad800036acb730009db8510000ed51000000ec52221000eda8875000deeeeeb00",
+    "3": "014786300009cdedb6000dd748eb000ca415dc00054216dc0001578bd800006bcdd800003569ec00043105dd000db526dd000dea8beb0008deeeb400",
+    "4": "00025520000014a930000028b71000003ab50000016b94320002ab65860004ca57c91017db9adb5018cddeeea004678bdb50000027c900000027b800",
+    "5": "06888874000ceeeed9000ed73333000dc40000000dd98851000eedddb6000dda7aeb00088305dd00043105dc000a9426dc000dea8beb0007ceeeb400",
+    "6": "014786310009cdddc6000dd747db000eb40499000eb41243000eda9984000eecbbda000ed847dd000eb404cd000eb525cd000dda7aeb0007ceeec500",
+    "7": "08999986000deeddec000ec648eb000d8349c40005316db10000029c71000006ba30000019d81000003ab50000019d81010002bc60000006c7200000",
+    "8": "01489730000adeedc7000de748ec000ed515ed000ed516ed000dea8bda000dedcdea000ed869ed000ec405dd000ec526dd000dea9bec0009deeec700",
+    "9": "01589741000bdeedc8000ed748ec000ec406ed000ec416ed000ee98bed000bdddefd0005888aed00054116ed000dc527ed000deb9beb0008cdddb500",
+}
+
+
+def _decode_templates(encoded):
+    digits = sorted(encoded)
+    bank = np.stack([
+        np.array([int(c, 16) for c in encoded[d]], dtype=np.float32).reshape(GLYPH_H, GLYPH_W) / 15
+        for d in digits
+    ])
+    return digits, bank
+
+
+# ---- Preprocessing -----------------------------------------
+def detect_layout(size):
+    """Layout whose aspect ratio matches an image of size (w, h), or None"""
+    w, h = size
+    for name, layout in LAYOUTS.items():
+        lw, lh = layout["size"]
+        if abs(w / h - lw / lh) < 0.03 * lw / lh:
+            return name
+    return None
+
+
+def load_table(source, layout=None):
+    """
+    Decode an image (bytes or a file path), crop the scoreboard table and
+    return it as a float32 RGB array at TABLE_SIZE, together with the layout.
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    layout = layout or detect_layout(image.size)
+    if layout not in LAYOUTS:
+        raise ValueError(f"unsupported scoreboard layout; expected one of {sorted(LAYOUTS)}")
+    # JPEGs larger than the reference are decoded at a reduced DCT scale
+    # (1/2, 1/4, 1/8) straight away instead of decoding full size and shrinking
+    image.draft("RGB", LAYOUTS[layout]["size"])
+    scale = image.width / LAYOUTS[layout]["size"][0]
+    ox, oy = LAYOUTS[layout]["origin"]
+    box = (round(ox * scale), round(oy * scale),
+           round((ox + TABLE_SIZE[0]) * scale), round((oy + TABLE_SIZE[1]) * scale))
+    table = image.convert("RGB").crop(box)
+    if table.size != TABLE_SIZE:
+        table = table.resize(TABLE_SIZE, Image.LANCZOS)
+    return np.asarray(table, dtype=np.float32), layout
+
+
+def _otsu(pixels):
+    hist, _ = np.histogram(pixels, bins=256, range=(0, 256))
+    total = hist.sum()
+    if total == 0:
+        return 128.0
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = total - w0
+    m0 = np.cumsum(hist * levels)
+    mean0 = m0 / np.maximum(w0, 1)
+    mean1 = (m0[-1] - m0) / np.maximum(w1, 1)
+    between = w0 * w1 * (mean0 - mean1) ** 2
+    return float(np.argmax(between))
+
+
+def binarize(cell):
+    """Light-on-dark text mask; empty if the cell has no contrast"""
+    if cell.size == 0 or cell.max() - cell.min() < 40:
+        return np.zeros(cell.shape, dtype=bool)
+    return cell > _otsu(cell)
+
+
+def stretch(cell, mask):
+    """Cell contrast-stretched to [0, 1] between background and ink levels"""
+    lo = np.median(cell[~mask]) if (~mask).any() else cell.min()
+    hi = np.percentile(cell[mask], 90) if mask.any() else cell.max()
+    return np.clip((cell - lo) / max(hi - lo, 1.0), 0.0, 1.0)
+
+
+def split_glyphs(mask, min_pixels=4):
+    """Bounding boxes (y0, y1, x0, x1) of the glyphs in a binary cell, left to right"""
+    cols = mask.any(axis=0)
+    boxes = []
+    x = 0
+    while x < len(cols):
+        if not cols[x]:
+            x += 1
+            continue
+        start = x
+        while x < len(cols) and cols[x]:
+            x += 1
+        boxes.extend(_separate(mask, start, x, min_pixels))
+    return boxes
+
+
+def _separate(mask, x0, x1, min_pixels):
+    """Trim a glyph to its rows, splitting touching digits at their thinnest column"""
+    glyph = mask[:, x0:x1]
+    rows = np.flatnonzero(glyph.any(axis=1))
+    if glyph.sum() < min_pixels or not len(rows):
+        return []
+    y0, y1 = rows[0], rows[-1] + 1
+    h, w = y1 - y0, x1 - x0
+    if w <= 0.9 * h:
+        return [(y0, y1, x0, x1)]
+    # Wider than any single digit: JPEG blur has joined two of them
+    lo, hi = int(w * 0.3), max(int(w * 0.7), int(w * 0.3) + 1)
+    cut = x0 + lo + int(np.argmin(glyph[y0:y1, lo:hi].sum(axis=0)))
+    return _separate(mask, x0, cut, min_pixels) + _separate(mask, cut + 1, x1, min_pixels)
+
+
+def normalise_glyph(glyph):
+    """Scale a [0, 1] glyph to GLYPH_H rows keeping its aspect, centred in GLYPH_W columns"""
+    h, w = glyph.shape
+    width = max(1, min(GLYPH_W, round(w * GLYPH_H / h)))
+    scaled = Image.fromarray(glyph.astype(np.float32), mode="F").resize((width, GLYPH_H), Image.BILINEAR)
+    out = np.zeros((GLYPH_H, GLYPH_W), dtype=np.float32)
+    left = (GLYPH_W - width) // 2
+    out[:, left:left + width] = np.asarray(scaled)
+    return out
+
+
+def glyphs(cell):
+    """Normalised glyph images found in a cell, left to right"""
+    mask = binarize(cell)
+    if not mask.any():
+        return []
+    ink = stretch(cell, mask)
+    # Re-threshold below Otsu so faint antialiased edges stay part of the glyph box
+    mask = ink > 0.3
+    return [normalise_glyph(ink[y0:y1, x0:x1]) for y0, y1, x0, x1 in split_glyphs(mask)]
+
+
+class TemplateDigits:
+    """Nearest-template digit classifier for the scoreboard font"""
+
+    def __init__(self, encoded=None):
+        self.digits, self.bank = _decode_templates(encoded or _TEMPLATE_HEX)
+
+    def read(self, cell):
+        found = glyphs(cell)
+        if not found:
+            return None
+        batch = np.stack(found)
+        # Sum of squared differences of every glyph against every template
+        d = ((batch[:, None] - self.bank[None]) ** 2).sum(axis=(2, 3))
+        return int("".join(self.digits[i] for i in d.argmin(axis=1)))
+
+
+def tesseract_available():
+    return pytesseract is not None and shutil.which("tesseract") is not None
+
+
+def read_name(cell):
+    """Player name via Tesseract, or None when it is not installed"""
+    if not tesseract_available():
+        return None
+    mask = binarize(cell)
+    if not mask.any():
+        return None
+    h, w = mask.shape
+    # Tesseract wants dark text on white, a few times larger than the HUD font
+    image = Image.fromarray(np.where(mask, 0, 255).astype(np.uint8)).resize((w * 3, h * 3), Image.LANCZOS)
+    text = pytesseract.image_to_string(image, config="--psm 7").strip()
+    return text or None
+
+
+# ---- Extraction --------------------------------------------
+_digits = None
+
+
+def _digit_reader():
+    global _digits
+    if _digits is None:
+        _digits = TemplateDigits()
+    return _digits
+
+
+def grayscale(rgb):
+    """ITU-R 601 luma, the same weights PIL uses for mode L"""
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def count_rounds(rgb, gray):
+    """Rounds won per team, counted from the skulls in the round-history strip"""
+    wins = {}
+    for team, (y0, y1) in ROUND_BANDS.items():
+        tint = np.array(ROUND_TINT[team], dtype=np.float32)
+        won = 0
+        for half in ROUND_HALVES:
+            for slot in range(12):
+                x0 = half + slot * ROUND_SLOT
+                ink = gray[y0:y1, x0:x0 + ROUND_SLOT] > ROUND_INK
+                if ink.sum() < ROUND_MIN_PIXELS:
+                    continue
+                if (rgb[y0:y1, x0:x0 + ROUND_SLOT][ink] @ tint).mean() >= ROUND_MIN_TINT:
+                    won += 1
+        wins[team] = won
+    return wins
+
+
+def read_scoreboard(source, layout=None):
+    """
+    Extract the scoreboard from image bytes or an image file path.
+
+    Returns {"players": [...], "CT_score", "T_score", "layout"} where each
+    player has the fields save_cs2_scoreboard expects. Raises ValueError if
+    the image does not match a known layout.
+    """
+    rgb, layout = load_table(source, layout)
+    table = grayscale(rgb)
+    digits = _digit_reader()
+
+    players = []
+    for team, top in TEAM_TOPS.items():
+        for i in range(TEAM_ROWS):
+            y0, y1 = top + i * ROW_PITCH, top + (i + 1) * ROW_PITCH
+            stats = {field: digits.read(table[y0:y1, x0:x1]) for field, (x0, x1) in STAT_COLUMNS.items()}
+            if all(v is None for v in stats.values()):
+                continue  # empty slot (fewer than five players)
+            name = read_name(table[y0:y1, NAME_COLUMN[0]:NAME_COLUMN[1]])
+            player = {"player": name or f"{team} player {i + 1}", "team": team}
+            player.update({field: value or 0 for field, value in stats.items()})
+            players.append(player)
+
+    rounds = count_rounds(rgb, table)
+    return {
+        "players": players,
+        "CT_score": rounds["CT"],
+        "T_score": rounds["T"],
+        "layout": layout,
+    }
@@ -0,0 +1,64 @@
+"""
+Micro-batching for upstream lookups that accept many keys per call.
+
+Single-key requests arriving within a short window are collected and sent
+upstream together, e.g. concurrent /steam/user/<steamid> lookups become one
+GetPlayerSummaries call with up to 100 steamids.
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, fetch_many, window=0.005, max_batch=100):
+        """
+        fetch_many: callable(list of keys) -> dict of key -> value; keys
+                    missing from the result resolve to KeyError.
+        window: seconds to wait for more keys after the first one arrives.
+        """
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}  # key -> Future, in arrival order
+        self._lock = threading.Lock()
+        self._full = threading.Condition(self._lock)
+        self._timer_running = False
+        self.stats = {"batches": 0, "keys": 0}
+
+    def submit(self, key):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+            if len(self._pending) >= self.max_batch:
+                self._full.notify()
+            if not self._timer_running:
+                self._timer_running = True
+                threading.Thread(target=self._run, daemon=True).start()
+        return future
+
+    def _run(self):
+        with self._lock:
+            # Wait out the window unless the batch fills up first
+            self._full.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.window)
+            keys = list(self._pending)[:self.max_batch]
+            batch = {k: self._pending.pop(k) for k in keys}
+            self._timer_running = False
+            if self._pending:
+                # Overflow starts the next window straight away
+                self._timer_running = True
+                threading.Thread(target=self._run, daemon=True).start()
+            self.stats["batches"] += 1
+            self.stats["keys"] += len(batch)
+        try:
+            found = self.fetch_many(keys)
+        except BaseException as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if key in found:
+                future.set_result(found[key])
+            else:
+                future.set_exception(KeyError(key))
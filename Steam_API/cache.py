@@ -0,0 +1,167 @@
+"""
+In-process response cache for Steam upstream calls.
+
+Bounded LRU with a TTL per entry. Expired entries are still served for a
+stale-while-revalidate window while a background thread refreshes them, and
+failed lookups (e.g. upstream 404s) can be cached for a shorter negative TTL.
+Concurrent misses for the same key are coalesced into a single fetch.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class CachedError(Exception):
+    """A negatively cached upstream failure, re-raised on every hit"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Entry:
+    __slots__ = ("value", "error", "expires", "stale_until")
+
+    def __init__(self, value, error, expires, stale_until):
+        self.value = value
+        self.error = error
+        self.expires = expires
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    def __init__(self, maxsize=10000, stale_seconds=300.0, negative_ttl=60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.stale_seconds = stale_seconds
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._refreshing = set()
+        self._inflight = {}  # key -> Future of the fetch already running
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    def get_or_fetch(self, key, ttl, fetch, negative=()):
+        """
+        Return the cached value for key, calling fetch() on a miss.
+
+        ttl: seconds a fetched value stays fresh.
+        negative: exception types from fetch() to cache for negative_ttl;
+                  they must carry a .status and are re-raised as CachedError.
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if now < entry.expires:
+                    self._data.move_to_end(key)
+                    self.stats["negative_hits" if entry.error else "hits"] += 1
+                    return self._unwrap(entry)
+                if now < entry.stale_until and entry.error is None:
+                    self._data.move_to_end(key)
+                    self.stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, ttl, fetch, negative),
+                                         daemon=True).start()
+                    return entry.value
+            self.stats["misses"] += 1
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.stats["coalesced"] += 1
+            else:
+                future = self._inflight[key] = Future()
+        if pending is not None:
+            return pending.result()
+        return self._load(key, ttl, fetch, negative, future)
+
+    def _load(self, key, ttl, fetch, negative, future):
+        """Fetch and store key, then hand the outcome to any coalesced waiters"""
+        try:
+            try:
+                value = fetch()
+            except negative as e:
+                self._store(key, _Entry(None, e, self._clock() + self.negative_ttl, 0))
+                raise CachedError(getattr(e, "status", 404), str(e)) from e
+            now = self._clock()
+            self._store(key, _Entry(value, None, now + ttl, now + ttl + self.stale_seconds))
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value=value)
+        return value
+
+    def _settle(self, key, future, value=None, error=None):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def _refresh(self, key, ttl, fetch, negative):
+        try:
+            self._load(key, ttl, fetch, negative, Future())
+            with self._lock:
+                self.stats["refreshes"] += 1
+        except Exception:
+            # Keep serving the stale value until its window closes
+            with self._lock:
+                self.stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def peek(self, key):
+        """Return (True, value) for a fresh positive entry without fetching, else (False, None)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.error is not None or self._clock() >= entry.expires:
+                return False, None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return True, entry.value
+
+    def put(self, key, value, ttl):
+        now = self._clock()
+        self._store(key, _Entry(value, None, now + ttl, now + ttl + self.stale_seconds))
+
+    def put_negative(self, key, error):
+        self._store(key, _Entry(None, error, self._clock() + self.negative_ttl, 0))
+
+    @staticmethod
+    def _unwrap(entry):
+        if entry.error is not None:
+            raise CachedError(getattr(entry.error, "status", 404), str(entry.error))
+        return entry.value
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self.stats)
+            lookups = out["hits"] + out["stale_hits"] + out["negative_hits"] + out["misses"]
+            out.update({
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_ratio": round((lookups - out["misses"]) / lookups, 4) if lookups else 0.0,
+            })
+        return out
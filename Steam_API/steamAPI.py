@@ -1,50 +1,188 @@
 from flask import Flask, request, jsonify
 import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from batching import MicroBatcher
+from cache import TTLCache, CachedError
+from instrumentation import instrument
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+metrics = instrument(app, "steam_api")
 
 STEAM_API_KEY = os.environ.get('STEAM_API_KEY')  # Set your Steam API key as an environment variable
+STEAM_API_BASE = os.environ.get('STEAM_API_BASE', 'http://api.steampowered.com')  # point at a fake server for tests
+
+# Seconds each kind of upstream response stays fresh
+CACHE_TTLS = {
+    'profile': float(os.environ.get('STEAM_TTL_PROFILE', '300')),
+    'friends': float(os.environ.get('STEAM_TTL_FRIENDS', '600')),
+    'games': float(os.environ.get('STEAM_TTL_GAMES', '3600')),
+    'cs2_stats': float(os.environ.get('STEAM_TTL_CS2_STATS', '300')),
+}
+cache = TTLCache(
+    maxsize=int(os.environ.get('STEAM_CACHE_SIZE', '10000')),
+    stale_seconds=float(os.environ.get('STEAM_CACHE_STALE_SECONDS', '300')),
+    negative_ttl=float(os.environ.get('STEAM_TTL_NOT_FOUND', '60')),
+)
+
+STEAM_HTTP_POOL = int(os.environ.get('STEAM_HTTP_POOL', '32'))
+
+# One keep-alive session for all upstream calls, plus a bounded pool for fan-out
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=STEAM_HTTP_POOL))
+session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=STEAM_HTTP_POOL))
+metrics.track_session(session, {'steam': STEAM_API_BASE})
+metrics.gauges('steam_cache', cache.snapshot)
+fanout = ThreadPoolExecutor(max_workers=int(os.environ.get('STEAM_FANOUT_WORKERS', '16')))
+UPSTREAM_TIMEOUT = float(os.environ.get('STEAM_UPSTREAM_TIMEOUT', '10'))
+
+
+class NotFound(requests.HTTPError):
+    """Upstream says the resource does not exist; cached negatively"""
+    status = 404
+
+
+def steam_get(kind, url, empty=None):
+    """
+    Cached GET of a Steam Web API URL, returning the decoded JSON.
+    empty: optional predicate on the payload; a match is treated as a 404.
+    """
+    def fetch():
+        response = session.get(url, timeout=UPSTREAM_TIMEOUT)
+        if response.status_code == 404:
+            raise NotFound(f"404 Client Error: Not Found for url: {response.url}", response=response)
+        response.raise_for_status()
+        data = response.json()
+        if empty is not None and empty(data):
+            raise NotFound("User not found")
+        return data
+    return cache.get_or_fetch(url, CACHE_TTLS[kind], fetch, negative=(NotFound,))
+
+
+PROFILE_CHUNK = 100  # GetPlayerSummaries accepts at most 100 steamids per call
+BATCH_MAX_STEAMIDS = int(os.environ.get('STEAM_BATCH_MAX_STEAMIDS', '1000'))
+# Optional: coalesce concurrent single-profile misses arriving within this window
+PROFILE_BATCH_WINDOW = float(os.environ.get('STEAM_PROFILE_BATCH_WINDOW_MS', '0')) / 1000
+
+
+def fetch_profiles(steamids):
+    """One GetPlayerSummaries call for up to 100 steamids, keyed by steamid"""
+    url = (
+        f"{STEAM_API_BASE}/ISteamUser/GetPlayerSummaries/v0002/"
+        f"?key={STEAM_API_KEY}&steamids={','.join(steamids)}"
+    )
+    response = session.get(url, timeout=UPSTREAM_TIMEOUT)
+    response.raise_for_status()
+    players = response.json().get('response', {}).get('players', [])
+    return {player.get('steamid'): player for player in players}
+
+
+profile_batcher = (
+    MicroBatcher(fetch_profiles, window=PROFILE_BATCH_WINDOW, max_batch=PROFILE_CHUNK)
+    if PROFILE_BATCH_WINDOW > 0 else None
+)
+if profile_batcher is not None:
+    metrics.gauges('steam_profile_batches', lambda: dict(profile_batcher.stats))
+
+
+def get_profile(steamid):
+    """Cached profile for one steamid; batch and single lookups share entries"""
+    def fetch():
+        if profile_batcher is not None:
+            try:
+                return profile_batcher.submit(steamid).result()
+            except KeyError:
+                raise NotFound("User not found")
+        player = fetch_profiles([steamid]).get(steamid)
+        if player is None:
+            raise NotFound("User not found")
+        return player
+    return cache.get_or_fetch(('profile', steamid), CACHE_TTLS['profile'], fetch, negative=(NotFound,))
+
 
 @app.route('/steam/user/<steamid>', methods=['GET'])
 def get_steam_user_profile(steamid):
     if not STEAM_API_KEY:
         return jsonify({'error': 'Steam API key not set'}), 500
 
-    url = (
-        f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/"
-        f"?key={STEAM_API_KEY}&steamids={steamid}"
-    )
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        players = data.get('response', {}).get('players', [])
-        if not players:
-            return jsonify({'error': 'User not found'}), 404
-        return jsonify(players[0])
+        return jsonify(get_profile(steamid))
+    except CachedError:
+        return jsonify({'error': 'User not found'}), 404
+    except requests.RequestException as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/steam/users', methods=['GET', 'POST'])
+def get_steam_user_profiles():
+    """
+    Profiles for many users at once.
+    GET ?steamids=1,2,3 or POST {"steamids": ["1", "2", "3"]}
+    Returns {"players": {steamid: profile}, "not_found": [steamid, ...]}
+    """
+    if not STEAM_API_KEY:
+        return jsonify({'error': 'Steam API key not set'}), 500
+
+    if request.method == 'POST':
+        steamids = (request.get_json(silent=True) or {}).get('steamids', [])
+    else:
+        steamids = request.args.get('steamids', '').split(',')
+    if not isinstance(steamids, list):
+        return jsonify({'error': "'steamids' must be a list"}), 400
+    steamids = list(dict.fromkeys(str(s).strip() for s in steamids if str(s).strip()))
+    if not steamids:
+        return jsonify({'error': 'steamids required'}), 400
+    if len(steamids) > BATCH_MAX_STEAMIDS:
+        return jsonify({'error': f'at most {BATCH_MAX_STEAMIDS} steamids per request'}), 400
+
+    players = {}
+    missing = []
+    for steamid in steamids:
+        hit, player = cache.peek(('profile', steamid))
+        if hit:
+            players[steamid] = player
+        else:
+            missing.append(steamid)
+
+    try:
+        chunks = [missing[i:i + PROFILE_CHUNK] for i in range(0, len(missing), PROFILE_CHUNK)]
+        for found in fanout.map(fetch_profiles, chunks):
+            players.update(found)
     except requests.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
+    for steamid in missing:
+        if steamid in players:
+            cache.put(('profile', steamid), players[steamid], CACHE_TTLS['profile'])
+        else:
+            cache.put_negative(('profile', steamid), NotFound("User not found"))
+
+    return jsonify({
+        'players': {steamid: players[steamid] for steamid in steamids if steamid in players},
+        'not_found': [steamid for steamid in steamids if steamid not in players],
+    })
+
 @app.route('/steam/user/<steamid>/friends', methods=['GET'])
 def get_steam_user_friends(steamid):
     if not STEAM_API_KEY:
         return jsonify({'error': 'Steam API key not set'}), 500
 
     url = (
-        f"http://api.steampowered.com/ISteamUser/GetFriendList/v0001/"
+        f"{STEAM_API_BASE}/ISteamUser/GetFriendList/v0001/"
         f"?key={STEAM_API_KEY}&steamid={steamid}&relationship=friend"
     )
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = steam_get('friends', url)
         friends = data.get('friendslist', {}).get('friends', [])
         return jsonify({'friends': friends})
+    except CachedError as e:
+        return jsonify({'error': str(e)}), e.status
     except requests.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
@@ -54,15 +192,15 @@ def get_steam_user_owned_games(steamid):
         return jsonify({'error': 'Steam API key not set'}), 500
 
     url = (
-        f"http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+        f"{STEAM_API_BASE}/IPlayerService/GetOwnedGames/v0001/"
         f"?key={STEAM_API_KEY}&steamid={steamid}&format=json"
     )
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = steam_get('games', url)
         games = data.get('response', {}).get('games', [])
         return jsonify({'games': games})
+    except CachedError as e:
+        return jsonify({'error': str(e)}), e.status
     except requests.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
@@ -73,31 +211,37 @@ def get_steam_user_cs2_stats(steamid):
         return jsonify({'error': 'Steam API key not set'}), 500
     cs2id = 730
     url = (
-        f"http://api.steampowered.com/ISteamUserStats/GetUserStatsForGame/v0002/"
+        f"{STEAM_API_BASE}/ISteamUserStats/GetUserStatsForGame/v0002/"
         f"?appid={cs2id}&key={STEAM_API_KEY}&steamid={steamid}"
     )
     url_games = (
-        f"http://api.steampowered.com/IPlayerService/GetOwnedGames/v0001/"
+        f"{STEAM_API_BASE}/IPlayerService/GetOwnedGames/v0001/"
         f"?key={STEAM_API_KEY}&steamid={steamid}&format=json"
     )
     try:
-        # first get games list and find cs2
-        response = requests.get(url_games)
-        response.raise_for_status()
-        data = response.json()
+        # Both upstream calls are independent: issue them together
+        games_future = fanout.submit(steam_get, 'games', url_games)  # shares the /games cache entry
+        stats_future = fanout.submit(steam_get, 'cs2_stats', url)
+        data = games_future.result()
         cs2 = next((game for game in data.get('response', {}).get('games', []) if game.get('appid') == 730), None)
 
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        print(data)
+        data = stats_future.result()
         stats = data.get('playerstats', {}).get('stats', [])
-       
+
         return jsonify({'playtime':cs2,'stats': stats})
+    except CachedError as e:
+        return jsonify({'error': str(e)}), e.status
     except requests.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss/eviction counters for the upstream response cache"""
+    out = cache.snapshot()
+    if profile_batcher is not None:
+        out['profile_batches'] = dict(profile_batcher.stats)
+    return jsonify(out)
 
 
 if __name__ == '__main__':
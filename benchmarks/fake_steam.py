@@ -0,0 +1,109 @@
+"""
+Stand-in for the Steam Web API endpoints Steam_API calls, for benchmarks.
+
+    python fake_steam.py --port 8765 --delay-ms 20
+
+Responses are deterministic per steamid: every player exists, owns CS2 and
+has --friends friends drawn from a population of --population players, so
+friends-of-friends overlap the way a real community does. --delay-ms adds a
+fixed upstream latency to every call.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BASE_ID = 76561198000000000
+
+
+def steamid(n):
+    return str(BASE_ID + n)
+
+
+def _rng(sid):
+    return random.Random(int(hashlib.sha256(sid.encode()).hexdigest()[:16], 16))
+
+
+class FakeSteam(BaseHTTPRequestHandler):
+    delay = 0.0
+    population = 5000
+    friends = 20
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        route = {
+            "/ISteamUser/GetPlayerSummaries/v0002/": self.summaries,
+            "/ISteamUser/GetFriendList/v0001/": self.friend_list,
+            "/IPlayerService/GetOwnedGames/v0001/": self.owned_games,
+            "/ISteamUserStats/GetUserStatsForGame/v0002/": self.cs2_stats,
+        }.get(url.path)
+        if route is None:
+            return self.reply(404, {"error": "not found"})
+        if self.delay:
+            time.sleep(self.delay)
+        self.reply(200, route(query))
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def summaries(self, query):
+        return {"response": {"players": [
+            {"steamid": sid, "personaname": f"player{int(sid) - BASE_ID}", "communityvisibilitystate": 3,
+             "profileurl": f"https://steamcommunity.com/profiles/{sid}/"}
+            for sid in query.get("steamids", "").split(",") if sid
+        ]}}
+
+    def friend_list(self, query):
+        rng = _rng(query.get("steamid", ""))
+        picks = rng.sample(range(self.population), min(self.friends, self.population))
+        return {"friendslist": {"friends": [
+            {"steamid": steamid(n), "relationship": "friend", "friend_since": 1600000000 + n} for n in picks
+        ]}}
+
+    def owned_games(self, query):
+        rng = _rng(query.get("steamid", ""))
+        games = [{"appid": 730, "playtime_forever": rng.randint(60, 300000)}]
+        games += [{"appid": rng.randint(10, 2000000), "playtime_forever": rng.randint(0, 5000)} for _ in range(20)]
+        return {"response": {"game_count": len(games), "games": games}}
+
+    def cs2_stats(self, query):
+        rng = _rng(query.get("steamid", ""))
+        names = ("total_kills", "total_deaths", "total_time_played", "total_wins", "total_damage_done",
+                 "total_kills_headshot", "total_mvps", "total_rounds_played", "total_matches_won")
+        return {"playerstats": {"steamID": query.get("steamid"), "gameName": "ValveTestApp260",
+                                "stats": [{"name": n, "value": rng.randint(0, 500000)} for n in names]}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    parser.add_argument("--population", type=int, default=5000)
+    parser.add_argument("--friends", type=int, default=20)
+    args = parser.parse_args()
+
+    FakeSteam.delay = args.delay_ms / 1000
+    FakeSteam.population = args.population
+    FakeSteam.friends = args.friends
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FakeSteam)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+"""
+Benchmark suite: every Flask service against local stand-ins, plus
+micro-benchmarks of save_cs2_scoreboard and Pipeline.run.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/run.py                                   # all services, concurrency 8
+    python benchmarks/run.py --only steam_api,gemini_api --concurrency 1,8,32 --requests 2000
+    python benchmarks/run.py --postgres                        # also DB_API, against POSTGRES_* / DB_* env
+    python benchmarks/run.py --out benchmarks/baseline.json      # record a baseline to commit
+    python benchmarks/run.py --compare benchmarks/baseline.json
+
+Each service runs in its own process on a free local port. Steam_API talks
+to fake_steam.py, match_service uses a temporary SQLite file (and the
+Steam_API / Gemini_API instances above), OCR reads the testImages/ fixtures,
+and DB_API needs a local Postgres whose schema is created with
+DB/init_db.py; without --postgres it is reported as skipped. Requests are
+sent closed-loop by --concurrency client threads, after --warmup requests
+that are not counted.
+
+Results go to --out (default benchmarks/results/<UTC timestamp>.json) as one
+record per benchmark with throughput and mean/p50/p95/p99/max latency.
+With --compare, any benchmark whose p95 rose or whose throughput fell by
+more than --tolerance against the baseline file is listed and the exit
+status is 1.
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import pathlib
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fake_steam import steamid
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+HERE = pathlib.Path(__file__).resolve().parent
+IMAGES = ROOT / "testImages"
+
+# name -> (directory, module holding `app`)
+SERVICES = {
+    "steam_api": ("Steam_API", "steamAPI"),
+    "gemini_api": ("Gemini_API", "app"),
+    "ocr": ("OCR", "ocr"),
+    "pypelyne_service": ("pypelyne_service", "app"),
+    "db_api": ("DB_API", "db_api"),
+    "match_service": ("match_service", "app"),
+}
+DEPENDS = {"match_service": ("steam_api", "gemini_api")}
+
+LAUNCH = ("import importlib, sys; "
+          "importlib.import_module(sys.argv[1]).app.run(host='127.0.0.1', port=int(sys.argv[2]), threaded=True)")
+REQUEST_TIMEOUT = 60
+
+
+# ---- Synthetic data ----------------------------------------
+def scoreboard(rng, population, key=None):
+    """A ten-player scoreboard in the shape save_cs2_scoreboard and the ingest endpoints take"""
+    players = []
+    for i, n in enumerate(rng.sample(range(population), 10)):
+        players.append({
+            "player": f"player{n}",
+            "steam_id": steamid(n),
+            "team": "CT" if i < 5 else "T",
+            "Kills": rng.randint(0, 35),
+            "Deaths": rng.randint(0, 25),
+            "Assists": rng.randint(0, 12),
+            "HeadshotPerc": rng.randint(0, 100),
+            "DMG": rng.randint(0, 3500),
+            "Rating": round(rng.uniform(0.3, 2.0), 2),
+        })
+    match = {"players": players, "CT_score": rng.randint(0, 13), "T_score": rng.randint(0, 13)}
+    if key is not None:
+        match["idempotency_key"] = key
+    return match
+
+
+_batches = itertools.count()  # fresh idempotency keys for every ingest request
+
+
+def matches(seed, count, population, prefix):
+    rng = random.Random(seed)
+    return [scoreboard(rng, population, key=f"{prefix}-{i}") for i in range(count)]
+
+
+# ---- Measurements ------------------------------------------
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(latencies, errors, wall):
+    ordered = sorted(latencies)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(ordered) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else None,
+            "p50": ms(percentile(ordered, 50)) if ordered else None,
+            "p95": ms(percentile(ordered, 95)) if ordered else None,
+            "p99": ms(percentile(ordered, 99)) if ordered else None,
+            "max": ms(ordered[-1]) if ordered else None,
+        },
+    }
+
+
+class Endpoint:
+    """One benchmarked request; path, json and files may be functions of the request index"""
+
+    def __init__(self, name, method, path, json=None, files=None, ok=(200,)):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.json = json
+        self.files = files
+        self.ok = ok
+
+    def send(self, session, base, i):
+        value = lambda v: v(i) if callable(v) else v
+        response = session.request(self.method, base + value(self.path), json=value(self.json),
+                                   files=value(self.files), timeout=REQUEST_TIMEOUT)
+        return response.status_code in self.ok  # the body (or whole stream) has been read
+
+
+def load(base, endpoint, concurrency, total, warmup):
+    """Closed-loop load: concurrency threads send total requests between them"""
+    counter = itertools.count()
+    sessions = [requests.Session() for _ in range(concurrency)]
+
+    def worker(session, limit, record):
+        latencies, errors = [], 0
+        while True:
+            i = next(counter)
+            if i >= limit:
+                return latencies, errors
+            started = time.perf_counter()
+            try:
+                good = endpoint.send(session, base, i)
+            except requests.RequestException:
+                good = False
+            if record:
+                latencies.append(time.perf_counter() - started)
+                errors += not good
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda s: worker(s, warmup, False), sessions))
+        counter = itertools.count(warmup)
+        started = time.perf_counter()
+        outcomes = list(pool.map(lambda s: worker(s, warmup + total, True), sessions))
+        wall = time.perf_counter() - started
+    for session in sessions:
+        session.close()
+    return summarize([x for lat, _ in outcomes for x in lat], sum(e for _, e in outcomes), wall)
+
+
+def timed_calls(fn, items, repeat):
+    """Per-call latencies of fn over items; the fastest of repeat rounds is kept"""
+    best = None
+    for _ in range(repeat):
+        latencies = []
+        started = time.perf_counter()
+        for item in items:
+            t = time.perf_counter()
+            fn(item)
+            latencies.append(time.perf_counter() - t)
+        wall = time.perf_counter() - started
+        if best is None or wall < best[1]:
+            best = (latencies, wall)
+    return summarize(best[0], 0, best[1])
+
+
+# ---- Processes ---------------------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start(name, argv, cwd, env, logs):
+    log = open(logs / f"{name}.log", "wb")
+    proc = subprocess.Popen(argv, cwd=cwd, env=dict(os.environ, **env), stdout=log, stderr=subprocess.STDOUT)
+    proc.log_path = log.name
+    return proc
+
+
+def wait_ready(proc, url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    tail = pathlib.Path(proc.log_path).read_text(errors="replace")[-2000:]
+    raise RuntimeError(f"{url} did not come up (exit code {proc.poll()}):\n{tail}")
+
+
+def stop(proc):
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ---- Scenarios ---------------------------------------------
+def steam_api_endpoints(args, base):
+    hot = [steamid(n) for n in range(args.hot_players)]
+    fresh = itertools.count(args.population)  # never requested before: always a cache miss
+    return [
+        Endpoint("GET /steam/user/<id> (cached)", "GET", lambda i: f"/steam/user/{hot[i % len(hot)]}"),
+        Endpoint("GET /steam/user/<id> (miss)", "GET", lambda i: f"/steam/user/{steamid(next(fresh))}"),
+        Endpoint("POST /steam/users (100 ids)", "POST", "/steam/users",
+                 json=lambda i: {"steamids": [steamid((i * 100 + k) % args.population) for k in range(100)]}),
+        Endpoint("GET /steam/user/<id>/friends", "GET", lambda i: f"/steam/user/{hot[i % len(hot)]}/friends"),
+        Endpoint("GET /steam/user/<id>/cs2", "GET", lambda i: f"/steam/user/{hot[i % len(hot)]}/cs2"),
+    ]
+
+
+def gemini_api_endpoints(args, base):
+    rng = random.Random(1)
+    boards = [scoreboard(rng, args.population) for _ in range(100)]
+    return [
+        Endpoint("POST /coach", "POST", "/coach",
+                 json=lambda i: {"kills": i % 30, "deaths": i % 17, "adr": 40 + i % 90}),
+        Endpoint("POST /coach/batch (scoreboard)", "POST", "/coach/batch", json=lambda i: boards[i % len(boards)]),
+    ]
+
+
+def ocr_endpoints(args, base):
+    images = [(f.name, f.read_bytes()) for f in sorted(IMAGES.glob("*.jpg"))]
+    if not images:
+        raise RuntimeError(f"no .jpg fixtures in {IMAGES}")
+    return [
+        Endpoint("POST /ocr", "POST", "/ocr", files=lambda i: {"file": images[i % len(images)]}),
+        Endpoint(f"POST /ocr/batch ({len(images)} images)", "POST", "/ocr/batch",
+                 files=lambda i: [("file", image) for image in images]),
+    ]
+
+
+def pypelyne_service_endpoints(args, base):
+    return [
+        Endpoint("GET /hello", "GET", "/hello"),
+        Endpoint("GET /pipeline", "GET", lambda i: f"/pipeline?input=player{i % 50}"),
+        Endpoint("POST /pipeline/batch (100 inputs)", "POST", "/pipeline/batch",
+                 json=lambda i: {"inputs": [f"player{(i + k) % 500}" for k in range(100)]}),
+    ]
+
+
+def _ingest_seed(base, path, args):
+    seed = matches(0, args.seed_matches, args.population, "seed")
+    for at in range(0, len(seed), 500):
+        response = requests.post(base + path, json={"matches": seed[at:at + 500]}, timeout=300)
+        response.raise_for_status()
+
+
+def db_api_endpoints(args, base):
+    _ingest_seed(base, "/ingest/matches", args)
+    users = lambda i: i % args.population + 1
+    select = 'SELECT UserID, UserName, User_Steam_ID FROM "User" WHERE UserID = %s'
+    return [
+        Endpoint("POST /execute_sql", "POST", "/execute_sql", json=lambda i: {"query": select, "params": [users(i)]}),
+        Endpoint("POST /execute_sql (cache)", "POST", "/execute_sql",
+                 json=lambda i: {"query": select, "params": [users(i)], "cache": True}),
+        Endpoint("GET /users/<id>/matches", "GET", lambda i: f"/users/{users(i)}/matches?limit=20"),
+        Endpoint("POST /stream_sql (5000 rows)", "POST", "/stream_sql",
+                 json={"query": "SELECT MatchID, UserID, KDA, ADR FROM UserMatchBridge LIMIT 5000"}),
+        Endpoint("POST /ingest/matches (20 matches)", "POST", "/ingest/matches",
+                 json=lambda i: {"matches": matches(i, 20, args.population, f"bench-{next(_batches)}")}),
+    ]
+
+
+def match_service_endpoints(args, base):
+    _ingest_seed(base, "/matches/ingest", args)
+    users = lambda i: i % args.population + 1
+    hot = [steamid(n) for n in range(args.hot_players)]
+    # Queue the hot players for the friend crawler and give it a moment
+    for sid in hot:
+        requests.get(f"{base}/friends/suggest", params={"steamid": sid}, timeout=REQUEST_TIMEOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        crawled = requests.get(f"{base}/friends/stats", timeout=REQUEST_TIMEOUT).json()["crawler"]["crawled"]
+        if crawled >= len(hot):
+            break
+        time.sleep(0.5)
+    return [
+        Endpoint("GET /pattern", "GET", lambda i: f"/pattern?user_id={users(i)}"),
+        Endpoint("GET /pattern/window", "GET", lambda i: f"/pattern/window?user_id={users(i)}&n=20&window=5"),
+        Endpoint("GET /similar/players", "GET", lambda i: f"/similar/players?user_id={users(i)}", ok=(200, 404)),
+        Endpoint("GET /similar", "GET", lambda i: f"/similar?steamid={hot[i % len(hot)]}&user_id={users(i)}"),
+        Endpoint("GET /friends/suggest", "GET", lambda i: f"/friends/suggest?steamid={hot[i % len(hot)]}",
+                 ok=(200, 404)),
+        Endpoint("POST /coach (via gemini_api)", "POST", "/coach",
+                 json=lambda i: {"kills": i % 30, "deaths": i % 17, "adr": 40 + i % 90}),
+        Endpoint("POST /matches/ingest (20 matches)", "POST", "/matches/ingest",
+                 json=lambda i: {"matches": matches(i, 20, args.population, f"bench-{next(_batches)}")}),
+    ]
+
+
+def service_env(name, args, ports, workdir):
+    steam = f"http://127.0.0.1:{ports['fake_steam']}"
+    env = {"PYTHONUNBUFFERED": "1",
+           "PYTHONPATH": os.pathsep.join(filter(None, (str(ROOT / "shared"), os.getenv("PYTHONPATH"))))}
+    if name == "steam_api":
+        env.update(STEAM_API_KEY="benchmark", STEAM_API_BASE=steam)
+    elif name == "ocr":
+        env.update(OCR_SPOOL_DIR=str(workdir))
+    elif name == "match_service":
+        env.update(USE_SQLITE="1", SQLITE_PATH=str(workdir / "matches.db"),
+                   STEAM_API_URL=f"http://127.0.0.1:{ports['steam_api']}",
+                   LLM_URL=f"http://127.0.0.1:{ports['gemini_api']}",
+                   FRIEND_CRAWL_RATE="200")
+    return env
+
+
+def postgres_env():
+    """Connection settings for DB_API (POSTGRES_*) and DB/init_db.py (DB_*), from the environment"""
+    host = os.getenv("POSTGRES_HOST", os.getenv("DB_HOST", "localhost"))
+    port = os.getenv("POSTGRES_PORT", os.getenv("DB_PORT", "5432"))
+    name = os.getenv("POSTGRES_DB", os.getenv("DB_NAME", "cs2_bench"))
+    return {"POSTGRES_HOST": host, "POSTGRES_PORT": port, "POSTGRES_DB": name,
+            "DB_HOST": host, "DB_PORT": port, "DB_NAME": name}
+
+
+# ---- Micro-benchmarks --------------------------------------
+def micro_benchmarks(args):
+    sys.path[:0] = [str(ROOT / "Gemini_API"), str(ROOT / "pypelyne_service")]
+    from functions import save_cs2_scoreboard, save_cs2_scoreboards
+    from pipeline import Pipeline
+    from result_cache import ResultCache
+
+    out = []
+    boards = [scoreboard(random.Random(i), args.population) for i in range(args.micro_n)]
+    out.append(("save_cs2_scoreboard", 1, timed_calls(lambda m: save_cs2_scoreboard(**m), boards, args.repeat)))
+    chunks = [boards[at:at + 1000] for at in range(0, len(boards), 1000)]
+    out.append(("save_cs2_scoreboards (1000 per call)", 1, timed_calls(save_cs2_scoreboards, chunks, args.repeat)))
+
+    # The /pipeline DAG: two independent roots, then a chain
+    def process_input(text):
+        return f"Processing: {text} - Status: Complete"
+
+    def timestamp():
+        return time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def transform(message):
+        return message.upper()
+
+    def finish(message):
+        return f"{message}!"
+
+    executor = ThreadPoolExecutor(max_workers=8)
+
+    def run(text, cache=None):
+        return (Pipeline(executor=executor, cache=cache)
+                .step(process_input).step(timestamp, after=(), cache=False)
+                .step(transform, after=process_input).step(finish).run(text))
+
+    inputs = [f"player{i % 50}" for i in range(args.micro_n)]
+    out.append(("Pipeline.run", 1, timed_calls(run, inputs, args.repeat)))
+    cache = ResultCache(max_entries=4096)
+    out.append(("Pipeline.run (ResultCache, 50 inputs)", 1,
+                timed_calls(lambda text: run(text, cache), inputs, args.repeat)))
+    executor.shutdown()
+    return [dict(suite="micro", service="micro", name=name, concurrency=c, **stats) for name, c, stats in out]
+
+
+# ---- Results -----------------------------------------------
+def _key(record):
+    return record["service"], record["name"], record["concurrency"]
+
+
+def compare(records, baseline, tolerance):
+    """Benchmarks whose p95 or throughput is more than tolerance worse than the baseline's"""
+    before = {_key(r): r for r in baseline.get("benchmarks", []) if r.get("latency_ms", {}).get("p95")}
+    regressions = []
+    for record in records:
+        old = before.get(_key(record))
+        if old is None or record.get("status", "ok") != "ok" or not record["latency_ms"]["p95"]:
+            continue
+        p95, old_p95 = record["latency_ms"]["p95"], old["latency_ms"]["p95"]
+        rate, old_rate = record["throughput_per_s"], old["throughput_per_s"]
+        if p95 > old_p95 * (1 + tolerance) or rate < old_rate * (1 - tolerance):
+            regressions.append({"service": record["service"], "name": record["name"],
+                                "concurrency": record["concurrency"],
+                                "p95_ms": [old_p95, p95], "throughput_per_s": [old_rate, rate]})
+    return regressions
+
+
+def report(record):
+    if record.get("status", "ok") != "ok":
+        print(f"  {record['name']:<42} {record['status']}: {record.get('reason', '')[:100]}")
+        return
+    lat = record["latency_ms"]
+    errors = f"  errors {record['errors']}" if record["errors"] else ""
+    print(f"  {record['name']:<42} c={record['concurrency']:<3} {record['throughput_per_s']:10.1f}/s   "
+          f"p50 {lat['p50']:8.2f}  p95 {lat['p95']:8.2f}  p99 {lat['p99']:8.2f} ms{errors}")
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", help="comma-separated services to benchmark (default: all)")
+    parser.add_argument("--concurrency", default="8", help="comma-separated client thread counts")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per endpoint and concurrency")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--population", type=int, default=500, help="distinct players in synthetic matches")
+    parser.add_argument("--hot-players", type=int, default=100, help="steamids requested repeatedly")
+    parser.add_argument("--seed-matches", type=int, default=2000, help="matches ingested before measuring")
+    parser.add_argument("--steam-delay-ms", type=float, default=20.0, help="latency of the fake Steam API")
+    parser.add_argument("--postgres", action="store_true", help="benchmark DB_API against a local Postgres")
+    parser.add_argument("--micro-n", type=int, default=5000, help="calls per micro-benchmark round")
+    parser.add_argument("--repeat", type=int, default=3, help="micro-benchmark rounds (best is kept)")
+    parser.add_argument("--no-micro", action="store_true")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown with --compare")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    selected = args.only.split(",") if args.only else list(SERVICES)
+    unknown = set(selected) - set(SERVICES)
+    if unknown:
+        parser.error(f"unknown services: {', '.join(sorted(unknown))}")
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    records = []
+
+    if not args.no_micro:
+        print("micro")
+        for record in micro_benchmarks(args):
+            report(record)
+            records.append(record)
+
+    # Dependencies start too, in SERVICES order so they are up first
+    needed = {s for name in selected for s in (name, *DEPENDS.get(name, ()))}
+    procs = []
+    with tempfile.TemporaryDirectory(prefix="cs2-bench-") as tmp:
+        workdir = pathlib.Path(tmp)
+        ports = {name: free_port() for name in ("fake_steam", *SERVICES)}
+        try:
+            fake = start("fake_steam", [sys.executable, str(HERE / "fake_steam.py"), "--port", str(ports["fake_steam"]),
+                                        "--delay-ms", str(args.steam_delay_ms),
+                                        "--population", str(args.population * 10)], HERE, {}, workdir)
+            procs.append(fake)
+            wait_ready(fake, f"http://127.0.0.1:{ports['fake_steam']}/")
+
+            failed = {}
+            for name in (n for n in SERVICES if n in needed):
+                directory, module = SERVICES[name]
+                env = service_env(name, args, ports, workdir)
+                try:
+                    if name == "db_api":
+                        if not args.postgres:
+                            raise RuntimeError("needs --postgres")
+                        env.update(postgres_env())
+                        init = subprocess.run([sys.executable, "init_db.py"], cwd=ROOT / "DB",
+                                              env=dict(os.environ, **env), capture_output=True, text=True)
+                        if init.returncode:
+                            raise RuntimeError(f"DB/init_db.py failed: {(init.stdout + init.stderr)[-500:]}")
+                    proc = start(name, [sys.executable, "-c", LAUNCH, module, str(ports[name])],
+                                 ROOT / directory, env, workdir)
+                    procs.append(proc)
+                    wait_ready(proc, f"http://127.0.0.1:{ports[name]}/metrics")
+                except RuntimeError as e:
+                    failed[name] = str(e)
+
+            for name in selected:
+                print(name)
+                base = f"http://127.0.0.1:{ports[name]}"
+                reason = failed.get(name) or next(
+                    (f"{dep} failed to start" for dep in DEPENDS.get(name, ()) if dep in failed), None)
+                try:
+                    endpoints = [] if reason else globals()[f"{name}_endpoints"](args, base)
+                except (RuntimeError, requests.RequestException, KeyError, ValueError) as e:
+                    reason = f"setup failed: {e}"
+                if reason:
+                    record = {"suite": "http", "service": name, "name": "*", "concurrency": None,
+                              "status": "skipped", "reason": reason}
+                    report(record)
+                    records.append(record)
+                    continue
+                for endpoint in endpoints:
+                    for concurrency in levels:
+                        record = dict(suite="http", service=name, name=endpoint.name, concurrency=concurrency,
+                                      status="ok", **load(base, endpoint, concurrency, args.requests, args.warmup))
+                        report(record)
+                        records.append(record)
+        finally:
+            for proc in reversed(procs):
+                stop(proc)
+
+    results = {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "benchmarks": records,
+    }
+    out = pathlib.Path(args.out or HERE / "results" / f"{started_at:%Y%m%dT%H%M%SZ}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"results written to {out}")
+
+    if args.compare:
+        regressions = compare(records, json.loads(pathlib.Path(args.compare).read_text()), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['service']} {r['name']} c={r['concurrency']}: "
+                  f"p95 {r['p95_ms'][0]} -> {r['p95_ms'][1]} ms, "
+                  f"throughput {r['throughput_per_s'][0]} -> {r['throughput_per_s'][1]}/s")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
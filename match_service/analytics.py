@@ -0,0 +1,202 @@
+"""
+Rolling-window match analytics with per-user summaries kept in memory.
+
+Each user's summary holds the tail of their match series (result, KDA, ADR,
+Rating, split key) as NumPy arrays plus lifetime aggregates: totals, sums,
+streak state and per-template/per-map splits. New matches are folded in
+incrementally, so serving a dashboard never rescans a user's full history.
+
+Matches are ordered by (play time, match id). Ids are no resume point:
+concurrent writers commit them out of order and back-dated ingests get new
+ids for old matches. Callers fetch from since(), a re-scan window before
+the newest folded match, and extend() skips the matches it already holds,
+so a match committed late within the window is still counted. A match
+played before the window cannot be appended in order: writers report it
+with SeriesCache.backdated() and the user's series is rebuilt. Windows
+(last N, rolling win rate, trends) are vectorized passes over the retained
+tail.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+WIN, DRAW, LOSS = 1, 0, -1
+_LABELS = {WIN: "W", DRAW: "D", LOSS: "L"}
+TRENDS = ("kda", "adr", "rating")
+
+
+class UserSeries:
+    def __init__(self, max_len, rescan=300.0):
+        self.max_len = max_len
+        self.rescan = rescan   # seconds of play time fetched again on every update
+        self.lock = threading.Lock()
+        self.newest = None     # play time (epoch seconds) of the newest folded match
+        self._recent = {}      # match id -> play time, folded matches inside the re-scan window
+        self.results = np.zeros(0, dtype=np.int8)
+        self.stats = {name: np.zeros(0) for name in TRENDS}
+        self.games = self.wins = self.losses = 0
+        self.sums = dict.fromkeys(TRENDS, 0.0)
+        self.counts = dict.fromkeys(TRENDS, 0)
+        self.streak = (DRAW, 0)  # (result, length) of the current run
+        self.longest = {WIN: 0, LOSS: 0}
+        self.splits = {}  # split key -> [wins, losses, games]
+
+    def since(self):
+        """Play time to fetch matches from: the re-scan window before the newest folded one"""
+        return 0.0 if self.newest is None else self.newest - self.rescan
+
+    def extend(self, ids, played, keys, results, kda, adr, rating):
+        """
+        Fold matches played at or after since(), in (play time, id) order,
+        into the summary. Matches already folded are skipped; returns how
+        many were new. A play time of None counts as 0 (the epoch).
+        """
+        played = [p or 0.0 for p in played]
+        fresh = [i for i, match_id in enumerate(ids) if match_id not in self._recent]
+        if not fresh:
+            return 0
+        if len(fresh) < len(ids):
+            ids, played, keys, results, kda, adr, rating = (
+                [column[i] for i in fresh] for column in (ids, played, keys, results, kda, adr, rating))
+        self.newest = max(self.newest or 0.0, max(played))
+        self._recent.update(zip(ids, played))
+        horizon = self.newest - self.rescan
+        self._recent = {m: p for m, p in self._recent.items() if p >= horizon}
+
+        results = np.asarray(results, dtype=np.int8)
+        self.games += len(results)
+        self.wins += int((results == WIN).sum())
+        self.losses += int((results == LOSS).sum())
+
+        # Run-length encode the new results, continuing the current streak
+        starts = np.r_[0, np.flatnonzero(np.diff(results)) + 1]
+        lengths = np.diff(np.r_[starts, len(results)])
+        values = results[starts]
+        if values[0] == self.streak[0]:
+            lengths[0] += self.streak[1]
+        self.streak = (int(values[-1]), int(lengths[-1]))
+        for result in (WIN, LOSS):
+            runs = lengths[values == result]
+            if runs.size:
+                self.longest[result] = max(self.longest[result], int(runs.max()))
+
+        for key, result in zip(keys, results.tolist()):
+            split = self.splits.setdefault(key, [0, 0, 0])
+            split[0] += result == WIN
+            split[1] += result == LOSS
+            split[2] += 1
+
+        self.results = np.concatenate([self.results, results])[-self.max_len:]
+        for name, values in zip(TRENDS, (kda, adr, rating)):
+            values = np.array([np.nan if v is None else float(v) for v in values])
+            known = ~np.isnan(values)
+            self.sums[name] += float(values[known].sum())
+            self.counts[name] += int(known.sum())
+            self.stats[name] = np.concatenate([self.stats[name], values])[-self.max_len:]
+        return len(results)
+
+    def summary(self, n=20, window=5):
+        n = max(1, min(n, self.max_len))
+        window = max(1, min(window, n))
+        last = self.results[-n:]
+        out = {
+            "matches": self.games,
+            "wins": self.wins,
+            "losses": self.losses,
+            "last_n": {
+                "n": len(last),
+                "results": [_LABELS[r] for r in last.tolist()],
+                "wins": int((last == WIN).sum()),
+                "losses": int((last == LOSS).sum()),
+                "win_rate": _rate((last == WIN).sum(), (last != DRAW).sum()),
+            },
+            "window": window,
+            "rolling_win_rate": _rolling_win_rate(self.results[-(n + window - 1):], window),
+            "streaks": {
+                "current": {"type": {WIN: "win", LOSS: "loss", DRAW: "none"}[self.streak[0]],
+                            "length": self.streak[1] if self.streak[0] != DRAW else 0},
+                "longest_win": self.longest[WIN],
+                "longest_loss": self.longest[LOSS],
+            },
+            "splits": [
+                {"key": key, "games": games, "wins": wins, "losses": losses, "win_rate": _rate(wins, wins + losses)}
+                for key, (wins, losses, games) in sorted(self.splits.items(), key=lambda kv: -kv[1][2])
+            ],
+            "trends": {},
+        }
+        for name in TRENDS:
+            values = self.stats[name][-n:]
+            known = ~np.isnan(values)
+            x = np.flatnonzero(known)
+            out["trends"][name] = {
+                "mean_last_n": round(float(values[known].mean()), 2) if x.size else None,
+                "mean_lifetime": round(self.sums[name] / self.counts[name], 2) if self.counts[name] else None,
+                # Change per match over the window, least squares
+                "slope": round(float(np.polyfit(x, values[known], 1)[0]), 4) if x.size >= 2 else None,
+            }
+        return out
+
+
+def _rate(wins, decided):
+    return round(float(wins) / float(decided), 4) if decided else 0.0
+
+
+def _rolling_win_rate(results, window):
+    """Win rate over each full window of results (draws excluded), oldest first"""
+    if len(results) < window:
+        return []
+    wins = np.r_[0, np.cumsum(results == WIN)]
+    decided = np.r_[0, np.cumsum(results != DRAW)]
+    w = wins[window:] - wins[:-window]
+    d = decided[window:] - decided[:-window]
+    return np.round(np.divide(w, d, out=np.zeros(len(w)), where=d > 0), 4).tolist()
+
+
+class SeriesCache:
+    """Bounded LRU of UserSeries; entries are brought up to date by the caller"""
+
+    def __init__(self, max_users=10000, max_len=500, rescan=300.0):
+        self.max_users = max_users
+        self.max_len = max_len
+        self.rescan = rescan
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "matches_folded": 0, "rebuilds": 0}
+
+    def get(self, user_id):
+        with self._lock:
+            series = self._series.get(user_id)
+            if series is None:
+                series = self._series[user_id] = UserSeries(self.max_len, self.rescan)
+                self.stats["misses"] += 1
+                while len(self._series) > self.max_users:
+                    self._series.popitem(last=False)
+                    self.stats["evictions"] += 1
+            else:
+                self._series.move_to_end(user_id)
+                self.stats["hits"] += 1
+            return series
+
+    def backdated(self, user_id, played):
+        """A match played at `played` was stored for user_id: drop the series if it lies before its window"""
+        with self._lock:
+            series = self._series.get(user_id)
+            if series is not None and series.newest is not None and played < series.since():
+                del self._series[user_id]
+                self.stats["rebuilds"] += 1
+
+    def clear(self):
+        """Drop every series, e.g. after an import whose users are not known here"""
+        with self._lock:
+            self.stats["rebuilds"] += len(self._series)
+            self._series.clear()
+
+    def folded(self, count):
+        with self._lock:
+            self.stats["matches_folded"] += count
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, users=len(self._series), max_users=self.max_users)
@@ -1,7 +1,17 @@
 from flask import Flask, request, jsonify
-import os, requests, sqlite3, pathlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+import datetime, os, requests, sqlite3, pathlib, threading, time
+
+from analytics import SeriesCache
+from friend_graph import DBAPIFriendStore, FriendCrawler, FriendGraph, SQLiteFriendStore, valid_steamid
+from ingest_key import match_key
+from instrumentation import instrument
+from similarity import SimilarityIndex
 
 app = Flask(__name__)
+# Per-route latency histograms, upstream/query timings and cache gauges on GET /metrics
+metrics = instrument(app, "match_service")
 
 # ---- External services (still available if you want them) ----
 STEAM = os.getenv('STEAM_API_URL', 'http://steam_api:5002')
@@ -9,8 +19,43 @@ DBAPI = os.getenv('DB_API_URL',   'http://db_api:5000')  # unused when USE_SQLIT
 OCR   = os.getenv('OCR_URL',      'http://ocr:5003')
 LLM   = os.getenv('LLM_URL',      'http://llm:5004')
 
+# Pooled keep-alive connections to the other containers, shared by all requests
+http = requests.Session()
+http.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=int(os.getenv("HTTP_POOL_SIZE", "32"))))
+metrics.track_session(http, {"steam": STEAM, "db_api": DBAPI, "ocr": OCR, "llm": LLM})
+_fanout = ThreadPoolExecutor(max_workers=int(os.getenv("FANOUT_WORKERS", "16")))
+SIMILAR_DEADLINE = float(os.getenv("SIMILAR_DEADLINE_S", "3"))  # whole-request budget for /similar
+
 USE_SQLITE = os.getenv("USE_SQLITE", "1") == "1"
 SQLITE_PATH = os.getenv("SQLITE_PATH", "/data/matches.db")
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))        # page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 << 20)))
+
+INGEST_MAX_MATCHES = int(os.getenv("INGEST_MAX_MATCHES", "50000"))
+
+# Per-user match series for /pattern/window, updated with only the new matches
+series = SeriesCache(max_users=int(os.getenv("ANALYTICS_MAX_USERS", "10000")),
+                     max_len=int(os.getenv("ANALYTICS_SERIES_LEN", "500")),
+                     # matches committed this late (play time) are still picked up
+                     rescan=float(os.getenv("ANALYTICS_RESCAN_S", "300")))
+
+# Friend graph index, kept fresh by a background crawler so requests never
+# wait on Steam for friend lists
+FRIEND_CRAWLER = os.getenv("FRIEND_CRAWLER", "1") == "1"             # 0 = no background thread at all
+FRIEND_CRAWL_RATE = float(os.getenv("FRIEND_CRAWL_RATE", "1"))      # Steam calls/s, 0 = load the graph only
+FRIEND_MAX_AGE = float(os.getenv("FRIEND_MAX_AGE_S", "86400"))      # refresh lists older than this
+FRIEND_CRAWL_DEPTH = int(os.getenv("FRIEND_CRAWL_DEPTH", "1"))      # also crawl friends of requested players
+friend_graph = FriendGraph(rebuild_every=int(os.getenv("FRIEND_GRAPH_REBUILD_EVERY", "1000")))
+
+# Similar-player index; approximate search kicks in above this population
+SIMILAR_APPROX_MIN = int(os.getenv("SIMILAR_APPROX_MIN_PLAYERS", "50000"))
+players = SimilarityIndex()
+_players_lock = threading.Lock()
+_players_loaded = False
+
+metrics.gauges("analytics_series", series.snapshot)
+metrics.gauges("friend_graph", friend_graph.snapshot)
+metrics.gauges("similar_index", players.stats)
 
 # ---- Helpers ------------------------------------------------
 def ok(x=None): return jsonify(x or {"ok": True})
@@ -19,28 +64,386 @@ def err(status, msg, detail=None):
     if detail: out["detail"]=str(detail)
     return jsonify(out), status
 
+# One connection per worker thread, opened once and reused for every request.
+# WAL lets readers proceed while a writer commits; synchronous=NORMAL is
+# durable across application crashes and only skips the fsync per commit.
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
 def _sqlite_conn():
-    pathlib.Path(SQLITE_PATH).parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(SQLITE_PATH)
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        _ensure_sqlite()
+        conn = _open_sqlite()
+        _local.conn = conn
+    return conn
+
+class _TimedConnection(sqlite3.Connection):
+    """
+    Records db_query_duration_seconds for every statement. SQLite produces
+    rows lazily, so for SELECTs this is the time to the first row.
+    """
+    def execute(self, sql, *args):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            metrics.observe_query(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, *args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            metrics.observe_query(sql, time.perf_counter() - started)
+
+def _open_sqlite():
+    conn = sqlite3.connect(SQLITE_PATH, timeout=5, factory=_TimedConnection)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
 def _ensure_sqlite():
-    with _sqlite_conn() as c:
-        c.execute("""CREATE TABLE IF NOT EXISTS Match(
-            MatchID INTEGER PRIMARY KEY AUTOINCREMENT,
-            UserID  INTEGER,
-            Won     INTEGER -- 1=true, 0=false
-        )""")
-        c.commit()
+    """Create the data directory and schema once per process"""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        pathlib.Path(SQLITE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        c = _open_sqlite()
+        try:
+            with c:
+                c.execute("""CREATE TABLE IF NOT EXISTS Match(
+                    MatchID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    UserID  INTEGER,
+                    Won     INTEGER -- 1=true, 0=false
+                )""")
+                c.execute("CREATE INDEX IF NOT EXISTS idx_match_userid ON Match(UserID)")
+                # Per-match stats for /pattern/window, filled in by ingest;
+                # PlayedAt is the play time in epoch seconds
+                columns = {r["name"] for r in c.execute("PRAGMA table_info(Match)")}
+                for column, kind in (("Map", "TEXT"), ("KDA", "REAL"), ("ADR", "REAL"), ("Rating", "REAL"),
+                                     ("PlayedAt", "REAL")):
+                    if column not in columns:
+                        c.execute(f"ALTER TABLE Match ADD COLUMN {column} {kind}")
+                c.execute("""CREATE TABLE IF NOT EXISTS "User"(
+                    UserID        INTEGER PRIMARY KEY AUTOINCREMENT,
+                    UserName      TEXT NOT NULL UNIQUE,
+                    User_Steam_ID TEXT
+                )""")
+                c.execute('CREATE INDEX IF NOT EXISTS idx_user_steam_id ON "User"(User_Steam_ID)')
+                c.execute("CREATE TABLE IF NOT EXISTS IngestKey(Key TEXT PRIMARY KEY)")
+                _ensure_user_stats(c)
+        finally:
+            c.close()
+        _schema_ready = True
+
+def _ensure_user_stats(c):
+    """Per-user win/loss rollup kept current by triggers on Match"""
+    fresh = c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='UserStats'").fetchone() is None
+    c.execute("""CREATE TABLE IF NOT EXISTS UserStats(
+        UserID  INTEGER PRIMARY KEY,
+        Wins    INTEGER NOT NULL DEFAULT 0,
+        Losses  INTEGER NOT NULL DEFAULT 0
+    )""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS match_stats_insert AFTER INSERT ON Match BEGIN
+        INSERT INTO UserStats(UserID,Wins,Losses) VALUES(NEW.UserID, NEW.Won=1, NEW.Won=0)
+        ON CONFLICT(UserID) DO UPDATE SET Wins=Wins+excluded.Wins, Losses=Losses+excluded.Losses;
+    END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS match_stats_delete AFTER DELETE ON Match BEGIN
+        UPDATE UserStats SET Wins=Wins-(OLD.Won=1), Losses=Losses-(OLD.Won=0) WHERE UserID=OLD.UserID;
+    END""")
+    c.execute("""CREATE TRIGGER IF NOT EXISTS match_stats_update AFTER UPDATE OF UserID, Won ON Match BEGIN
+        UPDATE UserStats SET Wins=Wins-(OLD.Won=1), Losses=Losses-(OLD.Won=0) WHERE UserID=OLD.UserID;
+        INSERT INTO UserStats(UserID,Wins,Losses) VALUES(NEW.UserID, NEW.Won=1, NEW.Won=0)
+        ON CONFLICT(UserID) DO UPDATE SET Wins=Wins+excluded.Wins, Losses=Losses+excluded.Losses;
+    END""")
+    if fresh:
+        # Existing databases: backfill once from history, triggers take over from here
+        c.execute("""INSERT INTO UserStats(UserID,Wins,Losses)
+            SELECT UserID, SUM(Won=1), SUM(Won=0) FROM Match GROUP BY UserID""")
 
 def _seed_sqlite(user_id: int):
-    with _sqlite_conn() as c:
-        cur = c.execute("SELECT COUNT(*) AS c FROM Match WHERE UserID=?", (user_id,))
-        if cur.fetchone()["c"] == 0:
-            for won in [1,0,1,1,0]:
-                c.execute("INSERT INTO Match(UserID,Won) VALUES(?,?)", (user_id, won))
-            c.commit()
+    c = _sqlite_conn()
+    seeded = "SELECT 1 FROM UserStats WHERE UserID=?"
+    if c.execute(seeded, (user_id,)).fetchone():
+        return
+    with c:  # commits on success, rolls back on error
+        # Take the write lock before re-checking so concurrent first requests seed once
+        c.execute("BEGIN IMMEDIATE")
+        if c.execute(seeded, (user_id,)).fetchone() is not None:
+            return
+        now = time.time()
+        c.executemany("INSERT INTO Match(UserID,Won,PlayedAt) VALUES(?,?,?)",
+                      [(user_id, won, now) for won in [1,0,1,1,0]])
+    _index_player(user_id)
+
+# ---- Bulk ingest --------------------------------------------
+# UserName -> UserID for users already in SQLite, filled in after each commit
+_user_ids = {}
+_user_ids_lock = threading.Lock()
+_SQLITE_IN_CHUNK = 500  # stay well below SQLite's bound-parameter limit
+
+def _select_in(c, query, values):
+    """Rows of query (with one IN (...) placeholder) over values, in chunks"""
+    values = list(values)
+    for i in range(0, len(values), _SQLITE_IN_CHUNK):
+        chunk = values[i:i + _SQLITE_IN_CHUNK]
+        yield from c.execute(query.format(",".join("?" * len(chunk))), chunk)
+
+def _played_at(value):
+    """Epoch seconds of an ISO played_at (naive = UTC, as in DB_API), or now"""
+    if not value:
+        return time.time()
+    played = datetime.datetime.fromisoformat(value)
+    if played.tzinfo is None:
+        played = played.replace(tzinfo=datetime.timezone.utc)
+    return played.timestamp()
+
+def _ingest_sqlite(matches):
+    """
+    Scoreboards -> one Match(UserID, Won, Map, KDA, ADR, Rating) row per
+    player, in one transaction.
+    Players are created in "User" on first sight; drawn matches record no rows.
+    """
+    parsed = {}
+    for m in matches:
+        key = match_key(m)
+        ct, t = int(m.get("CT_score", 0)), int(m.get("T_score", 0))
+        teams = {}
+        for p in m["players"]:
+            name = str(p.get("player") or "").strip()
+            if not name or p.get("team") not in ("CT", "T"):
+                raise ValueError(f"player needs a name and a team of CT or T: {p!r}")
+            kda = (float(p.get("Kills", 0)) + float(p.get("Assists", 0))) / max(float(p.get("Deaths", 0)), 1)
+            adr = float(p.get("DMG", 0)) / (ct + t) if ct + t else None
+            rating = float(p["Rating"]) if p.get("Rating") is not None else None
+            teams.setdefault(name, (p["team"], p.get("steam_id"), round(kda, 2), adr and round(adr, 2), rating))
+        winner = None if ct == t else "CT" if ct > t else "T"
+        parsed.setdefault(key, (winner, m.get("map"), _played_at(m.get("played_at")), teams))
+
+    c = _sqlite_conn()
+    with c:
+        c.execute("BEGIN IMMEDIATE")  # the write lock makes the key check race-free
+        seen = {r[0] for r in _select_in(c, "SELECT Key FROM IngestKey WHERE Key IN ({})", parsed)}
+        fresh = {k: v for k, v in parsed.items() if k not in seen}
+        steam_ids = {}
+        for _, _, _, teams in fresh.values():
+            for name, (_, steam_id, *_) in teams.items():
+                steam_ids.setdefault(name, steam_id)
+        with _user_ids_lock:
+            ids = {n: _user_ids[n] for n in steam_ids if n in _user_ids}
+        missing = [n for n in steam_ids if n not in ids]
+        c.executemany('INSERT OR IGNORE INTO "User"(UserName, User_Steam_ID) VALUES(?,?)',
+                      [(n, steam_ids[n]) for n in missing])
+        learned = dict(_select_in(c, 'SELECT UserName, UserID FROM "User" WHERE UserName IN ({})', missing))
+        ids.update(learned)
+        rows = [(ids[name], int(team == winner), map_name, kda, adr, rating, played_at)
+                for winner, map_name, played_at, teams in fresh.values() if winner
+                for name, (team, _, kda, adr, rating) in teams.items()]
+        c.executemany("INSERT INTO Match(UserID,Won,Map,KDA,ADR,Rating,PlayedAt) VALUES(?,?,?,?,?,?,?)", rows)
+        c.executemany("INSERT INTO IngestKey(Key) VALUES(?)", [(k,) for k in fresh])
+    with _user_ids_lock:
+        _user_ids.update(learned)
+    for user_id, *_, played_at in rows:
+        series.backdated(user_id, played_at)
+    for user_id in {row[0] for row in rows}:
+        _index_player(user_id)
+
+    statuses = {k: "inserted" for k in fresh}
+    out = []
+    for m in matches:
+        key = match_key(m)
+        out.append({"key": key, "status": statuses.pop(key, "duplicate")})
+    return {"inserted": len(fresh), "duplicates": len(matches) - len(fresh),
+            "player_rows": len(rows), "matches": out}
+
+# ---- Windowed analytics -------------------------------------
+def _user_series(user_id: int):
+    """
+    The user's cached series, after folding in the matches it has not seen:
+    everything played since the series' re-scan point, in play-time order
+    """
+    s = series.get(user_id)
+    with s.lock:
+        if USE_SQLITE:
+            rows = _sqlite_conn().execute(
+                "SELECT MatchID, COALESCE(PlayedAt, 0) AS played, Map, CASE Won WHEN 1 THEN 1 ELSE -1 END, "
+                "KDA, ADR, Rating FROM Match WHERE UserID=? AND COALESCE(PlayedAt, 0)>=? "
+                "ORDER BY played, MatchID", (user_id, s.since())).fetchall()
+        else:
+            r = http.post(f"{DBAPI}/stream_sql", json={"format": "columnar", "query": (
+                "SELECT b.MatchID, EXTRACT(EPOCH FROM b.MatchDateTime)::float8, m.TemplateID, "
+                "CASE WHEN m.WinningTeam IS NULL THEN 0 WHEN m.WinningTeam = b.Team THEN 1 ELSE -1 END, "
+                "b.KDA, b.ADR, b.Rating "
+                "FROM UserMatchBridge b "
+                "JOIN Match m ON m.MatchID = b.MatchID AND m.MatchDateTime = b.MatchDateTime "
+                "WHERE b.UserID = %s AND b.MatchDateTime >= to_timestamp(%s) AT TIME ZONE 'UTC' "
+                "ORDER BY b.MatchDateTime, b.MatchID"),
+                "params": [user_id, s.since()]}, timeout=30)
+            r.raise_for_status()
+            rows = r.json()["rows"]
+        if rows:
+            series.folded(s.extend(*zip(*rows)))
+        return s
+
+# ---- Friend graph -------------------------------------------
+def _fetch_friends(steamid):
+    r = http.get(f"{STEAM}/steam/user/{steamid}/friends", timeout=10)
+    r.raise_for_status()
+    return [f["steamid"] for f in r.json().get("friends", [])]
+
+def _friend_db():
+    _ensure_sqlite()
+    return sqlite3.connect(SQLITE_PATH, timeout=5, check_same_thread=False)
+
+# Loads the stored graph and then crawls, in the background once the service
+# takes its first request (importing the module starts no threads);
+# requests only read the index and queue misses in memory
+friend_crawler = FriendCrawler(
+    friend_graph, SQLiteFriendStore(_friend_db) if USE_SQLITE else DBAPIFriendStore(http, DBAPI),
+    _fetch_friends, rate=FRIEND_CRAWL_RATE, max_age=FRIEND_MAX_AGE, depth=FRIEND_CRAWL_DEPTH)
+_crawler_lock = threading.Lock()
+metrics.gauges("friend_crawler", lambda: friend_crawler.stats)
+
+@app.before_request
+def _start_friend_crawler():
+    if not FRIEND_CRAWLER or friend_crawler.ident is not None:
+        return
+    with _crawler_lock:
+        if friend_crawler.ident is None:
+            friend_crawler.start()
+
+def _friend_suggestions(steamid, k=10):
+    """[{"steamid", "mutual_friends"}] from the index, or None (player queued for crawling)"""
+    suggestions = friend_graph.suggest(steamid, k=k)
+    if not suggestions:
+        friend_crawler.request(steamid)
+    if suggestions is None:
+        return None
+    return [{"steamid": s, "mutual_friends": n} for s, n in suggestions]
+
+# ---- Similar players ----------------------------------------
+def _win_ratio(wins, losses):
+    games = (wins or 0) + (losses or 0)
+    return (wins or 0) / games if games else 0.0
+
+# Per-player averages over the matches ingest recorded stats for (seeded matches have none)
+PLAYER_FEATURES_SQL = """SELECT s.UserID, s.Wins, s.Losses,
+    AVG(m.KDA) AS kda, AVG(m.ADR) AS adr, AVG(m.Rating) AS rating
+    FROM UserStats s LEFT JOIN Match m ON m.UserID = s.UserID {}
+    GROUP BY s.UserID"""
+
+def _player_features(r):
+    return [r["kda"] or 0, r["adr"] or 0, r["rating"] or 0, _win_ratio(r["Wins"], r["Losses"]), 0]
+
+# DB_API mode: the same features from the UserMatchStats rollup
+PLAYER_STATS_SQL = ("SELECT UserID AS userid, Matches AS matches, Wins AS wins, Losses AS losses, "
+                    "SumKDA AS kda, SumADR AS adr, SumRating AS rating FROM UserMatchStats")
+
+def _stats_features(n, wins, losses, kda, adr, rating):
+    n = max(n, 1)
+    return [float(kda)/n, float(adr)/n, float(rating)/n, _win_ratio(wins, losses), 0]
+
+def _ensure_players(deadline=None):
+    """
+    Load every player's features into the index once; updates are
+    incremental after that. deadline bounds the DB_API load.
+    """
+    global _players_loaded
+    if _players_loaded:
+        return
+    with _players_lock:
+        if _players_loaded:
+            return
+        keys, rows = [], []
+        if USE_SQLITE:
+            for r in _sqlite_conn().execute(PLAYER_FEATURES_SQL.format("")):
+                keys.append(r["UserID"])
+                rows.append(_player_features(r))
+        else:
+            timeout = 30 if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                raise TimeoutError("deadline exceeded before request was sent")
+            # Columnar stream: one row list per player, no repeated column names
+            r = http.post(f"{DBAPI}/stream_sql", json={"format": "columnar", "query": PLAYER_STATS_SQL},
+                          timeout=timeout)
+            r.raise_for_status()
+            for uid, *stats in r.json()["rows"]:
+                keys.append(uid)
+                rows.append(_stats_features(*stats))
+        players.bulk_load(keys, rows)
+        _players_loaded = True
+
+def _index_player(user_id: int):
+    """Refresh one player's row after new matches land"""
+    if not _players_loaded:
+        return  # picked up by the initial load
+    row = _sqlite_conn().execute(PLAYER_FEATURES_SQL.format("WHERE s.UserID=?"), (user_id,)).fetchone()
+    if row:
+        kda, adr, rating, win_ratio, _ = _player_features(row)
+        players.upsert(user_id, kda=kda, adr=adr, rating=rating, win_ratio=win_ratio)
+
+def _index_players_db_api(user_ids):
+    """Refresh the rows of players a DB_API ingest added matches for"""
+    global _players_loaded
+    if not _players_loaded or not user_ids:
+        return
+    try:
+        r = http.post(f"{DBAPI}/execute_sql", json={
+            "query": PLAYER_STATS_SQL + " WHERE UserID = ANY(%s)", "params": [list(user_ids)]}, timeout=30)
+        r.raise_for_status()
+        for row in r.json()["results"]:
+            kda, adr, rating, win_ratio, _ = _stats_features(
+                row["matches"], row["wins"], row["losses"], row["kda"], row["adr"], row["rating"])
+            players.upsert(row["userid"], kda=kda, adr=adr, rating=rating, win_ratio=win_ratio)
+    except Exception:
+        # The matches are stored; reload the whole index on the next query instead
+        with _players_lock:
+            _players_loaded = False
+
+STEAM_OWNER_SQL = 'SELECT UserID AS user_id FROM "User" WHERE User_Steam_ID = %s'
+
+def _steam_owner(steamid, deadline):
+    """UserID registered with steamid, or None; Steam data is only ever applied to its owner"""
+    if USE_SQLITE:
+        row = _sqlite_conn().execute('SELECT UserID FROM "User" WHERE User_Steam_ID=?', (steamid,)).fetchone()
+        return row["UserID"] if row else None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("deadline exceeded before request was sent")
+    r = http.post(f"{DBAPI}/execute_sql", json={"query": STEAM_OWNER_SQL, "params": [steamid], "cache": True},
+                  timeout=remaining)
+    r.raise_for_status()
+    rows = r.json()["results"]
+    return rows[0]["user_id"] if rows else None
+
+def _similar_players(user_id, k=10, metric="cosine", approximate=None):
+    _ensure_players()
+    if approximate is None:
+        approximate = len(players) >= SIMILAR_APPROX_MIN
+    return [{"user_id": key, "score": score}
+            for key, score in players.query(user_id, k=k, metric=metric, approximate=approximate)]
+
+def _get_json(url, deadline):
+    """GET url with whatever is left of the caller's deadline as the timeout"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("deadline exceeded before request was sent")
+    r = http.get(url, timeout=remaining)
+    r.raise_for_status()
+    return r.json()
+
+# One-row lookup in the rollup the triggers in DB/init_db.py keep current
+PATTERN_SQL = "SELECT Wins AS wins, Losses AS losses FROM UserMatchStats WHERE UserID = %s"
 
 # ---- Routes -------------------------------------------------
 @app.get("/")
@@ -51,8 +454,14 @@ def index():
         "endpoints":{
             "GET /health":"basic health check",
             "GET /pattern?user_id=1":"compute win/loss ratio",
+            "GET /pattern/window?user_id=1&n=20&window=5":"recent form: last N, rolling win rate, streaks, splits, trends",
             "GET /similar?steamid=...":"propose similar players",
-            "POST /coach":"coaching tips"
+            "GET /similar/players?user_id=1":"nearest players by match stats",
+            "GET /friends/suggest?steamid=...":"friends of friends ranked by mutual friends",
+            "GET /friends/mutual?steamid=...&other=...":"mutual friends of two players",
+            "POST /matches/ingest":"bulk-load scoreboards (idempotent)",
+            "POST /coach":"coaching tips",
+            "POST /coach/batch":"coaching tips for a whole team or scoreboard"
         }
     })
 
@@ -64,33 +473,19 @@ def pattern():
     user = int(request.args.get("user_id","1"))
     try:
         if USE_SQLITE:
-            _ensure_sqlite()
             _seed_sqlite(user)
-            with _sqlite_conn() as c:
-                row = c.execute("""
-                    SELECT
-                      SUM(CASE WHEN Won=1 THEN 1 ELSE 0 END) AS wins,
-                      SUM(CASE WHEN Won=0 THEN 1 ELSE 0 END) AS losses
-                    FROM Match WHERE UserID=?""", (user,)
-                ).fetchone()
-            wins   = int(row["wins"] or 0)
-            losses = int(row["losses"] or 0)
+            row = _sqlite_conn().execute(
+                "SELECT Wins AS wins, Losses AS losses FROM UserStats WHERE UserID=?", (user,)
+            ).fetchone()
+            wins   = int(row["wins"] if row else 0)
+            losses = int(row["losses"] if row else 0)
         else:
-            # Old path via DB_API (kept for later if you fix DB_API)
-            def db_post(payload):
-                r = requests.post(f"{DBAPI}/execute_sql", json=payload, timeout=10)
-                r.raise_for_status()
-                return r.json()
-            db_post({"query":'CREATE TABLE IF NOT EXISTS "Match"("MatchID" SERIAL PRIMARY KEY,"UserID" INT,"Won" BOOLEAN)'})
-            cnt = db_post({"query":'SELECT COUNT(*) AS c FROM "Match" WHERE "UserID"=%s', "params":[user]})["results"][0]["c"]
-            if not cnt:
-                for won in [True,False,True,True,False]:
-                    db_post({"query":'INSERT INTO "Match"("UserID","Won") VALUES (%s,%s)', "params":[user, won]})
-            agg = db_post({"query":(
-                'SELECT COALESCE(SUM(CASE WHEN "Won" THEN 1 ELSE 0 END),0) AS wins,'
-                'COALESCE(SUM(CASE WHEN NOT "Won" THEN 1 ELSE 0 END),0) AS losses '
-                'FROM "Match" WHERE "UserID"=%s'), "params":[user]})["results"][0]
-            wins, losses = int(agg["wins"]), int(agg["losses"])
+            # Served from DB_API's result cache until the user's matches change
+            r = http.post(f"{DBAPI}/execute_sql", json={"query": PATTERN_SQL, "params": [user], "cache": True},
+                          timeout=10)
+            r.raise_for_status()
+            rows = r.json()["results"]
+            wins, losses = (int(rows[0]["wins"]), int(rows[0]["losses"])) if rows else (0, 0)
 
         ratio = round(wins / max(losses,1), 2)
         return ok({"user_id": user, "wins": wins, "losses": losses, "win_loss_ratio": ratio})
@@ -99,27 +494,218 @@ def pattern():
     except Exception as e:
         return err(500, "Failed to compute pattern", e)
 
+@app.get("/pattern/window")
+def pattern_window():
+    """
+    Recent form for one user: the last n results, win rate over each rolling
+    window, current/longest streaks, per-map (SQLite) or per-template splits,
+    and KDA/ADR/Rating trends over the last n matches.
+    """
+    try:
+        user = int(request.args.get("user_id", "1"))
+        n = int(request.args.get("n", "20"))
+        window = int(request.args.get("window", "5"))
+    except ValueError as e:
+        return err(400, "user_id, n and window must be integers", e)
+    try:
+        if USE_SQLITE:
+            _seed_sqlite(user)
+        s = _user_series(user)
+        with s.lock:
+            out = s.summary(n=n, window=window)
+        out["user_id"] = user
+        out["split_by"] = "map" if USE_SQLITE else "template"
+        return ok(out)
+    except requests.HTTPError as e:
+        return err(502, "DB_API HTTP error", e)
+    except Exception as e:
+        return err(500, "Failed to compute windowed pattern", e)
+
+@app.get("/pattern/window/stats")
+def pattern_window_stats():
+    return ok(series.snapshot())
+
 @app.get("/similar")
 def similar():
     sid = request.args.get("steamid")
     if not sid:
         return err(400, "steamid required (query param)")
     try:
-        # If no Steam key, just return a friendly stub instead of erroring
+        # Playtime comes from Steam within the deadline; friend candidates come
+        # from the friend-graph index only. Whatever is not available in time
+        # (or fails, e.g. no Steam key / player not crawled yet) falls back to
+        # a friendly stub instead of erroring.
+        deadline = time.monotonic() + SIMILAR_DEADLINE
+        call = _fanout.submit(_get_json, f"{STEAM}/steam/user/{sid}/cs2", deadline)
+        degraded, errors = [], {}
         try:
-            cs2  = requests.get(f"{STEAM}/steam/user/{sid}/cs2", timeout=10).json().get("playtime", {})
-            frns = requests.get(f"{STEAM}/steam/user/{sid}/friends", timeout=10).json().get("friends", [])
-        except Exception:
-            cs2, frns = {"appid":730,"playtime_forever":1200}, [{"steamid":"stub1"},{"steamid":"stub2"}]
-        return ok({"user": sid, "cs2_playtime": cs2, "candidate_friends": frns[:10]})
+            frns = _friend_suggestions(sid)
+            if frns is None:
+                errors["friends"] = "player not indexed yet"
+        except Exception as e:
+            frns = None
+            errors["friends"] = str(e)
+        done, _ = wait([call], timeout=max(deadline - time.monotonic(), 0))
+        if call not in done:
+            degraded.append("cs2")
+            errors["cs2"] = "deadline exceeded"
+        elif call.exception():
+            degraded.append("cs2")
+            errors["cs2"] = str(call.exception())
+        if frns is None:
+            degraded.append("friends")
+
+        cs2  = {"appid":730,"playtime_forever":1200}
+        if "cs2" not in degraded:
+            cs2 = call.result().get("playtime", {})
+        if frns is None:
+            frns = [{"steamid":"stub1"},{"steamid":"stub2"}]
+        out = {"user": sid, "cs2_playtime": cs2, "candidate_friends": frns[:10],
+               "degraded": degraded, "errors": errors}
+
+        user_id = request.args.get("user_id", type=int)
+        if user_id is not None:
+            try:
+                _ensure_players(deadline)
+                if "cs2" not in degraded and cs2:
+                    # Only the player registered with this steamid gets its playtime,
+                    # and only if they are already indexed
+                    try:
+                        owner = _steam_owner(sid, deadline)
+                    except Exception:
+                        owner = None
+                    if owner is not None and owner in players:
+                        players.upsert(owner, playtime_hours=cs2.get("playtime_forever", 0) / 60)
+                out["similar_players"] = _similar_players(user_id)
+            except KeyError:
+                out["similar_players"] = []
+            except Exception as e:
+                # e.g. DB_API timed out loading the index: answer with the rest
+                degraded.append("similar_players")
+                errors["similar_players"] = str(e)
+                out["similar_players"] = []
+        return ok(out)
     except Exception as e:
         return err(500, "Failed to fetch similar players", e)
 
+@app.get("/friends/suggest")
+def friends_suggest():
+    """Friends of friends for a steamid, ranked by mutual friends, from the index"""
+    sid = request.args.get("steamid")
+    if not sid:
+        return err(400, "steamid required (query param)")
+    if not valid_steamid(sid):
+        return err(400, "steamid must be a 17-digit SteamID64")
+    k = request.args.get("k", default=10, type=int)
+    try:
+        suggestions = _friend_suggestions(sid, k=max(1, min(k, 100)))
+    except Exception as e:
+        return err(500, "Failed to read friend graph", e)
+    if suggestions is None:
+        return err(404, "player not indexed yet; queued for crawling")
+    return ok({"steamid": sid, "suggestions": suggestions})
+
+@app.get("/friends/mutual")
+def friends_mutual():
+    a, b = request.args.get("steamid"), request.args.get("other")
+    if not a or not b:
+        return err(400, "steamid and other required (query params)")
+    if not valid_steamid(a) or not valid_steamid(b):
+        return err(400, "steamid and other must be 17-digit SteamID64s")
+    try:
+        common = friend_graph.mutual(a, b)
+    except Exception as e:
+        return err(500, "Failed to read friend graph", e)
+    if common is None:
+        return err(404, "player not indexed yet")
+    return ok({"steamid": a, "other": b, "count": len(common), "mutual_friends": common})
+
+@app.get("/friends/stats")
+def friends_stats():
+    return ok({"graph": friend_graph.snapshot(),
+               "crawler": dict(friend_crawler.stats, running=friend_crawler.is_alive())})
+
+@app.get("/similar/players")
+def similar_players():
+    user_id = request.args.get("user_id", type=int)
+    if user_id is None:
+        return err(400, "user_id required (query param)")
+    k = min(max(request.args.get("k", 10, type=int), 1), 100)
+    metric = request.args.get("metric", "cosine")
+    approximate = request.args.get("approximate")
+    if approximate is not None:
+        approximate = approximate in ("1", "true", "yes")
+    try:
+        started = time.perf_counter()
+        similar = _similar_players(user_id, k=k, metric=metric, approximate=approximate)
+        took_ms = round((time.perf_counter() - started) * 1000, 3)
+        return ok({"user_id": user_id, "metric": metric, "similar_players": similar,
+                   "population": len(players), "took_ms": took_ms})
+    except KeyError:
+        return err(404, "unknown user_id", user_id)
+    except ValueError as e:
+        return err(400, "invalid query", e)
+    except requests.HTTPError as e:
+        return err(502, "DB_API HTTP error", e)
+    except Exception as e:
+        return err(500, "Failed to find similar players", e)
+
+@app.post("/matches/ingest")
+def ingest_matches():
+    """
+    Bulk-load scoreboards shaped like save_cs2_scoreboard output:
+    {"matches": [{"players": [...], "CT_score": n, "T_score": n,
+                  "idempotency_key"?: str, "played_at"?: iso}, ...]}
+    or a single scoreboard. Retrying with the same keys inserts nothing twice.
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    matches = [payload] if "players" in payload else payload.get("matches")
+    if not isinstance(matches, list) or not matches:
+        return err(400, "expected a scoreboard or a non-empty 'matches' list")
+    if len(matches) > INGEST_MAX_MATCHES:
+        return err(400, f"at most {INGEST_MAX_MATCHES} matches per request")
+    if not all(isinstance(m, dict) and isinstance(m.get("players"), list) for m in matches):
+        return err(400, "each match needs a 'players' list")
+    try:
+        if USE_SQLITE:
+            return ok(_ingest_sqlite(matches))
+        r = http.post(f"{DBAPI}/ingest/matches", json={"matches": matches}, timeout=120)
+        if r.status_code == 400:
+            return err(400, "Invalid matches", r.json().get("error"))
+        r.raise_for_status()
+        summary = r.json()
+        # DB_API does not say whose matches they were: an import of old
+        # matches rebuilds every cached series
+        horizon = time.time() - series.rescan
+        inserted = {m["key"] for m in summary.get("matches", []) if m.get("status") == "inserted"}
+        if any(_played_at(m.get("played_at")) < horizon for m in matches if match_key(m) in inserted):
+            series.clear()
+        _index_players_db_api(summary.get("user_ids", []))
+        return ok(summary)
+    except (AttributeError, TypeError, ValueError) as e:
+        return err(400, "Invalid matches", e)
+    except requests.HTTPError as e:
+        return err(502, "DB_API HTTP error", e)
+    except Exception as e:
+        return err(500, "Failed to ingest matches", e)
+
 @app.post("/coach")
 def coach():
     try:
         payload = request.get_json(force=True, silent=True) or {}
-        r = requests.post(f"{LLM}/coach", json=payload, timeout=10)
+        r = http.post(f"{LLM}/coach", json=payload, timeout=10)
+        r.raise_for_status()
+        return ok(r.json())
+    except requests.HTTPError as e:
+        return err(502, "LLM service HTTP error", e)
+    except Exception as e:
+        return err(500, "Failed to get coaching tips", e)
+
+@app.post("/coach/batch")
+def coach_batch():
+    try:
+        payload = request.get_json(force=True, silent=True) or {}
+        r = http.post(f"{LLM}/coach/batch", json=payload, timeout=30)
         r.raise_for_status()
         return ok(r.json())
     except requests.HTTPError as e:
@@ -128,4 +714,6 @@ def coach():
         return err(500, "Failed to get coaching tips", e)
 
 if __name__ == "__main__":
+    if USE_SQLITE:
+        _ensure_sqlite()
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,412 @@
+"""
+Steam friend graph: persistent adjacency lists, an in-memory CSR index and a
+background crawler that keeps both fresh.
+
+Each crawled player's friend list is stored as (Src, Dst) rows, in the match
+SQLite file or in Postgres through DB_API. In memory the lists form a CSR
+matrix (indptr/indices arrays over integer node ids) plus its transpose, so
+a player who has not been crawled (or whose list is private) still has the
+players that list them as friends. Refreshed lists go to a small overlay
+that is folded into new arrays every rebuild_every updates, so a refresh
+never rewrites the whole index. Friends-of-friends suggestions and mutual
+friend counts are a few array slices and one np.unique, no Steam calls.
+
+The crawler works through FriendCrawl: never-crawled players first, then
+stale ones, each by priority (0 = asked for directly, 1 = their friends,
+...) and age, at no more than rate Steam calls per second. Only SteamID64s
+are queued; a player whose crawl keeps failing is retried with exponential
+backoff and dropped from the queue after max_failures attempts.
+"""
+
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+STEAMID64 = re.compile(r"\d{17}")
+
+
+def valid_steamid(steamid):
+    return isinstance(steamid, str) and STEAMID64.fullmatch(steamid) is not None
+
+
+class FriendGraph:
+    def __init__(self, rebuild_every=1000):
+        self.rebuild_every = rebuild_every
+        self._ids = {}     # steamid -> node id
+        self._names = []   # node id -> steamid
+        self._out = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))  # (indptr, indices)
+        self._in = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+        self._overlay = {}  # node id -> friend ids, newer than _out
+        self._lock = threading.RLock()
+        self.stats = {"rebuilds": 0, "updates": 0, "queries": 0}
+
+    def __len__(self):
+        return len(self._names)
+
+    def _node(self, steamid):
+        i = self._ids.get(steamid)
+        if i is None:
+            i = self._ids[steamid] = len(self._names)
+            self._names.append(steamid)
+        return i
+
+    # ---- Building --------------------------------------------
+    def bulk_load(self, edges):
+        """Replace the index with (src steamid, dst steamid) pairs"""
+        with self._lock:
+            self._ids, self._names, self._overlay = {}, [], {}
+            pairs = [(self._node(s), self._node(d)) for s, d in edges]
+            pairs = np.array(pairs, dtype=np.int32).reshape(-1, 2)
+            self._build(pairs[:, 0], pairs[:, 1])
+
+    def set_friends(self, steamid, friends):
+        """A fresh friend list for one player; visible to queries immediately"""
+        with self._lock:
+            node = self._node(steamid)
+            self._overlay[node] = np.unique(np.array([self._node(f) for f in friends], dtype=np.int32))
+            self.stats["updates"] += 1
+            if len(self._overlay) >= self.rebuild_every:
+                self.rebuild()
+
+    def rebuild(self):
+        """Fold the overlay into new CSR arrays"""
+        with self._lock:
+            indptr, indices = self._out
+            src = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+            keep = ~np.isin(src, np.fromiter(self._overlay, dtype=np.int32, count=len(self._overlay)))
+            fresh = list(self._overlay.items())
+            src = np.concatenate([src[keep]] + [np.full(len(f), n, dtype=np.int32) for n, f in fresh])
+            dst = np.concatenate([indices[keep]] + [f for _, f in fresh])
+            self._overlay = {}
+            self._build(src, dst)
+
+    def _build(self, src, dst):
+        n = len(self._names)
+        self._out = _csr(src, dst, n)
+        self._in = _csr(dst, src, n)
+        self.stats["rebuilds"] += 1
+
+    # ---- Queries ---------------------------------------------
+    def _neighbors(self, node):
+        friends = self._overlay.get(node)
+        if friends is not None:
+            return friends
+        for indptr, indices in (self._out, self._in):
+            if node < len(indptr) - 1 and indptr[node + 1] > indptr[node]:
+                return indices[indptr[node]:indptr[node + 1]]
+        return np.zeros(0, dtype=np.int32)
+
+    def friends(self, steamid):
+        """Known friends of a player, or None if the player is not in the index"""
+        with self._lock:
+            node = self._ids.get(steamid)
+            if node is None:
+                return None
+            return [self._names[i] for i in self._neighbors(node).tolist()]
+
+    def suggest(self, steamid, k=10):
+        """
+        Friends of friends who are not friends yet, most mutual friends first.
+        Returns [(steamid, mutual friend count)], or None if the player is unknown.
+        """
+        with self._lock:
+            self.stats["queries"] += 1
+            node = self._ids.get(steamid)
+            if node is None:
+                return None
+            direct = self._neighbors(node)
+            if not direct.size:
+                return []
+            reach = np.concatenate([self._neighbors(f) for f in direct.tolist()])
+            candidates, mutual = np.unique(reach, return_counts=True)
+            keep = ~np.isin(candidates, direct) & (candidates != node)
+            candidates, mutual = candidates[keep], mutual[keep]
+            top = np.argsort(-mutual, kind="stable")[:k]
+            return [(self._names[c], int(m)) for c, m in zip(candidates[top].tolist(), mutual[top].tolist())]
+
+    def mutual(self, a, b):
+        """Friends a and b have in common, or None if either is unknown"""
+        with self._lock:
+            self.stats["queries"] += 1
+            na, nb = self._ids.get(a), self._ids.get(b)
+            if na is None or nb is None:
+                return None
+            common = np.intersect1d(self._neighbors(na), self._neighbors(nb), assume_unique=True)
+            return [self._names[i] for i in common.tolist()]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, nodes=len(self._names), edges=int(len(self._out[1])),
+                        pending_updates=len(self._overlay))
+
+
+def _csr(src, dst, n):
+    """(indptr, indices) with each row's indices sorted and de-duplicated"""
+    order = np.lexsort((dst, src))
+    src, dst = src[order], dst[order]
+    if len(src):
+        first = np.r_[True, (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])]
+        src, dst = src[first], dst[first]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst.astype(np.int32)
+
+
+# ---- Persistence ----------------------------------------------
+class SQLiteFriendStore:
+    """FriendEdge / FriendCrawl tables in the match SQLite file, opened on first use"""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._db = None
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self):
+        if self._db is None:
+            self._db = self._open()
+        return self._db
+
+    def _open(self):
+        conn = self._connect()
+        with conn as c:
+            c.execute("""CREATE TABLE IF NOT EXISTS FriendEdge(
+                Src TEXT NOT NULL,
+                Dst TEXT NOT NULL,
+                PRIMARY KEY (Src, Dst)
+            ) WITHOUT ROWID""")
+            c.execute("""CREATE TABLE IF NOT EXISTS FriendCrawl(
+                SteamID   TEXT PRIMARY KEY,
+                Priority  INTEGER NOT NULL,
+                CrawledAt REAL,             -- unix time, NULL = never
+                Status    TEXT,
+                Failures  INTEGER NOT NULL DEFAULT 0  -- consecutive failed crawls
+            )""")
+            if "Failures" not in {r[1] for r in c.execute("PRAGMA table_info(FriendCrawl)")}:
+                c.execute("ALTER TABLE FriendCrawl ADD COLUMN Failures INTEGER NOT NULL DEFAULT 0")
+            c.execute("DROP INDEX IF EXISTS idx_friendcrawl_due")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_friendcrawl_next "
+                      "ON FriendCrawl(CrawledAt IS NOT NULL, Priority, CrawledAt)")
+        return conn
+
+    def edges(self):
+        with self._lock:
+            return self._conn.execute("SELECT Src, Dst FROM FriendEdge").fetchall()
+
+    def enqueue(self, steamids, priority):
+        with self._lock, self._conn as c:
+            c.executemany("""INSERT INTO FriendCrawl(SteamID, Priority) VALUES(?,?)
+                ON CONFLICT(SteamID) DO UPDATE SET Priority=MIN(Priority, excluded.Priority)""",
+                          [(s, priority) for s in steamids])
+
+    def due(self, limit, crawled_before):
+        """(steamid, priority, failures) of players to crawl next, never-crawled ones first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT SteamID, Priority, Failures FROM FriendCrawl WHERE CrawledAt IS NULL OR CrawledAt < ? "
+                "ORDER BY CrawledAt IS NOT NULL, Priority, CrawledAt LIMIT ?", (crawled_before, limit)).fetchall()
+
+    def save(self, steamid, friends, crawled_at, status, failures=0):
+        """Record a crawl; friends=None keeps the previous list (failed crawl)"""
+        with self._lock, self._conn as c:
+            if friends is not None:
+                c.execute("DELETE FROM FriendEdge WHERE Src=?", (steamid,))
+                c.executemany("INSERT OR IGNORE INTO FriendEdge(Src, Dst) VALUES(?,?)",
+                              [(steamid, f) for f in friends])
+            c.execute("UPDATE FriendCrawl SET CrawledAt=?, Status=?, Failures=? WHERE SteamID=?",
+                      (crawled_at, status, failures, steamid))
+
+    def drop(self, steamid):
+        """Take a player off the crawl schedule (its stored friend list stays)"""
+        with self._lock, self._conn as c:
+            c.execute("DELETE FROM FriendCrawl WHERE SteamID=?", (steamid,))
+
+
+class DBAPIFriendStore:
+    """The same tables in Postgres (DB/init_db.py), through DB_API"""
+
+    def __init__(self, http, base_url):
+        self._http = http
+        self._url = base_url
+
+    def _post(self, path, payload, timeout=30):
+        r = self._http.post(f"{self._url}{path}", json=payload, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def edges(self):
+        return self._post("/stream_sql", {"format": "columnar",
+                                          "query": "SELECT Src, Dst FROM FriendEdge"}, timeout=300)["rows"]
+
+    def enqueue(self, steamids, priority):
+        self._post("/execute_batch", {"statements": [{
+            "query": ("INSERT INTO FriendCrawl (SteamID, Priority) VALUES (%s, %s) "
+                      "ON CONFLICT (SteamID) DO UPDATE SET Priority = LEAST(FriendCrawl.Priority, EXCLUDED.Priority)"),
+            "many": [[s, priority] for s in steamids]}]})
+
+    def due(self, limit, crawled_before):
+        rows = self._post("/execute_sql", {
+            "query": ("SELECT SteamID, Priority, Failures FROM FriendCrawl "
+                      "WHERE CrawledAt IS NULL OR CrawledAt < %s "
+                      "ORDER BY (CrawledAt IS NOT NULL), Priority, CrawledAt LIMIT %s"),
+            "params": [crawled_before, limit]})["results"]
+        return [(r["steamid"], r["priority"], r["failures"]) for r in rows]
+
+    def save(self, steamid, friends, crawled_at, status, failures=0):
+        statements = []
+        if friends is not None:
+            statements += [
+                {"query": "DELETE FROM FriendEdge WHERE Src = %s", "params": [steamid]},
+                {"query": "INSERT INTO FriendEdge (Src, Dst) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                 "many": [[steamid, f] for f in friends]},
+            ]
+        statements.append({
+            "query": "UPDATE FriendCrawl SET CrawledAt = %s, Status = %s, Failures = %s WHERE SteamID = %s",
+            "params": [crawled_at, status, failures, steamid]})
+        self._post("/execute_batch", {"statements": statements})
+
+    def drop(self, steamid):
+        self._post("/execute_sql", {"query": "DELETE FROM FriendCrawl WHERE SteamID = %s", "params": [steamid]})
+
+
+# ---- Crawler --------------------------------------------------
+class FriendCrawler(threading.Thread):
+    """
+    Background thread that loads the stored graph into the index, then
+    refreshes friend lists from Steam (rate=0: load only, no crawling).
+    fetch(steamid) returns a list of friend steamids and raises on failure.
+    request() only adds to an in-memory queue of up to queue_size players,
+    which the thread writes to FriendCrawl, so callers never wait on the store.
+    Players are re-crawled once their list is max_age seconds old. A failed
+    crawl is retried after retry_after seconds, doubling with every further
+    failure (capped at max_age); after max_failures in a row the player is
+    dropped from the schedule. Friends of players with priority < depth are
+    queued behind them, so 2-hop queries around requested players are
+    covered.
+    """
+
+    def __init__(self, graph, store, fetch, rate=1.0, max_age=86400.0, retry_after=600.0, depth=1, batch=50,
+                 max_failures=5, queue_size=10000, clock=time.time):
+        super().__init__(name="friend-crawler", daemon=True)
+        self.graph = graph
+        self.store = store
+        self.fetch = fetch
+        self.interval = 1.0 / rate if rate > 0 else None
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self.max_failures = max_failures
+        self.queue_size = queue_size
+        self._requested = {}  # steamid -> None, in request order, not yet in the store
+        self._requested_lock = threading.Lock()
+        self.depth = depth
+        self.batch = batch
+        self.clock = clock
+        self._wake = threading.Event()
+        self._halt = threading.Event()
+        self.stats = {"crawled": 0, "failed": 0, "dropped": 0, "last_crawl": None,
+                      "loaded": False, "load_errors": 0, "requests_dropped": 0}
+
+    def request(self, steamid):
+        """
+        Queue a player at top priority (e.g. someone just asked about them).
+        False if it is not a SteamID64, crawling is off or the queue is full.
+        """
+        if self.interval is None or not valid_steamid(steamid):
+            return False
+        with self._requested_lock:
+            if steamid not in self._requested:
+                if len(self._requested) >= self.queue_size:
+                    self.stats["requests_dropped"] += 1
+                    return False
+                self._requested[steamid] = None
+        self._wake.set()
+        return True
+
+    def _flush_requests(self):
+        """Write queued requests to FriendCrawl; kept for the next round if the store fails"""
+        with self._requested_lock:
+            steamids, self._requested = list(self._requested), {}
+        if not steamids:
+            return
+        try:
+            self.store.enqueue(steamids, 0)
+        except Exception:
+            log.exception("could not queue %d requested players", len(steamids))
+            with self._requested_lock:
+                for steamid in steamids[:self.queue_size - len(self._requested)]:
+                    self._requested.setdefault(steamid, None)
+
+    def _load(self):
+        """Fill the index from the store, retrying with backoff until it works"""
+        delay = 1.0
+        while not self._halt.is_set():
+            try:
+                self.graph.bulk_load(self.store.edges())
+                self.stats["loaded"] = True
+                return True
+            except Exception:
+                self.stats["load_errors"] += 1
+                log.exception("loading the friend graph failed; retrying in %.0fs", delay)
+            if self._halt.wait(delay):
+                break
+            delay = min(delay * 2, 300.0)
+        return False
+
+    def stop(self):
+        self._halt.set()
+        self._wake.set()
+
+    def run(self):
+        if not self._load() or self.interval is None:
+            return
+        next_call = 0.0
+        while not self._halt.is_set():
+            self._flush_requests()
+            try:
+                due = self.store.due(self.batch, self.clock() - self.max_age)
+            except Exception:
+                log.exception("reading the crawl schedule failed")
+                due = []
+            if not due:
+                self._wake.wait(timeout=5.0)
+                self._wake.clear()
+                continue
+            for steamid, priority, failures in due:
+                if self._requested:
+                    break  # requested players go ahead of the rest of this batch
+                delay = next_call - time.monotonic()
+                if delay > 0 and self._halt.wait(delay):
+                    return
+                next_call = time.monotonic() + self.interval
+                try:
+                    self.crawl(steamid, priority, failures)
+                except Exception:
+                    self.stats["failed"] += 1  # store unavailable; picked up again later
+
+    def crawl(self, steamid, priority=0, failures=0):
+        now = self.clock()
+        try:
+            friends = self.fetch(steamid)
+        except Exception as e:
+            self.stats["failed"] += 1
+            failures += 1
+            if failures >= self.max_failures:
+                self.store.drop(steamid)
+                self.stats["dropped"] += 1
+                return
+            # Due again after the backoff, not after a full max_age
+            backoff = min(self.retry_after * 2 ** (failures - 1), self.max_age)
+            self.store.save(steamid, None, now - self.max_age + backoff, f"error: {e}"[:200], failures)
+            return
+        self.store.save(steamid, friends, now, "ok")
+        self.graph.set_friends(steamid, friends)
+        queue = [f for f in friends if valid_steamid(f)] if priority < self.depth else []
+        if queue:
+            self.store.enqueue(queue, priority + 1)
+        self.stats["crawled"] += 1
+        self.stats["last_crawl"] = now
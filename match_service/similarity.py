@@ -0,0 +1,212 @@
+"""
+In-memory similar-player index.
+
+Players are rows of a float32 feature matrix (KDA, ADR, Rating, win ratio,
+CS2 playtime). Features are z-score normalised across the population and
+compared with cosine similarity or Euclidean distance in one matrix pass.
+Rows are updated in place as matches arrive: changed rows are re-normalised
+against the current population statistics on the next query, and the
+statistics themselves are only recomputed once enough rows have changed.
+
+For large populations an optional IVF-style approximate mode clusters the
+normalised vectors with a few k-means iterations and only scans the players
+in the clusters closest to the query.
+"""
+
+import threading
+
+import numpy as np
+
+FEATURES = ("kda", "adr", "rating", "win_ratio", "playtime_hours")
+
+
+class SimilarityIndex:
+    def __init__(self, features=FEATURES, capacity=1024, seed=0):
+        self.features = tuple(features)
+        self._col = {name: i for i, name in enumerate(self.features)}
+        self._raw = np.zeros((capacity, len(self.features)), dtype=np.float32)
+        self._keys = []   # row -> player key
+        self._rows = {}   # player key -> row
+        self._lock = threading.RLock()
+        self._rng = np.random.default_rng(seed)
+
+        # Normalised copies of _raw, same capacity; valid up to len(self)
+        self._normed = None
+        self._unit = None        # unit-length rows of _normed, for cosine
+        self._sqnorm = None      # squared row norms of _normed, for euclidean
+        self._dirty = set()      # rows changed since they were last normalised
+        self._stale_updates = 0  # updates since mu/sigma were last computed
+        # Approximate mode state
+        self._centroids = None
+        self._assign = None      # row -> cluster id, -1 = not yet assigned; same capacity as _raw
+        self._updates_since_build = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    # ---- Updates ---------------------------------------------
+    def upsert(self, key, **features):
+        """Set some or all features for a player; unspecified ones keep their value"""
+        unknown = set(features) - set(self._col)
+        if unknown:
+            raise ValueError(f"unknown features: {sorted(unknown)}")
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = len(self._keys)
+                if row == len(self._raw):
+                    # Double the capacity so inserts are amortised O(1)
+                    self._raw = np.concatenate([self._raw, np.zeros_like(self._raw)])
+                    if self._assign is not None:
+                        self._assign = np.concatenate([self._assign, np.full_like(self._assign, -1)])
+                self._raw[row] = 0
+                self._keys.append(key)
+                self._rows[key] = row
+            for name, value in features.items():
+                self._raw[row, self._col[name]] = 0.0 if value is None else float(value)
+            self._dirty.add(row)
+            self._stale_updates += 1
+            if self._assign is not None:
+                self._updates_since_build += 1
+                self._assign[row] = -1  # reassigned lazily against the current centroids
+
+    def bulk_load(self, keys, matrix):
+        """Replace the whole index with rows of matrix (n x len(features))"""
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(len(keys), len(self.features))
+        with self._lock:
+            self._raw = np.array(matrix, dtype=np.float32)
+            self._keys = list(keys)
+            self._rows = {key: i for i, key in enumerate(self._keys)}
+            self._normed = None
+            self._centroids = self._assign = None
+
+    # ---- Queries ---------------------------------------------
+    def _normalised(self):
+        n = len(self._keys)
+        if (self._normed is None or len(self._normed) != len(self._raw)
+                or self._stale_updates > max(n // 10, 1000)):
+            x = self._raw[:n]
+            self._mu = x.mean(axis=0)
+            sigma = x.std(axis=0)
+            sigma[sigma == 0] = 1.0
+            self._sigma = sigma
+            self._normed = np.zeros_like(self._raw)
+            self._unit = np.zeros_like(self._raw)
+            self._sqnorm = np.zeros(len(self._raw), dtype=np.float32)
+            rows = slice(0, n)
+        elif self._dirty:
+            rows = np.fromiter(self._dirty, dtype=np.int64)
+        else:
+            return self._normed[:n], self._unit[:n]
+
+        normed = (self._raw[rows] - self._mu) / self._sigma
+        sq = (normed ** 2).sum(axis=1)
+        norms = np.sqrt(sq)
+        norms[norms == 0] = 1.0
+        self._normed[rows] = normed
+        self._unit[rows] = normed / norms[:, None]
+        self._sqnorm[rows] = sq
+        self._dirty.clear()
+        self._stale_updates = 0 if isinstance(rows, slice) else self._stale_updates
+        return self._normed[:n], self._unit[:n]
+
+    def query(self, key=None, vector=None, k=10, metric="cosine", approximate=False, nprobe=4):
+        """
+        Top-k most similar players to an indexed player (key) or a raw feature
+        vector. Returns [(player key, score)], best first. For cosine the score
+        is the similarity; for euclidean it is the distance in z-score units.
+        """
+        if metric not in ("cosine", "euclidean"):
+            raise ValueError("metric must be 'cosine' or 'euclidean'")
+        with self._lock:
+            n = len(self._keys)
+            if n == 0:
+                return []
+            normed, unit = self._normalised()
+            if key is not None:
+                self_row = self._rows[key]
+                q = normed[self_row]
+            else:
+                self_row = None
+                q = (np.asarray(vector, dtype=np.float32) - self._mu) / self._sigma
+
+            candidates = None
+            if approximate:
+                candidates = self._probe(q, nprobe)
+            if candidates is not None and self_row is not None:
+                candidates = candidates[candidates != self_row]
+
+            if metric == "cosine":
+                qn = q / (np.linalg.norm(q) or 1.0)
+                space = unit if candidates is None else unit[candidates]
+                scores = space @ qn
+                order_scores = -scores
+            else:
+                # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, without materialising x - q
+                space = normed if candidates is None else normed[candidates]
+                sq = self._sqnorm[:n] if candidates is None else self._sqnorm[candidates]
+                scores = np.sqrt(np.maximum(sq - 2 * (space @ q) + q @ q, 0))
+                order_scores = scores.copy()
+
+            if candidates is None and self_row is not None:
+                order_scores[self_row] = np.inf
+            want = min(k, len(order_scores) - (1 if candidates is None and self_row is not None else 0))
+            if want <= 0:
+                return []
+            top = np.argpartition(order_scores, want - 1)[:want]
+            top = top[np.argsort(order_scores[top], kind="stable")]
+            rows = top if candidates is None else candidates[top]
+            return [(self._keys[r], round(float(scores[t]), 4)) for r, t in zip(rows, top)]
+
+    # ---- Approximate mode ------------------------------------
+    def build_clusters(self, n_clusters=None, iterations=8, sample=20000):
+        """Cluster the normalised vectors for approximate queries (k-means on a sample)"""
+        with self._lock:
+            normed, _ = self._normalised()
+            n = len(normed)
+            if n == 0:
+                return
+            n_clusters = min(n_clusters or max(int(np.sqrt(n)), 1), n)
+            idx = self._rng.choice(n, size=min(sample, n), replace=False)
+            pts = normed[idx]
+            centroids = pts[self._rng.choice(len(pts), size=n_clusters, replace=False)].copy()
+            for _ in range(iterations):
+                labels = _nearest(pts, centroids)
+                for c in range(n_clusters):
+                    members = pts[labels == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+            self._centroids = centroids
+            self._assign = np.full(len(self._raw), -1, dtype=np.int64)
+            self._assign[:n] = _nearest(normed, centroids)
+            self._updates_since_build = 0
+
+    def _probe(self, q, nprobe):
+        if self._centroids is None or self._updates_since_build > max(len(self._keys) // 10, 1000):
+            # Normalisation has drifted too far from the clustering: rebuild
+            self.build_clusters(n_clusters=None if self._centroids is None else len(self._centroids))
+        assign = self._assign[:len(self._keys)]
+        pending = np.flatnonzero(assign < 0)
+        if len(pending):
+            assign[pending] = _nearest(self._normed[pending], self._centroids)
+        d = ((self._centroids - q) ** 2).sum(axis=1)
+        probe = np.zeros(len(self._centroids), dtype=bool)
+        probe[np.argsort(d)[:nprobe]] = True
+        return np.flatnonzero(probe[assign])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "players": len(self._keys),
+                "features": list(self.features),
+                "clusters": 0 if self._centroids is None else len(self._centroids),
+            }
+
+
+def _nearest(points, centroids):
+    # ||p - c||^2 = ||p||^2 - 2 p.c + ||c||^2; ||p||^2 is constant per row
+    d = -2 * points @ centroids.T + (centroids ** 2).sum(axis=1)
+    return d.argmin(axis=1)
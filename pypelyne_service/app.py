@@ -1,44 +1,29 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import json
+import os
 import time
 
+from instrumentation import instrument
+from pipeline import Pipeline
+from result_cache import ResultCache, source_revision
+
 app = Flask(__name__)
+metrics = instrument(app, "pypelyne_service")
 
-class Pipeline:
-    """Simple pipeline implementation to demonstrate pipeline concepts"""
-    
-    def __init__(self):
-        self.steps = []
-        self.results = []
-    
-    def step(self, func):
-        """Add a step to the pipeline"""
-        self.steps.append(func)
-        return self
-    
-    def run(self):
-        """Execute all steps in the pipeline"""
-        result = None
-        self.results = []
-        
-        for i, step in enumerate(self.steps):
-            if callable(step):
-                if result is None:
-                    result = step()
-                else:
-                    # For demonstration, pass previous result to next step if it accepts parameters
-                    try:
-                        result = step(result)
-                    except TypeError:
-                        # If step doesn't accept parameters, just call it
-                        result = step()
-            
-            self.results.append({
-                "step": i + 1,
-                "function": step.__name__ if hasattr(step, '__name__') else str(step),
-                "result": result
-            })
-        
-        return result
+# Shared worker pool for independent pipeline steps across all requests
+PIPELINE_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("PIPELINE_WORKERS", "8")))
+
+# Memoized step results; set PIPELINE_CACHE_PATH to persist them on disk
+RESULT_CACHE = ResultCache(
+    max_entries=int(os.getenv("PIPELINE_CACHE_ENTRIES", "4096")),
+    path=os.getenv("PIPELINE_CACHE_PATH") or None,
+    disk_max_bytes=int(os.getenv("PIPELINE_CACHE_DISK_MB", "256")) << 20,
+    # Deploy revision; defaults to a hash of this service's source files
+    version=os.getenv("PIPELINE_CACHE_VERSION") or source_revision(os.path.dirname(os.path.abspath(__file__))),
+)
+metrics.gauges("pipeline_cache", RESULT_CACHE.snapshot)
 
 def hello_step():
     """Simple hello world step for demonstration"""
@@ -58,12 +43,24 @@ def transform_message(message):
         return f"🚀 Transformed: {message.upper()}"
     return f"🚀 Transformed: {message}"
 
+# Built once so step signatures and cache fingerprints are computed at startup;
+# requests run a fork() with its own results.
+HELLO_PIPELINE = Pipeline(executor=PIPELINE_EXECUTOR, cache=RESULT_CACHE).step(hello_step)
+
+# process_input receives the request input and add_timestamp has no inputs,
+# so they run in parallel; the rest follow the step added before them
+DEMO_PIPELINE = (Pipeline(executor=PIPELINE_EXECUTOR, cache=RESULT_CACHE)
+                 .step(process_input)
+                 .step(add_timestamp, after=(), cache=False)  # different every call
+                 .step(transform_message)
+                 .step(hello_step))
+
 @app.route("/")
 def index():
     return jsonify({
         "service": "Pypelyne Hello World Service (Mock Implementation)",
         "status": "running",
-        "endpoints": ["/hello", "/pipeline", "/health"],
+        "endpoints": ["/hello", "/pipeline", "/pipeline/batch", "/pipeline/cache", "/health"],
         "note": "This demonstrates pipeline concepts using a simple mock implementation"
     })
 
@@ -71,9 +68,8 @@ def index():
 def hello():
     """Simple hello world endpoint using Pipeline"""
     try:
-        # Create a simple pipeline with hello step
-        pipeline = Pipeline()
-        result = pipeline.step(hello_step).run()
+        pipeline = HELLO_PIPELINE.fork()
+        result = pipeline.run()
         
         return jsonify({
             "message": result,
@@ -96,16 +92,8 @@ def pipeline_demo():
         else:
             input_text = request.args.get("input", "CS2 Analysis System")
         
-        # Create a multi-step pipeline
-        pipeline = Pipeline()
-        
-        # Add steps to the pipeline in sequence
-        result = (pipeline
-                 .step(lambda: process_input(input_text))
-                 .step(add_timestamp)
-                 .step(transform_message)
-                 .step(hello_step)
-                 .run())
+        pipeline = DEMO_PIPELINE.fork()
+        result = pipeline.run(input_text)
         
         return jsonify({
             "input": input_text,
@@ -117,6 +105,63 @@ def pipeline_demo():
     except Exception as e:
         return jsonify({"error": str(e), "status": "failed"}), 500
 
+BATCH_MAX_CONCURRENCY = int(os.getenv("PIPELINE_BATCH_MAX_CONCURRENCY", "16"))
+
+@app.route("/pipeline/batch", methods=["POST"])
+def pipeline_batch():
+    """
+    Run the pipeline over many inputs in one request, streaming NDJSON back.
+    Body: JSON {"inputs": [...], "concurrency": 4, "ordered": true}, or an
+    application/x-ndjson stream with one input per line (read lazily, so
+    large uploads are never held in memory). Each response line is
+    {"index": i, "result": ...} or {"index": i, "error": "..."}.
+    """
+    try:
+        concurrency = min(max(request.args.get("concurrency", 4, type=int), 1), BATCH_MAX_CONCURRENCY)
+        ordered = request.args.get("ordered", "1") not in ("0", "false", "no")
+        if request.mimetype == "application/x-ndjson":
+            inputs = _ndjson_lines(request.stream)
+        else:
+            data = request.get_json(silent=True) or {}
+            inputs = data.get("inputs")
+            if not isinstance(inputs, list):
+                return jsonify({"error": "'inputs' must be a list", "status": "failed"}), 400
+            concurrency = min(max(int(data.get("concurrency", concurrency)), 1), BATCH_MAX_CONCURRENCY)
+            ordered = bool(data.get("ordered", ordered))
+
+        pipeline = _batch_pipeline(concurrency)
+
+        def generate():
+            try:
+                for out in pipeline.stream(inputs, ordered=ordered):
+                    yield json.dumps(out, ensure_ascii=False) + "\n"
+            except Exception as e:
+                # Headers are already sent; report a bad input stream in-band
+                yield json.dumps({"error": str(e), "status": "failed"}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    except Exception as e:
+        return jsonify({"error": str(e), "status": "failed"}), 500
+
+@functools.lru_cache(maxsize=None)
+def _batch_pipeline(concurrency):
+    """One prebuilt streaming pipeline per concurrency level (at most BATCH_MAX_CONCURRENCY)"""
+    return (Pipeline(cache=RESULT_CACHE)
+            .step(process_input, concurrency=concurrency)
+            .step(transform_message, concurrency=concurrency))
+
+def _ndjson_lines(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            item = json.loads(line)
+            yield item.get("input") if isinstance(item, dict) else item
+
+@app.route("/pipeline/cache", methods=["GET"])
+def pipeline_cache():
+    """Hit/miss counters for memoized pipeline steps"""
+    return jsonify(RESULT_CACHE.snapshot())
+
 @app.route("/health")
 def health():
     """Health check endpoint"""
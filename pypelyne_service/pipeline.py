@@ -0,0 +1,477 @@
+"""
+Pipeline executor for the Pypelyne service.
+
+Steps form a DAG: each step names the steps it depends on and receives their
+results as positional arguments. Signatures are inspected once when a step is
+added, so running the pipeline never has to guess by catching TypeError.
+Independent steps run concurrently on a thread or process pool, and async
+steps are supported. Every executed step records its wall-clock and CPU time.
+
+Pipeline.stream() pushes many inputs through the same steps as a chain of
+stages connected by bounded queues, so a slow stage applies backpressure
+instead of letting work pile up in memory.
+
+With a ResultCache attached, step results are memoized by step identity plus
+a hash of the step's inputs; steps added with cache=False always run.
+"""
+
+import asyncio
+import copy
+import inspect
+import queue
+import threading
+import time
+from concurrent.futures import (FIRST_COMPLETED, Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+from result_cache import input_key, step_fingerprint
+
+_PREVIOUS = object()  # default for Step.after: depend on the previously added step
+_DONE = object()      # end-of-stream marker passed between stream stages
+_NO_INPUT = object()
+
+
+class Step:
+    """One node of the pipeline DAG"""
+
+    def __init__(self, func, name, depends_on, n_args, is_async,
+                 takes_input=False, concurrency=1, batch=None, fingerprint=None, accepted=None, required=0):
+        self.func = func
+        self.name = name
+        self.depends_on = depends_on  # names of upstream steps, in argument order
+        self.n_args = n_args          # how many upstream results the function takes
+        self.accepted = accepted      # positional arguments func takes, None = any number
+        self.required = required      # positional arguments without a default
+        self.is_async = is_async
+        self.takes_input = takes_input  # root step that receives the pipeline input
+        self.concurrency = concurrency  # worker threads for this stage in stream()
+        self.batch = batch              # max items per call if the step works on lists
+        self.fingerprint = fingerprint  # cache identity, None = never memoized
+
+
+def _accepted_args(func, name):
+    """Number of positional arguments func can take (None = unlimited) and how many it requires"""
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None, 0  # builtins without signatures: pass everything
+    positional = [p for p in params
+                  if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        accepted = None
+    else:
+        accepted = len(positional)
+    required = sum(1 for p in positional if p.default is p.empty)
+    return accepted, required
+
+
+def _timed_call(func, args, is_async, batched=False):
+    """Run one step and measure it; module-level so process pools can pickle it"""
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    if batched:
+        # Batch steps take one list per argument and return a list of results
+        args = tuple([a] for a in args)
+    result = asyncio.run(func(*args)) if is_async else func(*args)
+    if batched:
+        result = result[0]
+    return result, (time.perf_counter() - wall) * 1000, (time.thread_time() - cpu) * 1000
+
+
+def _call(func, args, is_async):
+    return asyncio.run(func(*args)) if is_async else func(*args)
+
+
+class Pipeline:
+    """DAG pipeline with concurrent execution of independent steps"""
+
+    def __init__(self, max_workers=4, executor="thread", cache=None):
+        """
+        executor: "thread", "process", or an existing concurrent.futures.Executor
+                  to share across pipelines (it is not shut down by run()).
+        cache: optional ResultCache shared across pipelines for memoized steps.
+        """
+        self.steps = []
+        self.results = []
+        self.max_workers = max_workers
+        self.executor = executor
+        self.cache = cache
+        self._by_name = {}
+
+    def step(self, func, name=None, after=_PREVIOUS, concurrency=1, batch=None, cache=True, version=None):
+        """
+        Add a step to the pipeline.
+
+        after: names (or functions) of the steps whose results this step
+               receives, in order. By default a step follows the previously
+               added one, so plain .step(a).step(b) chains still work; pass
+               after=() for a step with no inputs that may run in parallel.
+        concurrency: worker threads for this stage in stream().
+        batch: if set, func takes lists (one per argument) and returns a list
+               of results; stream() hands it up to this many items per call.
+        cache: set False for non-deterministic steps (clocks, randomness,
+               external reads) so they are never served from the cache.
+        version: part of the step's cache identity; bump it when the step's
+               results change without its code changing (e.g. new data).
+        """
+        if not callable(func):
+            raise TypeError(f"pipeline step must be callable, got {func!r}")
+        name = name or getattr(func, '__name__', str(func))
+        if name in self._by_name:
+            name = f"{name}#{len(self.steps) + 1}"
+
+        if after is _PREVIOUS:
+            depends_on = [self.steps[-1].name] if self.steps else []
+        else:
+            if isinstance(after, (str, bytes)) or callable(after):
+                after = [after]
+            depends_on = [self._resolve(dep) for dep in after]
+
+        accepted, required = _accepted_args(func, name)
+        n_args = len(depends_on) if accepted is None else min(accepted, len(depends_on))
+        takes_input = not depends_on and (accepted is None or accepted >= 1)
+        if required > n_args + (1 if takes_input else 0):
+            raise TypeError(
+                f"step '{name}' requires {required} argument(s) but depends on {len(depends_on)} step(s)")
+
+        is_async = inspect.iscoroutinefunction(func)
+        step = Step(func, name, depends_on, n_args, is_async,
+                    takes_input=takes_input, concurrency=max(1, int(concurrency)),
+                    batch=int(batch) if batch else None,
+                    fingerprint=step_fingerprint(func, name, version) if cache else None,
+                    accepted=accepted, required=required)
+        self.steps.append(step)
+        self._by_name[name] = step
+        return self
+
+    def fork(self):
+        """
+        A pipeline sharing these steps, and their precomputed cache
+        fingerprints, with its own results; lets a DAG built once at startup
+        be run from many request threads.
+        """
+        clone = copy.copy(self)
+        clone.results = []
+        return clone
+
+    def _resolve(self, dep):
+        if callable(dep):
+            for step in self.steps:
+                if step.func is dep:
+                    return step.name
+            dep = getattr(dep, '__name__', str(dep))
+        if dep not in self._by_name:
+            # Dependencies must already exist, which also rules out cycles
+            raise ValueError(f"unknown dependency '{dep}': add it to the pipeline first")
+        return dep
+
+    def run(self, input=_NO_INPUT):
+        """
+        Execute the DAG; returns the result of the last added step.
+        input: optional value passed to root steps that take an argument.
+        """
+        self.results = []
+        if not self.steps:
+            return None
+        if input is _NO_INPUT:
+            for s in self.steps:
+                if s.takes_input and s.required:
+                    raise TypeError(f"step '{s.name}' needs the pipeline input: call run(input)")
+
+        outputs = {}
+        records = {}
+        waiting = {s.name: set(s.depends_on) for s in self.steps}
+        dependents = {s.name: [] for s in self.steps}
+        for s in self.steps:
+            for dep in s.depends_on:
+                dependents[dep].append(s.name)
+        ready = [s.name for s in self.steps if not s.depends_on]
+
+        pool, owned = self._pool()
+        started = time.perf_counter()
+        in_flight = {}
+        keys = {}
+        try:
+            while ready or in_flight:
+                finished, calls = [], {}
+                for name in ready:
+                    call = self._call_args(name, outputs, input)
+                    key = keys[name] = self._cache_key(name, call[1])
+                    hit, value = self.cache.get(key) if key else (False, None)
+                    if hit:
+                        finished.append((name, (value, 0.0, 0.0), True))
+                    else:
+                        calls[name] = call
+                ready = []
+
+                # A lone ready step with nothing else running is cheaper inline
+                # (process pools always dispatch, so the work leaves this process)
+                if (len(calls) == 1 and not in_flight and not finished
+                        and not isinstance(pool, ProcessPoolExecutor)):
+                    name, call = calls.popitem()
+                    finished = [(name, _timed_call(*call), False)]
+                else:
+                    for name, call in calls.items():
+                        in_flight[pool.submit(_timed_call, *call)] = name
+                    if not finished:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        finished = [(in_flight.pop(f), f.result(), False) for f in done]
+
+                for name, (result, wall_ms, cpu_ms), cached in finished:
+                    outputs[name] = result
+                    records[name] = {
+                        "wall_ms": round(wall_ms, 3),
+                        "cpu_ms": round(cpu_ms, 3),
+                        "finished_ms": round((time.perf_counter() - started) * 1000, 3),
+                        "cached": cached,
+                    }
+                    if keys[name] is not None and not cached:
+                        self.cache.put(keys[name], result)
+                    for child in dependents[name]:
+                        waiting[child].discard(name)
+                        if not waiting[child]:
+                            ready.append(child)
+        finally:
+            for f in in_flight:
+                f.cancel()
+            if owned:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        for i, s in enumerate(self.steps):
+            self.results.append({
+                "step": i + 1,
+                "function": s.name,
+                "depends_on": s.depends_on,
+                "result": outputs[s.name],
+                **records[s.name],
+            })
+        return outputs[self.steps[-1].name]
+
+    def _cache_key(self, name, args):
+        fingerprint = self._by_name[name].fingerprint
+        if self.cache is None or fingerprint is None:
+            return None
+        return input_key(fingerprint, args)
+
+    def _call_args(self, name, outputs, input=_NO_INPUT):
+        step = self._by_name[name]
+        if step.takes_input:
+            args = () if input is _NO_INPUT else (input,)
+        else:
+            args = tuple(outputs[dep] for dep in step.depends_on[:step.n_args])
+        return step.func, args, step.is_async, bool(step.batch)
+
+    # ---- Streaming -------------------------------------------
+    def stream(self, items, queue_size=64, ordered=True, batch_wait=0.01):
+        """
+        Push many inputs through the pipeline, yielding one dict per input:
+        {"index": i, "result": <last step's output>} or {"index": i, "error": str}.
+
+        items: an iterable or async iterable. Root steps that accept an
+               argument receive the item; other steps receive their
+               dependencies' outputs for that item, as in run().
+        Steps run as stages in the order they were added, each with its own
+        worker threads (Step.concurrency) and a bounded input queue of
+        queue_size, so reading from items pauses while downstream is busy.
+        A failing item is reported and skips its remaining steps; the rest of
+        the stream continues. ordered=False yields items as they finish; with
+        ordered=True at most max(queue_size, total worker slots) items are in
+        flight, so one slow item holds back reading rather than letting the
+        reorder buffer grow.
+        """
+        steps = self.steps
+        if not steps:
+            return
+        # Drop intermediate outputs once no later stage needs them
+        last_use = {s.name: i for i, s in enumerate(steps)}
+        for i, s in enumerate(steps):
+            for dep in s.depends_on:
+                last_use[dep] = max(last_use[dep], i)
+        final = steps[-1].name
+        expire = [[n for n, last in last_use.items() if last == i and n != final]
+                  for i in range(len(steps))]
+
+        queues = [queue.Queue(maxsize=queue_size) for _ in range(len(steps) + 1)]
+        stop = threading.Event()
+        alive = [s.concurrency for s in steps]
+        alive_lock = threading.Lock()
+        feed_error = []
+        # Items read but not yet yielded; bounds the reorder buffer when ordered
+        window = (threading.Semaphore(max(queue_size, sum(s.concurrency * (s.batch or 1) for s in steps)))
+                  if ordered else None)
+        pool, owned = (self._pool() if self.executor == "process"
+                       or isinstance(self.executor, ProcessPoolExecutor) else (None, False))
+
+        def put(q, env):
+            while not stop.is_set():
+                try:
+                    q.put(env, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def admit():
+            while not stop.is_set():
+                if window.acquire(timeout=0.1):
+                    return True
+            return False
+
+        def feed():
+            # Each in-flight item is [index, {step name: output, None: input}, error]
+            try:
+                if hasattr(items, '__aiter__'):
+                    async def drain():
+                        index = 0
+                        async for item in items:
+                            if window is not None and not await asyncio.to_thread(admit):
+                                return
+                            if not await asyncio.to_thread(put, queues[0], [index, {None: item}, None]):
+                                return
+                            index += 1
+                    asyncio.run(drain())
+                else:
+                    for index, item in enumerate(items):
+                        if window is not None and not admit():
+                            return
+                        if not put(queues[0], [index, {None: item}, None]):
+                            return
+            except Exception as e:
+                feed_error.append(e)
+            finally:
+                put(queues[0], _DONE)
+
+        def invoke(func, args, is_async):
+            if pool is not None:
+                return pool.submit(_call, func, args, is_async).result()
+            return _call(func, args, is_async)
+
+        def stage(i):
+            step = steps[i]
+            inq, outq = queues[i], queues[i + 1]
+            try:
+                while True:
+                    env = get(inq)
+                    if env is _DONE:
+                        put(inq, _DONE)  # let this stage's other workers see it too
+                        return
+                    batch = [env]
+                    if step.batch:
+                        deadline = time.monotonic() + batch_wait
+                        while len(batch) < step.batch:
+                            try:
+                                nxt = inq.get(timeout=max(deadline - time.monotonic(), 0))
+                            except queue.Empty:
+                                break
+                            if nxt is _DONE:
+                                put(inq, _DONE)
+                                break
+                            batch.append(nxt)
+                    self._stream_apply(step, batch, invoke)
+                    for env in batch:
+                        for name in expire[i]:
+                            env[1].pop(name, None)
+                        if not put(outq, env):
+                            return
+            finally:
+                with alive_lock:
+                    alive[i] -= 1
+                    if alive[i] == 0:
+                        put(outq, _DONE)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        for i, s in enumerate(steps):
+            threads += [threading.Thread(target=stage, args=(i,), daemon=True)
+                        for _ in range(s.concurrency)]
+
+        for t in threads:
+            t.start()
+        try:
+            pending = {}
+            next_index = 0
+            while True:
+                env = get(queues[-1])
+                if env is _DONE:
+                    break
+                index, outputs, error = env
+                out = ({"index": index, "error": error} if error is not None
+                       else {"index": index, "result": outputs[final]})
+                if not ordered:
+                    yield out
+                    continue
+                pending[index] = out
+                while next_index in pending:
+                    window.release()
+                    yield pending.pop(next_index)
+                    next_index += 1
+            for index in sorted(pending):
+                yield pending[index]
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            stop.set()
+            if owned:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def _stream_apply(self, step, batch, invoke):
+        """Run one step for a group of in-flight items, recording per-item errors"""
+        live = [env for env in batch if env[2] is None]
+        if not live:
+            return
+        calls, keys, misses = [], [], []
+        for env in live:
+            outputs = env[1]
+            if step.takes_input:
+                args = (outputs[None],)
+            else:
+                args = tuple(outputs[dep] for dep in step.depends_on[:step.n_args])
+            key = self._cache_key(step.name, args)
+            hit, value = self.cache.get(key) if key else (False, None)
+            if hit:
+                outputs[step.name] = value
+            else:
+                misses.append(env)
+                calls.append(args)
+                keys.append(key)
+        live = misses
+        if not live:
+            return
+        if step.batch:
+            try:
+                columns = tuple(list(col) for col in zip(*calls)) if calls[0] else ()
+                results = invoke(step.func, columns, step.is_async)
+                if len(results) != len(live):
+                    raise ValueError(f"batch step '{step.name}' returned {len(results)} "
+                                     f"results for {len(live)} items")
+            except Exception as e:
+                for env in live:
+                    env[2] = f"{step.name}: {e}"
+                return
+            for env, key, result in zip(live, keys, results):
+                env[1][step.name] = result
+                if key:
+                    self.cache.put(key, result)
+            return
+        for env, key, args in zip(live, keys, calls):
+            try:
+                env[1][step.name] = result = invoke(step.func, args, step.is_async)
+            except Exception as e:
+                env[2] = f"{step.name}: {e}"
+                continue
+            if key:
+                self.cache.put(key, result)
+
+    def _pool(self):
+        if isinstance(self.executor, Executor):
+            return self.executor, False
+        if self.executor == "process":
+            return ProcessPoolExecutor(max_workers=self.max_workers), True
+        return ThreadPoolExecutor(max_workers=self.max_workers), True
@@ -0,0 +1,187 @@
+"""
+Content-addressed cache for pipeline step results.
+
+Keys are a hash of the step's identity (its code, the functions and global
+values it refers to, defaults, closure values and an optional explicit
+version) plus a hash of its input arguments, so identical inputs through an
+identical step always map to the same entry. Code the fingerprint cannot see
+(other modules, classes, data files) is covered by the cache-wide version
+salt, which defaults to a hash of the service's own source files so every
+deploy starts from fresh keys. Values are stored pickled and unpickled on
+every hit, so callers get their own copy. They live in a bounded in-memory
+LRU, optionally backed by a SQLite file with size-based eviction of the
+least recently used entries.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import types
+from collections import OrderedDict
+
+_MAX_DEPTH = 3  # how far referenced functions are followed
+
+
+def _describe(value, depth, seen):
+    """Picklable stand-in for a step's code and what it refers to"""
+    if isinstance(value, types.CodeType):
+        return ("code", value.co_code, tuple(_describe(c, depth, seen) for c in value.co_consts), value.co_names)
+    if isinstance(value, types.FunctionType):
+        if id(value) in seen or depth > _MAX_DEPTH:
+            return ("function", value.__module__, value.__qualname__)
+        seen.add(id(value))
+        code = value.__code__
+        scope = value.__globals__
+        refs = tuple((name, _describe(scope[name], depth + 1, seen))
+                     for name in code.co_names if name in scope)
+        closure = tuple(_describe(c.cell_contents, depth + 1, seen) for c in (value.__closure__ or ()))
+        defaults = tuple(_describe(d, depth + 1, seen) for d in (value.__defaults__ or ()))
+        return ("function", value.__module__, value.__qualname__, _describe(code, depth, seen),
+                refs, closure, defaults)
+    if isinstance(value, (types.ModuleType, type, types.BuiltinFunctionType)):
+        # Their code is covered by the cache's version salt
+        return (type(value).__name__, getattr(value, '__name__', None))
+    if isinstance(value, (tuple, list)):
+        return (type(value).__name__, tuple(_describe(v, depth, seen) for v in value))
+    try:
+        pickle.dumps(value, protocol=5)
+        return value
+    except Exception:
+        # Shared resources (pools, locks, clients): identified by type only
+        return ("object", type(value).__module__, type(value).__qualname__)
+
+
+def step_fingerprint(func, name, version=None):
+    """
+    Stable identity of a step function, or None if it cannot be hashed.
+    Bump version when the step's behaviour changes in a way its code does
+    not show (e.g. a data file it reads).
+    """
+    try:
+        parts = (name, version, getattr(func, '__qualname__', repr(func)), _describe(func, 0, set()))
+        return hashlib.blake2b(pickle.dumps(parts, protocol=5), digest_size=16).hexdigest()
+    except Exception:
+        return None
+
+
+def source_revision(directory):
+    """Hash of the .py files in directory, a version salt that changes with every code deploy"""
+    h = hashlib.blake2b(digest_size=8)
+    for entry in sorted(os.listdir(directory)):
+        if entry.endswith('.py'):
+            h.update(entry.encode())
+            with open(os.path.join(directory, entry), 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def input_key(fingerprint, args):
+    """Cache key for one call, or None if the arguments cannot be hashed"""
+    try:
+        payload = pickle.dumps(args, protocol=5)
+    except Exception:
+        return None
+    return fingerprint + hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, path=None, disk_max_bytes=256 << 20, version=""):
+        self.max_entries = max_entries
+        self.version = version  # salted into every key; entries of other versions age out of the disk tier
+        self.disk_max_bytes = disk_max_bytes
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_bytes = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS results(
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+            self._db.commit()
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                      "stores": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+    def _salted(self, key):
+        return f"{self.version}:{key}" if self.version else key
+
+    def get(self, key):
+        """Return (True, value) on a hit, else (False, None); value is a fresh copy"""
+        key = self._salted(key)
+        with self._lock:
+            blob = self._mem.get(key)
+            if blob is not None:
+                self._mem.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            elif self._db is not None:
+                row = self._db.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE results SET last_access=? WHERE key=?", (time.time(), key))
+                    self._db.commit()
+                    blob = row[0]
+                    self._remember(key, blob)
+                    self.stats["disk_hits"] += 1
+            if blob is None:
+                self.stats["misses"] += 1
+                return False, None
+        return True, pickle.loads(blob)
+
+    def put(self, key, value):
+        key = self._salted(key)
+        try:
+            blob = pickle.dumps(value, protocol=5)
+        except Exception:
+            return  # not cacheable: hits could not hand out independent copies
+        with self._lock:
+            self._remember(key, blob)
+            self.stats["stores"] += 1
+            if self._db is None:
+                return
+            old = self._db.execute("SELECT size FROM results WHERE key=?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO results(key, value, size, last_access) VALUES(?,?,?,?)",
+                             (key, blob, len(blob), time.time()))
+            self._disk_bytes += len(blob) - (old[0] if old else 0)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+            self._db.commit()
+
+    def _remember(self, key, blob):
+        self._mem[key] = blob
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        # Trim to 90% of the budget so eviction does not run on every put
+        target = int(self.disk_max_bytes * 0.9)
+        rows = self._db.execute("SELECT key, size FROM results ORDER BY last_access").fetchall()
+        victims = []
+        for key, size in rows:
+            if self._disk_bytes <= target:
+                break
+            victims.append((key,))
+            self._disk_bytes -= size
+        self._db.executemany("DELETE FROM results WHERE key=?", victims)
+        self.stats["disk_evictions"] += len(victims)
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self.stats)
+            lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+            out.update({
+                "memory_entries": len(self._mem),
+                "max_entries": self.max_entries,
+                "disk_bytes": self._disk_bytes if self._db is not None else None,
+                "hit_ratio": round((lookups - out["misses"]) / lookups, 4) if lookups else 0.0,
+            })
+        return out
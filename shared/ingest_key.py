@@ -0,0 +1,21 @@
+"""
+Idempotency key of one ingested match.
+
+Shared by DB_API (IngestKey rows) and match_service (the SQLite ingest and
+the similarity refresh after a DB_API ingest), which must agree on it so a
+match retried through either path is recognised as the same one.
+"""
+
+import hashlib
+import json
+
+# Fields of a scoreboard that end up stored; the hash ignores everything else
+KEY_FIELDS = ("players", "CT_score", "T_score", "played_at", "game", "match_type")
+
+
+def match_key(match):
+    """The client's idempotency_key, else a hash of everything that is stored"""
+    if match.get("idempotency_key"):
+        return str(match["idempotency_key"])[:128]
+    content = {k: match.get(k) for k in KEY_FIELDS}
+    return "sha256:" + hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
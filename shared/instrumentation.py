@@ -0,0 +1,254 @@
+"""
+Request, upstream-call and query timings in Prometheus text format.
+
+Shared by every Flask service. The images get it through the `shared`
+build context (docker-compose.yml, CI) and local runs through
+PYTHONPATH=shared.
+
+    metrics = instrument(app, "match_service")       # per-route histograms + GET /metrics
+    metrics.track_session(http, {"steam": STEAM})    # time calls made through a requests.Session
+    with metrics.time_query("SELECT"): ...           # time a database statement
+    metrics.gauges("db_pool", pool.snapshot)         # numeric snapshot() fields, read at scrape time
+
+Recording a sample is a bisect and a counter increment under a short lock,
+a few microseconds per request. Profiling is opt-in: with
+PROFILE_SAMPLE_RATE > 0 that fraction of requests runs under cProfile (one
+at a time, only the request's own thread), and the ones slower than
+PROFILE_SLOW_MS are dumped to PROFILE_DIR as pstats files, which
+snakeviz, flameprof or gprof2dot turn into flame graphs.
+"""
+
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+log = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the histogram buckets; +Inf is implied
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_OPERATIONS = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "COPY", "CREATE", "ALTER", "DROP",
+               "TRUNCATE", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "PREPARE", "EXECUTE", "DEALLOCATE"}
+_VERB = re.compile(r"\s*(\w+)")
+_INVALID = re.compile(r"[^a-zA-Z0-9_:]")
+
+
+def query_operation(sql):
+    """Leading keyword of a statement (SELECT, INSERT, ...), or OTHER; keeps label values bounded"""
+    m = _VERB.match(sql)
+    verb = m.group(1).upper() if m else ""
+    return verb if verb in _OPERATIONS else "OTHER"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _labels(names, values, extra=None):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per tuple of label values"""
+
+    def __init__(self, name, help, labelnames, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += seconds
+
+    def render(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in items:
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                total += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {total}")
+        return lines
+
+
+def _flatten(prefix, values):
+    """(metric name, number) for every numeric field of a (nested) snapshot dict"""
+    for key, value in values.items():
+        name = _INVALID.sub("_", f"{prefix}_{key}")
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (bool, int)):
+            yield name, int(value)
+        elif isinstance(value, float):
+            yield name, value
+
+
+class Metrics:
+    def __init__(self, service):
+        self.service = service
+        self.requests = Histogram("http_request_duration_seconds", "Time to serve a request",
+                                  ("route", "method", "status"))
+        self.upstream = Histogram("upstream_request_duration_seconds", "Time of calls to other services and APIs",
+                                  ("upstream", "method", "status"))
+        self.queries = Histogram("db_query_duration_seconds", "Time to run a database statement", ("operation",))
+        self._gauges = []  # (prefix, snapshot callable)
+
+    def gauges(self, prefix, snapshot):
+        """Expose the numeric fields of snapshot() as <prefix>_<field>, read on every scrape"""
+        self._gauges.append((prefix, snapshot))
+
+    def observe_query(self, sql, seconds):
+        self.queries.observe(seconds, query_operation(sql))
+
+    @contextmanager
+    def time_query(self, operation):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.queries.observe(time.perf_counter() - started, operation)
+
+    def track_session(self, session, upstreams):
+        """
+        Time every call made through a requests.Session, labelled with the
+        name of the upstream whose base URL it starts with ("other" if none).
+        Streamed responses are timed to their headers.
+        """
+        prefixes = sorted(((url.rstrip("/"), name) for name, url in upstreams.items()), key=lambda p: -len(p[0]))
+        send = session.request
+
+        def timed(method, url, *args, **kwargs):
+            upstream = next((name for prefix, name in prefixes if url.startswith(prefix)), "other")
+            status = "error"
+            started = time.perf_counter()
+            try:
+                response = send(method, url, *args, **kwargs)
+                status = str(response.status_code)
+                return response
+            finally:
+                self.upstream.observe(time.perf_counter() - started, upstream, method.upper(), status)
+
+        session.request = timed
+
+    def render(self):
+        lines = self.requests.render() + self.upstream.render() + self.queries.render()
+        for prefix, snapshot in self._gauges:
+            try:
+                values = snapshot()
+            except Exception:
+                log.exception("metrics snapshot %s failed", prefix)
+                continue
+            for name, value in _flatten(prefix, values):
+                lines.append(f"# TYPE {name} untyped")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """cProfile a sample of requests and keep the stats of the slow ones"""
+
+    def __init__(self, service):
+        self.service = service
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.slow = float(os.getenv("PROFILE_SLOW_MS", "500")) / 1000
+        self.directory = os.getenv("PROFILE_DIR", "/tmp/profiles")
+        self.keep = int(os.getenv("PROFILE_KEEP", "50"))
+        self._dumps = deque()
+        self._busy = threading.Lock()  # cProfile cannot profile two requests at once
+
+    def start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is active in this process
+            self._busy.release()
+            return None
+        return profile
+
+    def stop(self, profile, route, seconds):
+        profile.disable()
+        self._busy.release()
+        if seconds < self.slow:
+            return
+        name = _INVALID.sub("_", route.strip("/")) or "root"
+        path = os.path.join(self.directory, f"{self.service}-{name}-{seconds * 1000:.0f}ms-{time.time_ns()}.prof")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(path)
+        except OSError:
+            log.exception("could not write profile %s", path)
+            return
+        self._dumps.append(path)
+        while len(self._dumps) > self.keep:
+            try:
+                os.unlink(self._dumps.popleft())
+            except OSError:
+                pass
+
+
+def instrument(app, service):
+    """Time every request of app by route, method and status, and serve GET /metrics"""
+    metrics = Metrics(service)
+    profiler = Profiler(service)
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        g._metrics_profile = profiler.start()
+
+    @app.after_request
+    def _record(response):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        labels = (route, request.method, str(response.status_code))
+        profile = g.pop("_metrics_profile", None)
+        if profile is not None:
+            profiler.stop(profile, route, time.perf_counter() - started)
+        if response.is_streamed:
+            # Count the whole stream, not just the time to the first byte
+            response.call_on_close(lambda: metrics.requests.observe(time.perf_counter() - started, *labels))
+        else:
+            metrics.requests.observe(time.perf_counter() - started, *labels)
+        return response
+
+    @app.teardown_request
+    def _release_profiler(exc):
+        profile = g.pop("_metrics_profile", None)
+        if profile is not None:  # the request failed before after_request ran
+            profiler.stop(profile, "failed", 0.0)
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
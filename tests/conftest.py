@@ -0,0 +1,33 @@
+"""
+Unit tests for the services' in-process data structures and routes.
+
+Each service is a flat directory of modules rather than a package, so the
+directories of the modules under test go on sys.path here. Several
+services call their Flask module app.py; load_service imports a fresh,
+uniquely named copy configured from the given environment.
+"""
+
+import importlib.util
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+for service in ("shared", "DB_API", "Steam_API", "match_service", "pypelyne_service", "OCR", "Gemini_API"):
+    sys.path.insert(0, str(ROOT / service))
+
+
+@pytest.fixture
+def load_service(monkeypatch):
+    def load(directory, module, **env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        monkeypatch.syspath_prepend(str(ROOT / directory))
+        spec = importlib.util.spec_from_file_location(f"{directory}_{module}", ROOT / directory / f"{module}.py")
+        loaded = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(loaded)
+        loaded.app.testing = True
+        return loaded
+    return load
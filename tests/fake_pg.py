@@ -0,0 +1,88 @@
+"""
+Just enough of a psycopg2 connection for the DB_API code paths that do not
+need a server: statements are logged, and a handler decides what a query
+returns.
+"""
+
+
+class FakeCursor:
+    def __init__(self, conn, name=None):
+        self.connection = conn
+        self.name = name
+        self.description = None
+        self.rowcount = -1
+        self.itersize = 2000
+        self._rows = []
+
+    def execute(self, query, params=None):
+        if isinstance(query, bytes):
+            query = query.decode()
+        if query.startswith("PREPARE") and self.connection.reject_prepare:
+            raise RuntimeError("could not determine data type of parameter $1")
+        self.connection.log.append(query)
+        self.connection.params.append(params)
+        result = self.connection.handler(query, params)
+        if result is None:
+            self.description, self._rows, self.rowcount = None, [], 1
+        else:
+            columns, rows = result
+            self.description = [(c,) for c in columns]
+            self._rows, self.rowcount = list(rows), len(rows)
+
+    def mogrify(self, query, params):
+        if isinstance(query, bytes):
+            query = query.decode()
+        return (query % tuple(repr(p) for p in params)).encode()
+
+    def copy_expert(self, sql, file):
+        self.connection.log.append(sql)
+        self.connection.copies.append((sql, file.read()))
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    encoding = "UTF8"
+
+    def __init__(self, handler=None, reject_prepare=False):
+        self.closed = 0
+        self.handler = handler or (lambda query, params: None)
+        self.reject_prepare = reject_prepare
+        self.log = []
+        self.params = []
+        self.copies = []  # (COPY statement, data) per copy_expert
+        self.commits = self.rollbacks = 0
+
+    def cursor(self, name=None):
+        return FakeCursor(self, name)
+
+    def get_transaction_status(self):
+        return 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
@@ -0,0 +1,70 @@
+from analytics import DRAW, LOSS, WIN, SeriesCache, UserSeries
+
+
+def extend(series, matches):
+    """matches: (id, played, key, result, kda) tuples"""
+    ids, played, keys, results, kda = (list(c) for c in zip(*matches))
+    return series.extend(ids, played, keys, results, kda, [None] * len(ids), [1.0] * len(ids))
+
+
+def test_totals_streaks_and_splits():
+    s = UserSeries(max_len=100)
+    assert extend(s, [(1, 10, "dust2", WIN, 1.0), (2, 20, "dust2", WIN, 2.0), (3, 30, "mirage", LOSS, 0.5),
+                      (4, 40, "mirage", DRAW, None), (5, 50, "dust2", WIN, 1.5)]) == 5
+    summary = s.summary(n=10, window=2)
+    assert (summary["matches"], summary["wins"], summary["losses"]) == (5, 3, 1)
+    assert summary["last_n"]["results"] == ["W", "W", "L", "D", "W"]
+    assert summary["streaks"]["current"] == {"type": "win", "length": 1}
+    assert summary["streaks"]["longest_win"] == 2
+    assert summary["splits"][0] == {"key": "dust2", "games": 3, "wins": 3, "losses": 0, "win_rate": 1.0}
+    assert summary["trends"]["kda"]["mean_lifetime"] == 1.25  # the None is skipped
+    assert summary["trends"]["adr"]["mean_lifetime"] is None
+    assert summary["rolling_win_rate"] == [1.0, 0.5, 0.0, 1.0]
+
+
+def test_streak_continues_across_extends():
+    s = UserSeries(max_len=100)
+    extend(s, [(1, 10, "k", LOSS, 1), (2, 20, "k", WIN, 1), (3, 30, "k", WIN, 1)])
+    extend(s, [(4, 40, "k", WIN, 1), (5, 50, "k", WIN, 1)])
+    assert s.streak == (WIN, 4)
+    assert s.longest[WIN] == 4
+
+
+def test_rescan_window_skips_folded_matches_and_counts_late_ones():
+    s = UserSeries(max_len=100, rescan=100)
+    extend(s, [(1, 1000, "k", WIN, 1), (3, 1050, "k", WIN, 1)])
+    assert s.since() == 950
+    # Match 2 committed late, played inside the window; 1 and 3 come back again
+    assert extend(s, [(1, 1000, "k", WIN, 1), (2, 1020, "k", LOSS, 1), (3, 1050, "k", WIN, 1)]) == 1
+    assert (s.games, s.wins, s.losses) == (3, 2, 1)
+    assert extend(s, [(3, 1050, "k", WIN, 1)]) == 0
+
+
+def test_retained_tail_is_bounded():
+    s = UserSeries(max_len=3)
+    extend(s, [(i, i, "k", WIN if i % 2 else LOSS, i) for i in range(1, 8)])
+    assert len(s.results) == 3 and len(s.stats["kda"]) == 3
+    assert s.games == 7
+    assert s.stats["kda"].tolist() == [5.0, 6.0, 7.0]
+
+
+def test_backdated_match_drops_the_series():
+    cache = SeriesCache(rescan=100)
+    s = cache.get("u")
+    extend(s, [(1, 1000, "k", WIN, 1)])
+    cache.backdated("u", 950)  # inside the window: the next update picks it up
+    assert cache.get("u") is s
+    cache.backdated("u", 800)
+    assert cache.get("u") is not s
+    assert cache.stats["rebuilds"] == 1
+
+
+def test_series_cache_evicts_least_recent_user():
+    cache = SeriesCache(max_users=2)
+    a = cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")
+    assert cache.get("a") is a
+    assert cache.stats["evictions"] == 1
+    assert cache.snapshot()["users"] == 2
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_keys_within_the_window_share_one_call():
+    calls = []
+
+    def fetch_many(keys):
+        calls.append(list(keys))
+        return {k: k.upper() for k in keys if k != "gone"}
+
+    batcher = MicroBatcher(fetch_many, window=0.05)
+    futures = {k: batcher.submit(k) for k in ("a", "b", "a", "gone")}
+    assert futures["a"].result(2) == "A"
+    assert futures["b"].result(2) == "B"
+    with pytest.raises(KeyError):
+        futures["gone"].result(2)
+    assert calls == [["a", "b", "gone"]]
+    assert batcher.stats == {"batches": 1, "keys": 3}
+
+
+def test_full_batch_is_sent_without_waiting_and_overflow_follows():
+    calls = []
+    batcher = MicroBatcher(lambda keys: calls.append(list(keys)) or {k: k for k in keys}, window=5, max_batch=3)
+    futures = [batcher.submit(i) for i in range(5)]
+    assert [f.result(2) for f in futures[:3]] == [0, 1, 2]  # long before the 5 s window
+    assert calls[0] == [0, 1, 2]
+
+
+def test_fetch_errors_reach_every_waiter():
+    def fetch_many(keys):
+        raise RuntimeError("upstream down")
+
+    batcher = MicroBatcher(fetch_many, window=0.01)
+    futures = [batcher.submit(k) for k in "xy"]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(2)
+
+
+def test_concurrent_callers_are_batched():
+    calls = []
+    batcher = MicroBatcher(lambda keys: calls.append(len(keys)) or {k: k for k in keys}, window=0.1)
+    barrier = threading.Barrier(20)
+    results = []
+
+    def lookup(i):
+        barrier.wait()
+        results.append(batcher.submit(i).result(2))
+
+    threads = [threading.Thread(target=lookup, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert sorted(results) == list(range(20))
+    assert sum(calls) == 20 and len(calls) < 20
@@ -0,0 +1,58 @@
+import importlib.util
+import pathlib
+import random
+import sys
+
+import pytest
+
+import ingest
+
+BENCHMARKS = pathlib.Path(__file__).resolve().parent.parent / "benchmarks"
+
+
+@pytest.fixture(scope="module")
+def bench():
+    sys.path.insert(0, str(BENCHMARKS))
+    try:
+        spec = importlib.util.spec_from_file_location("benchmarks_run", BENCHMARKS / "run.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(str(BENCHMARKS))
+    return module
+
+
+def test_nearest_rank_percentiles(bench):
+    ordered = list(range(1, 101))
+    assert [bench.percentile(ordered, q) for q in (0, 50, 95, 99, 100)] == [1, 50, 95, 99, 100]
+    assert bench.percentile([7], 99) == 7
+
+
+def test_summarize(bench):
+    stats = bench.summarize([0.003, 0.001, 0.002, 0.010], errors=1, wall=0.5)
+    assert (stats["requests"], stats["errors"], stats["throughput_per_s"]) == (4, 1, 8.0)
+    assert stats["latency_ms"] == {"mean": 4.0, "p50": 2.0, "p95": 10.0, "p99": 10.0, "max": 10.0}
+    assert bench.summarize([], 0, 0.0)["latency_ms"]["p95"] is None
+
+
+def test_compare_flags_regressions_beyond_tolerance(bench):
+    def record(name, p95, rate, status="ok"):
+        return {"service": "s", "name": name, "concurrency": 8, "status": status,
+                "throughput_per_s": rate, "latency_ms": {"p95": p95}}
+
+    baseline = {"benchmarks": [record("a", 10.0, 100.0), record("b", 10.0, 100.0), record("c", 10.0, 100.0)]}
+    current = [record("a", 10.9, 91.0), record("b", 11.5, 100.0), record("c", 10.0, 80.0),
+               record("d", 99.0, 1.0), record("a", None, 0.0, status="skipped")]
+    regressions = bench.compare(current, baseline, tolerance=0.1)
+    assert [r["name"] for r in regressions] == ["b", "c"]
+    assert regressions[0]["p95_ms"] == [10.0, 11.5]
+
+
+def test_synthetic_matches_are_valid_ingest_input(bench):
+    batch = bench.matches(seed=1, count=20, population=50, prefix="t")
+    assert batch == bench.matches(seed=1, count=20, population=50, prefix="t")
+    parsed = [ingest.parse_match(m) for m in batch]
+    assert [p["key"] for p in parsed] == [f"t-{i}" for i in range(20)]
+    assert all(len({p["name"] for p in m["players"]}) == 10 for m in parsed)
+    one = bench.scoreboard(random.Random(2), population=10)
+    assert "idempotency_key" not in one
@@ -0,0 +1,39 @@
+import pathlib
+import random
+
+from coaching import CoachEngine
+
+RULES = pathlib.Path(__file__).resolve().parent.parent / "Gemini_API" / "coach_rules.json"
+
+
+def baseline_coach(kills, deaths, adr):
+    """The /coach handler before the rules engine, kept as the reference"""
+    tips = []
+    if deaths and kills / deaths < 1: tips.append("Improve survival: trade with a buddy, avoid dry peeks.")
+    if adr < 70: tips.append("Utility/impact low: practice nades, pre-aim common angles.")
+    if kills < 15: tips.append("Aim: 10-min KovaaK/Aim Lab + DM warmup.")
+    return {"kdr": round(kills / max(deaths, 1), 2), "adr": adr, "tips": tips or ["Solid performance—keep it up!"]}
+
+
+def test_matches_the_baseline_handler():
+    rng = random.Random(5)
+    stats = [(float(k), float(d), float(a)) for k in range(0, 41) for d in range(0, 41) for a in (0, 69.5, 70, 120)]
+    stats += [(rng.uniform(0, 40), rng.uniform(0, 40), rng.uniform(0, 150)) for _ in range(2000)]
+    engine = CoachEngine.from_file(RULES)
+    assert engine.score(stats) == [baseline_coach(*row) for row in stats]
+
+
+def test_kdr_rounds_like_python():
+    engine = CoachEngine.from_file(RULES)
+    assert [a["kdr"] for a in engine.score([(1.0, 40.0, 80.0), (7.0, 40.0, 80.0)])] == [0.03, 0.17]
+
+
+def test_identical_rows_share_one_evaluation():
+    engine = CoachEngine.from_file(RULES, memo_size=2)
+    first = engine.score([(20.0, 10.0, 90.0)] * 3)
+    assert first[0] is first[2]
+    engine.score([(20.0, 10.0, 90.0), (1.0, 2.0, 3.0)])
+    snapshot = engine.snapshot()
+    assert (snapshot["scored"], snapshot["evaluated"], snapshot["memo_hits"]) == (5, 2, 3)
+    engine.score([(5.0, 5.0, 5.0)])
+    assert engine.snapshot()["memo_entries"] == 2
@@ -0,0 +1,120 @@
+import pytest
+
+import db_api
+from fake_pg import FakeConnection
+from pool import ConnectionPool
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """db_api's Flask client on a one-connection pool of FakeConnections"""
+    conn = FakeConnection()
+    monkeypatch.setattr(db_api, "pool", ConnectionPool(lambda: conn, maxconn=1))
+    monkeypatch.setattr(db_api, "query_cache", db_api.QueryCache())
+    db_api.app.testing = True
+    return db_api.app.test_client(), conn
+
+
+def test_execute_batch_runs_statements_in_order(db):
+    client, conn = db
+    conn.handler = lambda query, params: (["c"], [(2,)]) if query.startswith("SELECT") else None
+    r = client.post("/execute_batch", json={"statements": [
+        {"query": "CREATE TABLE IF NOT EXISTS t (a int, b bool)"},
+        {"query": "INSERT INTO t(a, b) VALUES (%s, %s)", "many": [[1, True], [2, False]]},
+        {"query": "SELECT COUNT(*) AS c FROM t"},
+    ]})
+    assert r.status_code == 200
+    assert r.get_json()["results"] == [{"rowcount": 1}, {"rowcount": 1}, {"results": [{"c": 2}]}]
+    # The two rows went out as one multi-row VALUES statement
+    assert "INSERT INTO t(a, b) VALUES (1, True),(2, False)" in conn.log
+    assert conn.commits == 1
+
+
+def test_execute_batch_pages_other_statements(db):
+    client, conn = db
+    r = client.post("/execute_batch", json={"statements": [
+        {"query": "UPDATE t SET b = %s WHERE a = %s", "many": [[True, 1], [False, 2]]},
+    ]})
+    assert r.get_json()["results"] == [{"batched": 2}]
+    assert conn.log == ["UPDATE t SET b = True WHERE a = 1;UPDATE t SET b = False WHERE a = 2"]
+
+
+def test_execute_batch_rolls_back_and_names_the_failing_statement(db):
+    client, conn = db
+
+    def handler(query, params):
+        if "missing" in query:
+            raise RuntimeError('relation "missing" does not exist')
+
+    conn.handler = handler
+    r = client.post("/execute_batch", json={"statements": [
+        {"query": "INSERT INTO t(a) VALUES (1)"},
+        {"query": "SELECT * FROM missing"},
+    ]})
+    assert r.status_code == 500
+    assert r.get_json()["statement"] == 1
+    assert (conn.commits, conn.rollbacks) == (0, 1)
+
+
+@pytest.mark.parametrize("body", [{}, {"statements": []}, {"statements": [{"params": [1]}]}])
+def test_execute_batch_rejects_malformed_bodies(db, body):
+    client, _ = db
+    assert client.post("/execute_batch", json=body).status_code == 400
+
+
+def rows_handler(columns, rows):
+    """Every SELECT (or EXECUTE of a prepared one) returns rows"""
+    return lambda query, params: (columns, rows) if query.startswith(("SELECT", "EXECUTE")) else None
+
+
+def test_stream_sql_ndjson(db):
+    client, conn = db
+    conn.handler = rows_handler(["id", "name"], [(i, f"p{i}") for i in range(5)])
+    r = client.post("/stream_sql", json={"query": "SELECT id, name FROM t", "chunk_size": 2})
+    assert r.status_code == 200
+    assert r.mimetype == "application/x-ndjson"
+    lines = r.get_data(as_text=True).splitlines()
+    assert [db_api.json.loads(line) for line in lines] == [{"id": i, "name": f"p{i}"} for i in range(5)]
+    # The cursor is closed and its connection is back in the pool
+    assert conn.rollbacks == 1
+    assert db_api.pool.snapshot()["idle"] == 1
+
+
+def test_stream_sql_columnar(db):
+    client, conn = db
+    conn.handler = rows_handler(["id"], [(i,) for i in range(3)])
+    r = client.post("/stream_sql", json={"query": "SELECT id FROM t", "format": "columnar", "chunk_size": 2})
+    assert r.get_json() == {"columns": ["id"], "rows": [[0], [1], [2]]}
+
+
+def test_stream_sql_error_before_streaming_returns_the_connection(db):
+    client, conn = db
+
+    def handler(query, params):
+        raise RuntimeError("syntax error")
+
+    conn.handler = handler
+    r = client.post("/stream_sql", json={"query": "SELECT broken"})
+    assert r.status_code == 500
+    assert db_api.pool.snapshot()["idle"] == 1
+
+
+def test_history_token_round_trip():
+    assert db_api._decode_token(db_api._encode_token(12345)) == 12345
+    assert db_api._decode_token(None) == db_api._MAX_MATCH_ID
+    with pytest.raises(ValueError):
+        db_api._decode_token("not-a-token")
+
+
+def test_history_pages_by_match_id(db):
+    client, conn = db
+    conn.handler = rows_handler(["matchid"], [(30,), (20,), (10,)])
+    r = client.get("/users/1/matches?limit=2")
+    body = r.get_json()
+    assert [m["matchid"] for m in body["results"]] == [30, 20]
+    assert db_api._decode_token(body["next_token"]) == 20
+    assert conn.params[-1][-2:] == [db_api._MAX_MATCH_ID, 3]  # one extra row to detect the next page
+
+    client.get(f"/users/1/matches?limit=2&after={body['next_token']}")
+    assert conn.params[-1][1] == 20
+    assert client.get("/users/1/matches?after=garbage").status_code == 400
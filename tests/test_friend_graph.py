@@ -0,0 +1,86 @@
+from friend_graph import FriendGraph, valid_steamid
+
+
+def graph(edges, rebuild_every=1000):
+    g = FriendGraph(rebuild_every=rebuild_every)
+    g.bulk_load(edges)
+    return g
+
+
+def test_suggest_ranks_friends_of_friends_by_mutual_count():
+    g = graph([("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("b", "e"), ("c", "a")])
+    assert g.suggest("a") == [("d", 2), ("e", 1)]
+
+
+def test_suggest_excludes_self_and_direct_friends():
+    g = graph([("a", "b"), ("a", "c"), ("b", "c"), ("b", "a")])
+    assert g.suggest("a") == []
+
+
+def test_uncrawled_player_uses_reverse_edges():
+    # Nobody crawled "x", but "a" and "b" list it as a friend
+    g = graph([("a", "x"), ("b", "x"), ("a", "y"), ("b", "y")])
+    assert sorted(g.friends("x")) == ["a", "b"]
+    assert g.suggest("x") == [("y", 2)]
+
+
+def test_unknown_player():
+    g = graph([("a", "b")])
+    assert g.suggest("nobody") is None
+    assert g.mutual("a", "nobody") is None
+
+
+def test_suggest_respects_k():
+    g = graph([("a", "b")] + [("b", f"f{i}") for i in range(20)])
+    assert len(g.suggest("a", k=5)) == 5
+
+
+def test_refreshed_list_is_visible_before_and_after_rebuild():
+    g = graph([("a", "b"), ("b", "c")], rebuild_every=2)
+    g.set_friends("b", ["d"])
+    assert g.suggest("a") == [("d", 1)]
+    assert g.stats["rebuilds"] == 1
+    g.set_friends("a", ["b", "e"])  # second update folds the overlay
+    assert g.stats["rebuilds"] == 2
+    assert g.snapshot()["pending_updates"] == 0
+    assert g.suggest("a") == [("d", 1)]
+
+
+def test_mutual():
+    g = graph([("a", "c"), ("a", "d"), ("b", "c"), ("b", "d"), ("b", "e")])
+    assert sorted(g.mutual("a", "b")) == ["c", "d"]
+
+
+def test_valid_steamid():
+    assert valid_steamid("76561198000000001")
+    assert not valid_steamid("7656119800000000")
+    assert not valid_steamid("7656119800000000x")
+    assert not valid_steamid(76561198000000001)
+
+
+def test_crawler_starts_with_the_first_request_not_on_import(load_service, tmp_path):
+    match = load_service("match_service", "app", USE_SQLITE="1", SQLITE_PATH=str(tmp_path / "m.db"),
+                         FRIEND_CRAWL_RATE="0")
+    assert match.friend_crawler.ident is None
+    match.app.test_client().get("/health")
+    assert match.friend_crawler.ident is not None
+    match.friend_crawler.join(5)
+    assert match.friend_crawler.stats["loaded"] is True
+
+
+def test_crawler_can_be_disabled(load_service, tmp_path):
+    match = load_service("match_service", "app", USE_SQLITE="1", SQLITE_PATH=str(tmp_path / "m.db"),
+                         FRIEND_CRAWLER="0")
+    match.app.test_client().get("/health")
+    assert match.friend_crawler.ident is None
+
+
+def test_friend_routes_validate_steamids(load_service, tmp_path):
+    match = load_service("match_service", "app", USE_SQLITE="1", SQLITE_PATH=str(tmp_path / "m.db"),
+                         FRIEND_CRAWLER="0")
+    client = match.app.test_client()
+    sid = "76561198000000001"
+    assert client.get("/friends/suggest?steamid=abc").status_code == 400
+    assert client.get(f"/friends/mutual?steamid={sid}&other=abc").status_code == 400
+    assert client.get(f"/friends/mutual?steamid=abc&other={sid}").status_code == 400
+    assert client.get(f"/friends/mutual?steamid={sid}&other=76561198000000002").status_code == 404
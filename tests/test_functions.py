@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+import pytest
+
+from functions import save_cs2_scoreboard, save_cs2_scoreboards
+
+
+def _match(rng, players):
+    return {
+        "players": [{
+            "player": f"p{i}",
+            "team": "CT" if i % 2 else "T",
+            "Kills": rng.randint(0, 30),
+            "Deaths": rng.randint(0, 30),
+            "Assists": rng.choice([rng.randint(0, 10), rng.random() * 10]),
+            "DMG": rng.randint(0, 3000),
+            "HeadshotPerc": rng.random() * 100,
+        } for i in range(players)],
+        "CT_score": rng.randint(0, 13),
+        "T_score": rng.randint(0, 13),
+    }
+
+
+def test_bulk_matches_per_match_function():
+    rng = random.Random(3)
+    boards = [_match(rng, rng.choice([0, 1, 5, 10])) for _ in range(200)]
+    boards.append({"players": [{"player": "x", "team": "CT"}], "CT_score": 1, "T_score": 0})
+    assert save_cs2_scoreboards(boards) == [save_cs2_scoreboard(**b) for b in boards]
+
+
+def test_numpy_scalars_are_numbers():
+    board = {"players": [{"player": "a", "team": "T", "Kills": np.int64(4)}], "CT_score": 0, "T_score": 1}
+    assert save_cs2_scoreboards([board])[0]["match_summary"]["total_kills"] == 4
+
+
+@pytest.mark.parametrize("value", [None, "7"])
+def test_bad_stat_names_the_match_and_field(value):
+    rng = random.Random(1)
+    boards = [_match(rng, 10), _match(rng, 10)]
+    boards[1]["players"][3]["Deaths"] = value
+    with pytest.raises(TypeError, match=r"scoreboard 1: player 'p3' has no numeric Deaths"):
+        save_cs2_scoreboards(boards)
+    with pytest.raises(TypeError):
+        save_cs2_scoreboard(**boards[1])
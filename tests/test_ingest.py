@@ -0,0 +1,126 @@
+import ast
+import datetime
+import re
+
+import pytest
+
+import ingest
+import ingest_key
+from fake_pg import FakeConnection
+
+
+class IngestDB:
+    """Games, users and IngestKey rows as the ingest statements see them"""
+
+    def __init__(self, users):
+        self.users = dict(users)
+        self.games = {}
+        self.keys = {}
+        self.next_id = 100
+
+    def __call__(self, query, params):
+        if query.startswith("SELECT GameName"):
+            for name in params[0]:
+                self.games.setdefault(name, len(self.games) + 1)
+            return ["gamename", "gameid"], [(n, self.games[n]) for n in params[0]]
+        if query.startswith("SELECT MIN(TemplateID)"):
+            return ["min"], [(7,)]
+        if query.startswith('SELECT UserName'):
+            return ["username", "userid"], [(n, self.users[n]) for n in params[0] if n in self.users]
+        if query.startswith("SELECT nextval"):
+            ids = list(range(self.next_id, self.next_id + params[0]))
+            self.next_id += params[0]
+            return ["nextval"], [(i,) for i in ids]
+        if query.startswith("INSERT INTO IngestKey"):
+            values = ast.literal_eval("[" + re.search(r"VALUES (.*) ON CONFLICT", query).group(1) + "]")
+            claimed = [(k, i) for k, i in values if k not in self.keys]
+            self.keys.update(claimed)
+            return ["key", "matchid"], claimed
+        if query.startswith("SELECT Key, MatchID"):
+            return ["key", "matchid"], [(k, self.keys[k]) for k in params[0] if k in self.keys]
+        return None
+
+
+def board(key=None, **extra):
+    match = {"players": [{"player": "alice", "team": "CT", "Kills": 20, "Deaths": 10, "Assists": 5, "DMG": 2600},
+                         {"player": "bob", "team": "T", "Kills": 10, "Deaths": 20, "Assists": 0, "DMG": 1300},
+                         {"player": "ghost", "team": "T"}],
+             "CT_score": 13, "T_score": 7, "played_at": "2026-03-04T12:00:00+02:00"}
+    if key:
+        match["idempotency_key"] = key
+    match.update(extra)
+    return match
+
+
+def test_match_key_is_shared_and_content_addressed():
+    assert ingest.match_key is ingest_key.match_key
+    assert ingest_key.match_key(board()) == ingest_key.match_key(board(note="ignored"))
+    assert ingest_key.match_key(board()) != ingest_key.match_key(board(CT_score=12))
+    assert ingest_key.match_key(board("x" * 200)) == "x" * 128
+
+
+def test_parse_match_normalises_one_scoreboard():
+    parsed = ingest.parse_match(board())
+    assert parsed["played_at"] == datetime.datetime(2026, 3, 4, 10, 0)
+    assert parsed["winner"] == 1
+    alice = parsed["players"][0]
+    assert (alice["team"], alice["kda"], alice["adr"], alice["rating"]) == (1, 2.5, 130.0, None)
+    assert ingest.parse_match(board(CT_score=0, T_score=0))["players"][0]["adr"] is None
+    with pytest.raises(ValueError):
+        ingest.parse_match({"players": [{"player": "", "team": "CT"}]})
+    with pytest.raises(ValueError):
+        ingest.parse_match({"players": [{"player": "a", "team": "spectator"}]})
+
+
+def test_retried_batches_insert_each_match_once():
+    db = IngestDB({"alice": 1, "bob": 2})
+    matches = [ingest.parse_match(m) for m in (board("a"), board("b", CT_score=5), board("a"))]
+    conn = FakeConnection(db)
+    summary, learned = ingest.ingest_matches(conn.cursor(), matches, ingest.NameCache())
+
+    assert [m["status"] for m in summary["matches"]] == ["inserted", "inserted", "duplicate"]
+    assert summary["matches"][2]["match_id"] == summary["matches"][0]["match_id"]
+    assert (summary["inserted"], summary["duplicates"], summary["player_rows"]) == (2, 1, 4)
+    assert summary["unknown_players"] == ["ghost"]
+    assert summary["user_ids"] == [1, 2]
+    assert [sql.split(" (")[0] for sql, _ in conn.copies] == ["COPY Match", "COPY UserMatchBridge"]
+    assert conn.copies[0][1].splitlines()[0] == "100\t7\t2026-03-04T10:00:00\t1"
+    assert learned["users"] == {"alice": 1, "bob": 2}
+
+    retry = FakeConnection(db)
+    cache = ingest.NameCache()
+    cache.update(learned)
+    summary, _ = ingest.ingest_matches(retry.cursor(), matches, cache)
+    assert [m["status"] for m in summary["matches"]] == ["duplicate"] * 3
+    assert [m["match_id"] for m in summary["matches"]] == [100, 101, 100]
+    assert summary["inserted"] == 0 and retry.copies == []
+    assert not any(q.startswith("SELECT GameName") for q in retry.log)
+
+
+def test_match_months_are_first_days():
+    parsed = [ingest.parse_match(board(played_at=when)) for when in
+              ("2026-03-31T23:30:00-02:00", "2026-03-01T00:00:00", "2026-02-10T08:00:00")]
+    # The first one is April in UTC, which MatchDateTime is stored in
+    assert ingest.match_months(parsed) == [datetime.date(2026, m, 1) for m in (2, 3, 4)]
+
+
+def test_partitions_are_created_once_per_epoch():
+    epoch = [1]
+    conn = FakeConnection(lambda q, p: (["last_value"], [(epoch[0],)]) if "match_partition_epoch" in q else None)
+    cache = ingest.NameCache()
+    months = [datetime.date(2026, 3, 1), datetime.date(2026, 4, 1)]
+
+    cache.update(ingest.ensure_partitions(conn.cursor(), months, cache))
+    created = [p[0] for q, p in zip(conn.log, conn.params) if q.startswith("SELECT ensure_match_partition")]
+    assert created == months
+
+    conn.log.clear()
+    cache.update(ingest.ensure_partitions(conn.cursor(), months + [datetime.date(2026, 5, 1)], cache))
+    assert [q for q in conn.log if "ensure_match_partition" in q] == ["SELECT ensure_match_partition(%s)"]
+
+    # Maintenance retired a month: every cached month is checked again
+    epoch[0] = 2
+    conn.log.clear()
+    ingest.ensure_partitions(conn.cursor(), months, cache)
+    assert len([q for q in conn.log if "ensure_match_partition" in q]) == 2
+    assert cache.snapshot()["resets"] == 1
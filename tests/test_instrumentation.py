@@ -0,0 +1,100 @@
+import pathlib
+
+import pytest
+import requests
+from flask import Flask
+
+from instrumentation import Histogram, instrument, query_operation
+
+
+@pytest.mark.parametrize("sql, operation", [
+    ("  select 1", "SELECT"),
+    ("WITH x AS (SELECT 1) SELECT * FROM x", "WITH"),
+    ("EXECUTE q1(%s)", "EXECUTE"),
+    ("VACUUM match", "OTHER"),
+    ("", "OTHER"),
+])
+def test_query_operation(sql, operation):
+    assert query_operation(sql) == operation
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        h.observe(seconds, '/a"b')
+    lines = h.render()
+    assert 't_seconds_bucket{route="/a\\"b",le="0.1"} 2' in lines
+    assert 't_seconds_bucket{route="/a\\"b",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 't_seconds_sum{route="/a\\"b"} 3.650000' in lines
+    assert 't_seconds_count{route="/a\\"b"} 4' in lines
+
+
+def _app():
+    app = Flask(__name__)
+
+    @app.get("/items/<int:item>")
+    def item(item):
+        return {"item": item}
+
+    @app.get("/stream")
+    def stream():
+        return app.response_class((str(i) for i in range(3)))
+
+    return app
+
+
+def test_routes_streams_and_gauges_are_exported():
+    app = _app()
+    metrics = instrument(app, "test")
+    metrics.gauges("pool", lambda: {"in_use": 2, "ratio": 0.5, "name": "x", "nested": {"hits": True}})
+    metrics.gauges("broken", lambda: 1 / 0)
+    with metrics.time_query("SELECT"):
+        pass
+    client = app.test_client()
+    # Error pages and streams are timed until the server closes the response
+    for path in ("/items/1", "/items/2", "/missing", "/stream"):
+        client.get(path).close()
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{route="/items/<int:item>",method="GET",status="200"} 2' in body
+    assert 'http_request_duration_seconds_count{route="unmatched",method="GET",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{route="/stream",method="GET",status="200"} 1' in body
+    assert 'db_query_duration_seconds_count{operation="SELECT"} 1' in body
+    assert "\npool_in_use 2\n" in body and "\npool_ratio 0.5\n" in body and "\npool_nested_hits 1\n" in body
+    assert "pool_name" not in body and "broken" not in body
+
+
+def test_upstream_calls_are_labelled(monkeypatch):
+    session = requests.Session()
+
+    class Reply:
+        status_code = 503
+
+    monkeypatch.setattr(session, "request", lambda method, url, *a, **kw: Reply())
+    metrics = instrument(Flask(__name__), "test")
+    metrics.track_session(session, {"steam": "http://steam:5002/", "steam_v2": "http://steam:5002/v2"})
+    session.request("get", "http://steam:5002/v2/x")
+    session.request("post", "http://steam:5002/cs2")
+    session.request("get", "http://elsewhere/")
+    lines = metrics.upstream.render()
+    assert 'upstream_request_duration_seconds_count{upstream="steam_v2",method="GET",status="503"} 1' in lines
+    assert 'upstream_request_duration_seconds_count{upstream="steam",method="POST",status="503"} 1' in lines
+    assert 'upstream_request_duration_seconds_count{upstream="other",method="GET",status="503"} 1' in lines
+
+
+def test_slow_sampled_requests_are_profiled(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    monkeypatch.setenv("PROFILE_SLOW_MS", "0")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_KEEP", "2")
+    app = _app()
+    instrument(app, "test")
+    client = app.test_client()
+    for i in range(4):
+        client.get(f"/items/{i}")
+    dumps = sorted(p.name for p in pathlib.Path(tmp_path).iterdir())
+    if not dumps:
+        pytest.skip("another profiler (e.g. coverage) is active in this process")
+    assert len(dumps) == 2
+    assert all(name.startswith("test-items__int:item_-") and name.endswith(".prof") for name in dumps)
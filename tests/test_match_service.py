@@ -0,0 +1,156 @@
+import threading
+
+import pytest
+import requests
+
+
+@pytest.fixture
+def match(load_service, tmp_path):
+    return load_service("match_service", "app", USE_SQLITE="1", SQLITE_PATH=str(tmp_path / "matches.db"),
+                        FRIEND_CRAWLER="0")
+
+
+def test_sqlite_connection_is_reused_per_thread(match):
+    conn = match._sqlite_conn()
+    assert match._sqlite_conn() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    other = []
+    t = threading.Thread(target=lambda: other.append(match._sqlite_conn()))
+    t.start()
+    t.join()
+    assert other[0] is not conn
+
+
+def user_stats(conn, user_id):
+    row = conn.execute("SELECT Wins, Losses FROM UserStats WHERE UserID=?", (user_id,)).fetchone()
+    return tuple(row) if row else None
+
+
+def test_pattern_reads_the_rollup(match):
+    client = match.app.test_client()
+    body = client.get("/pattern?user_id=7").get_json()
+    assert (body["wins"], body["losses"], body["win_loss_ratio"]) == (3, 2, 1.5)  # the seeded history
+    assert client.get("/pattern?user_id=7").get_json()["wins"] == 3  # seeded once
+
+
+def test_triggers_keep_the_rollup_current(match):
+    conn = match._sqlite_conn()
+    match._ensure_sqlite()
+    with conn:
+        conn.executemany("INSERT INTO Match(UserID, Won) VALUES(?,?)", [(1, 1), (1, 1), (1, 0), (2, 0)])
+    assert user_stats(conn, 1) == (2, 1)
+    with conn:
+        conn.execute("UPDATE Match SET UserID=2 WHERE UserID=1 AND Won=0")
+    assert (user_stats(conn, 1), user_stats(conn, 2)) == ((2, 0), (0, 2))
+    with conn:
+        conn.execute("UPDATE Match SET Won=0 WHERE UserID=1")
+        conn.execute("DELETE FROM Match WHERE UserID=2")
+    assert (user_stats(conn, 1), user_stats(conn, 2)) == ((0, 2), (0, 0))
+
+
+def test_rollup_is_backfilled_from_existing_matches(match, tmp_path, monkeypatch):
+    conn = match._open_sqlite()
+    with conn:
+        conn.execute("CREATE TABLE Match(MatchID INTEGER PRIMARY KEY AUTOINCREMENT, UserID INTEGER, Won INTEGER)")
+        conn.executemany("INSERT INTO Match(UserID, Won) VALUES(?,?)", [(5, 1), (5, 0), (5, 1)])
+    match._ensure_sqlite()
+    assert user_stats(conn, 5) == (2, 1)
+
+
+class Reply:
+    def __init__(self, payload, status=200):
+        self.status_code = status
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+
+def test_similar_degrades_when_db_api_times_out(load_service, tmp_path, monkeypatch):
+    match = load_service("match_service", "app", USE_SQLITE="0", FRIEND_CRAWLER="0")
+    steam = {"playtime": {"appid": 730, "playtime_forever": 600}}
+    monkeypatch.setattr(match.http, "get", lambda url, timeout=None: Reply(steam))
+
+    def db_api_down(url, json=None, timeout=None):
+        raise requests.ConnectTimeout("db_api timed out")
+
+    monkeypatch.setattr(match.http, "post", db_api_down)
+    r = match.app.test_client().get("/similar?steamid=76561198000000001&user_id=1")
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["cs2_playtime"] == steam["playtime"]
+    assert body["similar_players"] == []
+    assert "similar_players" in body["degraded"] and "cs2" not in body["degraded"]
+    assert "db_api timed out" in body["errors"]["similar_players"]
+
+
+def test_similar_degrades_when_steam_fails(match, monkeypatch):
+    def steam_down(url, timeout=None):
+        raise requests.ConnectionError("steam_api unreachable")
+
+    monkeypatch.setattr(match.http, "get", steam_down)
+    body = match.app.test_client().get("/similar?steamid=76561198000000001").get_json()
+    assert body["degraded"] == ["cs2", "friends"]
+    assert body["cs2_playtime"] == {"appid": 730, "playtime_forever": 1200}
+    assert set(body["errors"]) == {"cs2", "friends"}
+
+
+def scoreboard(key, ct_names, t_names, ct_score=13, t_score=5):
+    players = [{"player": n, "team": team, "steam_id": None, "Kills": 20, "Deaths": 10, "Assists": 2,
+                "DMG": 1800, "Rating": 1.2}
+               for team, names in (("CT", ct_names), ("T", t_names)) for n in names]
+    return {"idempotency_key": key, "players": players, "CT_score": ct_score, "T_score": t_score}
+
+
+def test_sqlite_ingest_refreshes_the_similarity_index(match):
+    client = match.app.test_client()
+    client.post("/matches/ingest", json={"matches": [scoreboard("m1", ["a", "b"], ["c", "d"])]})
+    assert client.get("/similar/players?user_id=1").status_code == 200  # loads the index
+    client.post("/matches/ingest", json={"matches": [scoreboard("m2", ["e"], ["a"], 2, 13)]})
+    new = match._sqlite_conn().execute('SELECT UserID FROM "User" WHERE UserName=?', ("e",)).fetchone()[0]
+    assert new in match.players
+    row = match.players._raw[match.players._rows[1]]
+    assert row[match.players._col["win_ratio"]] == 1.0  # "a" won both
+
+
+def test_db_api_ingest_refreshes_the_similarity_index(load_service, monkeypatch):
+    match = load_service("match_service", "app", USE_SQLITE="0", FRIEND_CRAWLER="0")
+    match.players.bulk_load([1, 2], [[1.0, 80.0, 1.0, 0.5, 0], [1.0, 80.0, 1.0, 0.5, 0]])
+    monkeypatch.setattr(match, "_players_loaded", True)
+    sent = []
+
+    def post(url, json=None, timeout=None):
+        sent.append((url, json))
+        if url.endswith("/ingest/matches"):
+            return Reply({"inserted": 1, "user_ids": [2, 3],
+                          "matches": [{"key": "m1", "match_id": 10, "status": "inserted"}]})
+        return Reply({"results": [
+            {"userid": 2, "matches": 2, "wins": 2, "losses": 0, "kda": "4.00", "adr": "200.00", "rating": "2.40"},
+            {"userid": 3, "matches": 1, "wins": 0, "losses": 1, "kda": "1.00", "adr": "50.00", "rating": "0.80"},
+        ]})
+
+    monkeypatch.setattr(match.http, "post", post)
+    r = match.app.test_client().post("/matches/ingest", json={"matches": [scoreboard("m1", ["a"], ["b"])]})
+    assert r.status_code == 200
+    assert sent[-1][1]["params"] == [[2, 3]]
+    assert 3 in match.players
+    assert match.players._raw[match.players._rows[2]].tolist()[:4] == pytest.approx([2.0, 100.0, 1.2, 1.0])
+
+
+def test_failed_index_refresh_reloads_on_the_next_query(load_service, monkeypatch):
+    match = load_service("match_service", "app", USE_SQLITE="0", FRIEND_CRAWLER="0")
+    monkeypatch.setattr(match, "_players_loaded", True)
+
+    def post(url, json=None, timeout=None):
+        if url.endswith("/ingest/matches"):
+            return Reply({"inserted": 1, "user_ids": [1], "matches": []})
+        raise requests.ConnectTimeout("db_api timed out")
+
+    monkeypatch.setattr(match.http, "post", post)
+    r = match.app.test_client().post("/matches/ingest", json={"matches": [scoreboard("m1", ["a"], ["b"])]})
+    assert r.status_code == 200
+    assert match._players_loaded is False
@@ -0,0 +1,70 @@
+import io
+import json
+import pathlib
+
+import pytest
+
+import scoreboard
+
+IMAGES = pathlib.Path(__file__).resolve().parent.parent / "testImages"
+
+
+@pytest.fixture
+def ocr(load_service, monkeypatch, tmp_path):
+    monkeypatch.setattr(scoreboard, "pytesseract", None)
+    service = load_service("OCR", "ocr", OCR_WORKERS="1", OCR_SPOOL_DIR=str(tmp_path))
+    submitted = []
+    submit = service.pool.submit
+
+    def record(func, *args):
+        submitted.append((func.__name__, args))
+        return submit(func, *args)
+
+    monkeypatch.setattr(service.pool, "submit", record)
+    service.submitted = submitted
+    yield service
+    service.pool.shutdown(wait=True)
+
+
+def _small_args(submitted):
+    return all(isinstance(arg, (str, type(None))) for _, args in submitted for arg in args)
+
+
+def test_miss_then_hit_sends_only_paths_to_workers(ocr, tmp_path):
+    client = ocr.app.test_client()
+    data = (IMAGES / "scores_only.jpg").read_bytes()
+
+    first = client.post("/ocr", data={"file": (io.BytesIO(data), "a.jpg")}).get_json()
+    assert first["cache"]["hit"] is False
+    assert (first["CT_score"], first["T_score"]) == (5, 3)
+    assert [name for name, _ in ocr.submitted] == ["fingerprint", "read_scoreboard"]
+    # Hash and recognition read the same spooled file
+    assert ocr.submitted[0][1][0] == ocr.submitted[1][1][0]
+    assert _small_args(ocr.submitted)
+
+    second = client.post("/ocr", data={"file": (io.BytesIO(data), "b.jpg")}).get_json()
+    assert second["cache"]["hit"] is True
+    assert second["players"] == first["players"]
+    assert [name for name, _ in ocr.submitted[2:]] == ["fingerprint"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_streams_base64_lines(ocr, tmp_path):
+    body = b"\n".join([
+        (IMAGES / "scores_only.base64.txt").read_bytes().strip(),
+        b"not base64!",
+        json.dumps({"name": "whole", "data": (IMAGES / "scoreboard_whole.base64.txt").read_text().strip()}).encode(),
+    ])
+    response = ocr.app.test_client().post("/ocr/batch", data=body, content_type="text/plain")
+    lines = sorted((json.loads(line) for line in response.data.splitlines()), key=lambda l: l["index"])
+    assert [l["name"] for l in lines] == ["line 1", "line 2", "whole"]
+    assert lines[1]["error"] == "bad input: invalid base64 image"
+    assert lines[0]["result"]["players"] == lines[2]["result"]["players"]
+    assert _small_args(ocr.submitted)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_missing_file_is_rejected(ocr):
+    response = ocr.app.test_client().post("/ocr", data={"layout": "whole"})
+    assert response.status_code == 400
+    assert ocr.submitted == []
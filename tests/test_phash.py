@@ -0,0 +1,76 @@
+import io
+import pathlib
+import random
+
+import numpy as np
+from PIL import Image
+
+import phash
+
+IMAGES = pathlib.Path(__file__).resolve().parent.parent / "testImages"
+SIG = np.zeros(8, dtype=np.int32)
+
+
+def test_reencoded_screenshot_is_a_near_duplicate():
+    original = IMAGES / "scores_only.jpg"
+    image = Image.open(original)
+    resaved = io.BytesIO()
+    image.resize((image.width * 2, image.height * 2)).save(resaved, "JPEG", quality=70)
+
+    a = phash.fingerprint(str(original))
+    b = phash.fingerprint(resaved.getvalue())
+    assert a[2] == b[2] == "scores_only"
+    cache = phash.PHashCache()
+    cache.put(a[0], a[1], {"players": []})
+    result, distance = cache.get(b[0], b[1])
+    assert result == {"players": []}
+    assert distance <= cache.max_distance
+
+
+def test_changed_cell_ink_is_a_miss():
+    cache = phash.PHashCache(tolerance=6)
+    cache.put(1, SIG, "old")
+    assert cache.get(1, SIG + 6) == ("old", 0)
+    changed = SIG.copy()
+    changed[3] = 7
+    assert cache.get(1, changed) is None
+    assert cache.snapshot()["hit_ratio"] == 0.5
+
+
+def test_lru_eviction():
+    cache = phash.PHashCache(max_entries=2, max_distance=0)
+    cache.put(1 << 100, SIG, "a")
+    cache.put(1 << 50, SIG, "b")
+    assert cache.get(1 << 100, SIG)[0] == "a"
+    cache.put(1 << 10, SIG, "c")
+    assert cache.get(1 << 50, SIG) is None
+    assert cache.get(1 << 100, SIG)[0] == "a"
+    assert cache.stats["evictions"] == 1
+
+
+def test_chunk_index_matches_a_linear_scan():
+    rng = random.Random(7)
+    cache = phash.PHashCache(max_entries=2000, max_distance=8)
+    hashes = [rng.getrandbits(phash.HASH_BITS) for _ in range(500)]
+    for i, h in enumerate(hashes):
+        cache.put(h, SIG, i)
+    for _ in range(200):
+        base = rng.choice(hashes)
+        query = base
+        for bit in rng.sample(range(phash.HASH_BITS), rng.randint(0, 12)):
+            query ^= 1 << bit
+        expected = min(((h ^ query).bit_count(), i) for i, h in enumerate(hashes))
+        hit = cache.get(query, SIG)
+        if expected[0] > cache.max_distance:
+            assert hit is None
+        else:
+            assert hit is not None and hit[1] == expected[0]
+
+
+def test_persisted_entries_survive_restart(tmp_path):
+    path = str(tmp_path / "ocr.db")
+    first = phash.PHashCache(path=path)
+    first.put(12345, SIG + 3, {"CT_score": 13})
+    second = phash.PHashCache(path=path, max_entries=1)
+    assert second.get(12345, SIG + 3) == ({"CT_score": 13}, 0)
+    assert second.snapshot()["persistent"] is True
@@ -0,0 +1,136 @@
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+import pipeline
+from pipeline import Pipeline
+
+
+def test_independent_steps_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)  # deadlocks unless both run at once
+
+    def left():
+        barrier.wait()
+        return "l"
+
+    def right():
+        barrier.wait()
+        return "r"
+
+    p = Pipeline(max_workers=2).step(left, after=()).step(right, after=())
+    p.step(lambda a, b: a + b, after=(left, right))
+    assert p.run() == "lr"
+    assert [r["function"] for r in p.results] == ["left", "right", "<lambda>"]
+    assert p.results[2]["depends_on"] == ["left", "right"]
+
+
+def test_chain_input_and_async_steps():
+    async def shout(text):
+        await asyncio.sleep(0)
+        return text.upper()
+
+    p = Pipeline().step(lambda text: text + "!").step(shout).step(lambda x, unused=None: f"<{x}>")
+    assert p.run("hi") == "<HI!>"
+    assert all(r["wall_ms"] >= 0 and r["cpu_ms"] >= 0 for r in p.results)
+
+
+def test_missing_input_and_arity_are_reported():
+    with pytest.raises(TypeError):
+        Pipeline().step(lambda: 1).step(lambda a, b: a + b)  # two required, one dependency
+    with pytest.raises(ValueError):
+        Pipeline().step(lambda: 1, after=("nope",))
+    with pytest.raises(TypeError):
+        Pipeline().step(lambda text: text).run()
+
+
+def test_signatures_are_inspected_once_per_step(monkeypatch):
+    calls = []
+    signature = pipeline.inspect.signature
+    monkeypatch.setattr(pipeline.inspect, "signature", lambda f: calls.append(f) or signature(f))
+    p = Pipeline().step(lambda text: text).step(lambda x: x * 2)
+    assert len(calls) == 2
+    for _ in range(3):
+        assert p.run("ab") == "abab"
+    assert len(calls) == 2
+
+
+def test_process_executor_runs_module_level_steps():
+    p = Pipeline(executor="process", max_workers=2).step(sum, after=()).step(len, after=())
+    p.step(max, after=(sum, len))
+    assert p.run([1, 2, 3]) == 6
+
+
+# ---- Streaming ---------------------------------------------
+def jitter(x):
+    time.sleep(random.random() * 0.005)
+    return x
+
+
+def test_stream_is_ordered_despite_concurrent_stages():
+    p = Pipeline().step(jitter, concurrency=4).step(lambda x: x * 2, concurrency=3)
+    out = list(p.stream(range(100), queue_size=8))
+    assert [o["index"] for o in out] == list(range(100))
+    assert [o["result"] for o in out] == [2 * i for i in range(100)]
+
+
+def test_unordered_stream_yields_every_item():
+    p = Pipeline().step(jitter, concurrency=4)
+    out = list(p.stream(range(50), ordered=False))
+    assert sorted(o["index"] for o in out) == list(range(50))
+
+
+def test_batched_step_keeps_order():
+    p = Pipeline().step(lambda xs: [x + 1 for x in xs], batch=7, concurrency=2)
+    out = list(p.stream(range(30)))
+    assert [o["result"] for o in out] == [i + 1 for i in range(30)]
+
+
+def test_failing_item_is_reported_in_place():
+    def check(x):
+        if x == 3:
+            raise ValueError("bad item")
+        return x
+
+    p = Pipeline().step(check).step(lambda x: x * 10)
+    out = list(p.stream(range(5)))
+    assert out[3] == {"index": 3, "error": "check: bad item"}
+    assert [o.get("result") for o in out] == [0, 10, 20, None, 40]
+
+
+def test_slow_item_bounds_reads_ahead():
+    first = threading.Event()
+    read = []
+
+    def items():
+        for i in range(1000):
+            read.append(i)
+            yield i
+
+    def hold_first(x):
+        if x == 0:
+            first.wait(2)
+        return x
+
+    p = Pipeline().step(hold_first, concurrency=2)
+    stream = p.stream(items(), queue_size=4)
+    consumer = threading.Thread(target=lambda: next(stream))
+    consumer.start()
+    time.sleep(0.2)
+    # Item 0 blocks the head of the line: reading stops at the window
+    assert len(read) <= 8
+    first.set()
+    consumer.join(2)
+    stream.close()
+
+
+def test_stream_reads_async_iterables():
+    async def items():
+        for i in range(5):
+            await asyncio.sleep(0)
+            yield i
+
+    p = Pipeline().step(lambda x: x + 1)
+    assert [o["result"] for o in p.stream(items())] == [1, 2, 3, 4, 5]
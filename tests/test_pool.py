@@ -0,0 +1,75 @@
+import pytest
+
+from fake_pg import FakeConnection
+from pool import ConnectionPool, PoolTimeout, _param_types, _preparable, _to_positional
+
+
+def test_param_types_match_inlined_literals():
+    assert _param_types([1, 2**40, 2**70, True, 1.5, float("nan"), "x", None]) == (
+        "int4", "int8", "numeric", "boolean", "numeric", "float8", "unknown", "unknown")
+    assert _param_types([(1, 2)]) is None  # IN %s expands the tuple
+    assert _param_types({"a": 1}) is None
+
+
+def test_to_positional():
+    assert _to_positional("SELECT * FROM t WHERE a = %s AND b > %s") == "SELECT * FROM t WHERE a = $1 AND b > $2"
+
+
+@pytest.mark.parametrize("query, ok", [
+    ("SELECT * FROM t WHERE a = %s", True),
+    ("with x as (select 1) select * from x", True),
+    ("SELECT * FROM t WHERE a = %(a)s", False),
+    ("SELECT * FROM t WHERE a LIKE 'x%%'", False),
+    ("SELECT 1; SELECT 2", False),
+    ("CREATE TABLE t (a int)", False),
+])
+def test_preparable(query, ok):
+    assert _preparable(query) is ok
+
+
+def test_statement_is_prepared_once_per_connection():
+    pool = ConnectionPool(FakeConnection, maxconn=1)
+    with pool.connection() as pc:
+        for value in (1, 2):
+            pool.execute(pc, pc.conn.cursor(), "SELECT * FROM t WHERE a = %s", [value])
+    prepares = [q for q in pc.conn.log if q.startswith("PREPARE")]
+    assert prepares == ["PREPARE s1 (int4) AS SELECT * FROM t WHERE a = $1"]
+    assert pc.conn.log.count("EXECUTE s1 (%s)") == 2
+    assert (pool.stats["stmt_misses"], pool.stats["stmt_hits"]) == (1, 1)
+
+
+def test_rejected_prepare_falls_back_to_plain_execute():
+    pool = ConnectionPool(lambda: FakeConnection(reject_prepare=True), maxconn=1)
+    with pool.connection() as pc:
+        for _ in range(2):
+            pool.execute(pc, pc.conn.cursor(), "SELECT * FROM t WHERE %s IS NULL", [None])
+    assert pc.conn.log.count("SELECT * FROM t WHERE %s IS NULL") == 2
+    assert pool.stats["stmt_fallbacks"] == 1  # remembered as unpreparable
+
+
+def test_statement_cache_evicts_least_recently_used():
+    pool = ConnectionPool(FakeConnection, maxconn=1, stmt_cache_size=2)
+    with pool.connection() as pc:
+        for table in ("a", "b", "c"):
+            pool.execute(pc, pc.conn.cursor(), f"SELECT * FROM {table} WHERE x = %s", [1])
+    assert "DEALLOCATE s1" in pc.conn.log
+    assert pool.stats["stmt_evictions"] == 1
+
+
+def test_connections_are_reused_and_bounded():
+    opened = []
+    pool = ConnectionPool(lambda: opened.append(1) or FakeConnection(), maxconn=1, timeout=0.05)
+    first = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    pool.putconn(first)
+    assert pool.getconn() is first
+    assert len(opened) == 1
+    assert pool.snapshot()["pool_timeouts"] == 1
+
+
+def test_discarded_connection_frees_its_slot():
+    pool = ConnectionPool(FakeConnection, maxconn=1, timeout=0.05)
+    pool.putconn(pool.getconn(), discard=True)
+    assert pool.getconn() is not None
+    assert pool.stats["discarded"] == 1
@@ -0,0 +1,88 @@
+import pytest
+
+from query_cache import QueryCache, read_tables, written_tables
+
+
+@pytest.mark.parametrize("query, tables", [
+    ('SELECT * FROM "User" u JOIN UserMatchBridge b ON b.UserID = u.UserID', {"User", "usermatchbridge"}),
+    ("SELECT * FROM public.Match m, Game g WHERE m.GameID = g.GameID", {"match", "game"}),
+    ("SELECT * FROM a, b AS bb, c", {"a", "b", "c"}),
+    ("SELECT * FROM ONLY match_p2024_05", {"match"}),
+    ("SELECT * FROM usermatchbridge_default", {"usermatchbridge"}),
+    ("SELECT * FROM match_archive", {"match_archive"}),
+    ("SELECT 1", set()),
+])
+def test_read_tables(query, tables):
+    assert read_tables(query) == tables
+
+
+@pytest.mark.parametrize("query, tables", [
+    ('INSERT INTO "User"(Name) VALUES (%s)', {"User"}),
+    ("UPDATE ONLY Match SET Score = 1", {"match"}),
+    ("DELETE FROM match_p2024_05 WHERE MatchID = 1", {"match"}),
+    ("TRUNCATE TABLE a, b", {"a", "b"}),
+    ("COPY usermatchstats FROM STDIN", {"usermatchstats"}),
+    ("WITH moved AS (DELETE FROM Match RETURNING *) INSERT INTO archive SELECT * FROM moved", {"match", "archive"}),
+    ("SELECT * FROM FriendCrawl FOR UPDATE SKIP LOCKED", set()),
+    ("INSERT INTO t(a) VALUES (1) ON CONFLICT (a) DO UPDATE SET a = excluded.a", {"t"}),
+    ("CREATE TABLE x (a int)", None),
+])
+def test_written_tables(query, tables):
+    assert written_tables(query) == tables
+
+
+def cached_read(cache, query, value, params=()):
+    plan = cache.plan(query, list(params))
+    cache.put(plan, value, size=10)
+    return plan
+
+
+def test_write_invalidates_readers_and_dependents():
+    cache = QueryCache()
+    user = cached_read(cache, 'SELECT * FROM "User"', "users")
+    stats = cached_read(cache, "SELECT * FROM usermatchstats", "stats")
+    game = cached_read(cache, "SELECT * FROM game", "games")
+    cache.invalidate_query('DELETE FROM "User" WHERE UserID = 1')
+    assert cache.get(user) is None
+    assert cache.get(stats) is None  # ON DELETE CASCADE from User
+    assert cache.get(game) == "games"
+
+
+def test_write_to_a_partition_invalidates_the_parent():
+    cache = QueryCache()
+    plan = cached_read(cache, "SELECT * FROM Match", "matches")
+    cache.invalidate_query("INSERT INTO match_p2024_05 VALUES (1)")
+    assert cache.get(plan) is None
+
+
+def test_read_racing_a_write_is_not_stored():
+    cache = QueryCache()
+    plan = cache.plan("SELECT * FROM game", [])
+    cache.invalidate(["game"])
+    cache.put(plan, "stale", size=10)
+    assert cache.get(cache.plan("SELECT * FROM game", [])) is None
+    assert cache.stats["stale_skips"] == 1
+
+
+def test_volatile_and_write_queries_are_not_cacheable():
+    cache = QueryCache()
+    assert cache.plan("SELECT now()", []) is None
+    assert cache.plan("SELECT * FROM FriendCrawl FOR UPDATE", []) is None
+    assert cache.plan("WITH d AS (DELETE FROM a RETURNING *) SELECT * FROM d", []) is None
+    assert cache.plan("SELECT * FROM a", []) is not None
+
+
+def test_ddl_clears_everything():
+    cache = QueryCache()
+    plan = cached_read(cache, "SELECT * FROM game", "games")
+    cache.invalidate_query("ALTER TABLE game ADD COLUMN x int")
+    assert cache.get(plan) is None
+
+
+def test_size_bounds_evict_oldest():
+    cache = QueryCache(max_entries=2)
+    first = cached_read(cache, "SELECT * FROM a", 1)
+    cached_read(cache, "SELECT * FROM b", 2)
+    cached_read(cache, "SELECT * FROM c", 3)
+    assert cache.get(first) is None
+    assert cache.stats["evictions"] == 1
@@ -0,0 +1,121 @@
+import pipeline
+import result_cache
+from pipeline import Pipeline
+from result_cache import ResultCache, step_fingerprint
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats["memory_evictions"] == 1
+
+
+def test_disk_tier_evicts_oldest_to_budget(tmp_path):
+    cache = ResultCache(max_entries=1, path=str(tmp_path / "results.db"), disk_max_bytes=2000)
+    for i in range(10):
+        cache.put(f"k{i}", b"x" * 300)
+    snapshot = cache.snapshot()
+    assert snapshot["disk_bytes"] <= 2000
+    assert cache.stats["disk_evictions"] > 0
+    assert cache.get("k0") == (False, None)
+    assert cache.get("k9") == (True, b"x" * 300)
+
+
+def test_disk_tier_survives_reopen(tmp_path):
+    path = str(tmp_path / "results.db")
+    ResultCache(path=path).put("k", {"v": 1})
+    cache = ResultCache(path=path)
+    assert cache.get("k") == (True, {"v": 1})
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_hits_are_copies():
+    cache = ResultCache()
+    cache.put("k", [1, 2])
+    _, value = cache.get("k")
+    value.append(3)
+    assert cache.get("k") == (True, [1, 2])
+
+
+def test_version_salts_keys():
+    cache = ResultCache()
+    cache.put("k", 1)
+    cache.version = "v2"
+    assert cache.get("k") == (False, None)
+
+
+def test_unpicklable_values_are_not_cached():
+    cache = ResultCache()
+    cache.put("k", lambda: None)
+    assert cache.get("k") == (False, None)
+
+
+LIMIT = 10
+
+
+def test_fingerprint_follows_referenced_globals():
+    global LIMIT
+
+    def step(x):
+        return min(x, LIMIT)
+
+    before = step_fingerprint(step, "step")
+    assert step_fingerprint(step, "step") == before
+    LIMIT = 20
+    try:
+        assert step_fingerprint(step, "step") != before
+    finally:
+        LIMIT = 10
+    assert step_fingerprint(step, "step", version="2") != before
+
+
+def double(x):
+    return x * 2
+
+
+def test_dag_run_and_cache():
+    cache = ResultCache()
+
+    def build():
+        return (Pipeline(cache=cache).step(double)
+                .step(lambda: "root", name="other", after=())
+                .step(lambda a, b: f"{a}-{b}", after=("double", "other")))
+
+    first = build()
+    assert first.run(4) == "8-root"
+    assert not any(r["cached"] for r in first.results)
+    second = build()
+    assert second.run(4) == "8-root"
+    assert all(r["cached"] for r in second.results)
+    assert build().run(5) == "10-root"
+
+
+def test_forks_share_fingerprints_and_keep_their_own_results():
+    cache = ResultCache()
+    base = Pipeline(cache=cache).step(double)
+    first, second = base.fork(), base.fork()
+    assert first.run(3) == 6 and second.run(3) == 6
+    assert first.steps[0] is second.steps[0]
+    assert [r["cached"] for r in first.results] == [False]
+    assert [r["cached"] for r in second.results] == [True]
+    assert base.results == []
+
+
+def test_pipeline_endpoint_does_not_fingerprint_per_request(load_service, monkeypatch):
+    app = load_service("pypelyne_service", "app")
+    calls = []
+    monkeypatch.setattr(result_cache, "step_fingerprint", lambda *a: calls.append(a))
+    monkeypatch.setattr(pipeline, "step_fingerprint", lambda *a: calls.append(a))
+    client = app.app.test_client()
+    for text in ("a", "b", "a"):
+        body = client.get("/pipeline", query_string={"input": text}).get_json()
+        assert body["final_result"] == "Hello, World from Pypelyne!"
+        assert body["execution_details"][0]["result"] == f"Processing: {text} - Status: Complete"
+    assert body["execution_details"][0]["cached"]
+    assert not body["execution_details"][1]["cached"]
+    assert calls == []
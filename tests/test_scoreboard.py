@@ -0,0 +1,59 @@
+import pathlib
+
+import numpy as np
+import pytest
+
+import scoreboard
+
+IMAGES = pathlib.Path(__file__).resolve().parent.parent / "testImages"
+
+T_TOP_FRAGGER = {"player": "T player 1", "team": "T", "Kills": 17, "Deaths": 5,
+                 "Assists": 2, "HeadshotPerc": 70, "DMG": 1688}
+
+
+@pytest.fixture(autouse=True)
+def no_tesseract(monkeypatch):
+    # Names depend on whether Tesseract is installed; pin the fallback
+    monkeypatch.setattr(scoreboard, "pytesseract", None)
+
+
+@pytest.mark.parametrize("image, layout", [("scoreboard_whole.jpg", "whole"), ("scores_only.jpg", "scores_only")])
+def test_reads_both_layouts(image, layout):
+    result = scoreboard.read_scoreboard(str(IMAGES / image))
+    assert result["layout"] == layout
+    assert (result["CT_score"], result["T_score"]) == (5, 3)
+    assert [p["team"] for p in result["players"]] == ["CT"] * 5 + ["T"] * 5
+    assert result["players"][5] == T_TOP_FRAGGER
+    assert [p["DMG"] for p in result["players"][:5]] == [998, 739, 728, 417, 337]
+
+
+def test_layouts_agree_and_bytes_match_paths():
+    whole = scoreboard.read_scoreboard((IMAGES / "scoreboard_whole.jpg").read_bytes())
+    cropped = scoreboard.read_scoreboard(str(IMAGES / "scores_only.jpg"))
+    assert whole["players"] == cropped["players"]
+
+
+def test_table_is_cropped_to_reference_size():
+    for image in ("scoreboard_whole.jpg", "scores_only.jpg"):
+        rgb, _ = scoreboard.load_table(str(IMAGES / image))
+        assert rgb.shape == (scoreboard.TABLE_SIZE[1], scoreboard.TABLE_SIZE[0], 3)
+
+
+def test_layout_detection():
+    assert scoreboard.detect_layout((1280, 960)) == "whole"
+    assert scoreboard.detect_layout((640, 480)) == "whole"
+    assert scoreboard.detect_layout((1360, 708)) == "scores_only"
+    assert scoreboard.detect_layout((1000, 1000)) is None
+
+
+def test_unknown_layout_is_rejected(tmp_path):
+    from PIL import Image
+    path = tmp_path / "square.png"
+    Image.new("RGB", (300, 300)).save(path)
+    with pytest.raises(ValueError, match="unsupported scoreboard layout"):
+        scoreboard.read_scoreboard(str(path))
+
+
+def test_blank_cells_have_no_glyphs():
+    assert scoreboard.glyphs(np.full((23, 48), 30.0, dtype=np.float32)) == []
+    assert scoreboard.TemplateDigits().read(np.zeros((23, 48), dtype=np.float32)) is None
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from similarity import SimilarityIndex
+
+
+def brute_force(raw, row, k):
+    mu, sigma = raw.mean(axis=0), raw.std(axis=0)
+    sigma[sigma == 0] = 1.0
+    z = (raw - mu) / sigma
+    d = np.sqrt(((z - z[row]) ** 2).sum(axis=1))
+    d[row] = np.inf
+    return [int(i) for i in np.argsort(d, kind="stable")[:k]]
+
+
+def test_euclidean_matches_brute_force():
+    rng = np.random.default_rng(1)
+    raw = rng.normal(size=(200, 5)).astype(np.float32)
+    index = SimilarityIndex()
+    index.bulk_load(list(range(200)), raw)
+    got = [key for key, _ in index.query(key=7, k=5, metric="euclidean")]
+    assert got == brute_force(raw, 7, 5)
+
+
+def test_query_excludes_the_player_and_orders_best_first():
+    index = SimilarityIndex(features=("a", "b"))
+    for key, a, b in (("p", 1, 1), ("q", 1.1, 1), ("r", 5, 5), ("s", -3, 4)):
+        index.upsert(key, a=a, b=b)
+    cosine = index.query(key="p", k=3)
+    assert [key for key, _ in cosine][0] in ("q", "r")
+    assert "p" not in [key for key, _ in cosine]
+    scores = [score for _, score in cosine]
+    assert scores == sorted(scores, reverse=True)
+    euclid = index.query(key="p", k=3, metric="euclidean")
+    assert euclid[0][0] == "q"
+    assert [d for _, d in euclid] == sorted(d for _, d in euclid)
+
+
+def test_upsert_grows_and_updates_in_place():
+    index = SimilarityIndex(features=("a", "b"), capacity=2)
+    for i in range(10):
+        index.upsert(i, a=i, b=0)
+    assert len(index) == 10 and 9 in index
+    assert index.query(key=0, k=1, metric="euclidean")[0][0] == 1
+    index.upsert(5, a=-0.5)  # b keeps its value
+    assert index.query(key=0, k=1, metric="euclidean")[0][0] == 5
+
+
+def test_query_by_vector_and_small_index():
+    index = SimilarityIndex(features=("a",))
+    assert index.query(vector=[1.0]) == []
+    index.upsert("only", a=1)
+    assert index.query(key="only") == []
+    assert index.query(vector=[1.0], metric="euclidean") == [("only", 0.0)]
+
+
+def test_unknown_feature_and_metric_are_rejected():
+    index = SimilarityIndex(features=("a",))
+    with pytest.raises(ValueError):
+        index.upsert("p", b=1)
+    index.upsert("p", a=1)
+    with pytest.raises(ValueError):
+        index.query(key="p", metric="manhattan")
+
+
+def test_approximate_mode_finds_the_player_cluster():
+    rng = np.random.default_rng(2)
+    centers = np.array([[0, 0, 0, 0, 0], [20, 20, 20, 20, 20], [-20, 20, -20, 20, -20]], dtype=np.float32)
+    raw = np.concatenate([c + rng.normal(size=(100, 5)) for c in centers]).astype(np.float32)
+    index = SimilarityIndex(seed=0)
+    index.bulk_load(list(range(300)), raw)
+    index.build_clusters(n_clusters=3)
+    approx = index.query(key=150, k=10, metric="euclidean", approximate=True, nprobe=1)
+    exact = index.query(key=150, k=10, metric="euclidean")
+    assert [key for key, _ in approx] == [key for key, _ in exact]
+
+    # Players added after clustering are assigned lazily and can be found
+    index.upsert("new", **dict(zip(index.features, raw[150] + 0.001)))
+    near = index.query(key=150, k=1, metric="euclidean", approximate=True, nprobe=1)
+    assert near[0][0] == "new"
@@ -0,0 +1,98 @@
+import threading
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+
+class FakeResponse:
+    def __init__(self, url, payload, status=200):
+        self.url = url
+        self.status_code = status
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for url: {self.url}", response=self)
+
+
+class FakeSteam:
+    """Answers the Steam Web API calls steamAPI makes and counts them per path"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.summary_batches = []
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        parsed = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        with self.lock:
+            self.calls[parsed.path] += 1
+        if parsed.path.endswith("GetOwnedGames/v0001/"):
+            return FakeResponse(url, {"response": {"games": [{"appid": 730, "playtime_forever": 600},
+                                                             {"appid": 10, "playtime_forever": 5}]}})
+        if parsed.path.endswith("GetUserStatsForGame/v0002/"):
+            return FakeResponse(url, {"playerstats": {"stats": [{"name": "total_kills", "value": 42}]}})
+        if parsed.path.endswith("GetPlayerSummaries/v0002/"):
+            steamids = query["steamids"].split(",")
+            with self.lock:
+                self.summary_batches.append(steamids)
+            return FakeResponse(url, {"response": {"players": [
+                {"steamid": s, "personaname": f"p{s}"} for s in steamids if not s.startswith("missing")]}})
+        return FakeResponse(url, {}, status=404)
+
+
+@pytest.fixture
+def steam_api(load_service, monkeypatch):
+    def load(**env):
+        module = load_service("Steam_API", "steamAPI", STEAM_API_KEY="test", STEAM_API_BASE="http://steam.test",
+                              **env)
+        fake = FakeSteam()
+        monkeypatch.setattr(module.session, "get", fake.get)
+        return module, fake
+    return load
+
+
+def test_cs2_fetches_owned_games_once_and_shares_it_with_games(steam_api):
+    module, fake = steam_api()
+    client = module.app.test_client()
+    body = client.get("/steam/user/1/cs2").get_json()
+    assert body["playtime"] == {"appid": 730, "playtime_forever": 600}
+    assert body["stats"] == [{"name": "total_kills", "value": 42}]
+    assert len(client.get("/steam/user/1/games").get_json()["games"]) == 2
+    assert fake.calls["/IPlayerService/GetOwnedGames/v0001/"] == 1
+    assert fake.calls["/ISteamUserStats/GetUserStatsForGame/v0002/"] == 1
+
+
+def test_batch_profiles_use_the_cache_and_chunk_by_100(steam_api):
+    module, fake = steam_api()
+    client = module.app.test_client()
+    client.get("/steam/user/0")
+    steamids = [str(i) for i in range(150)] + ["missing1"]
+    body = client.post("/steam/users", json={"steamids": steamids + ["0"]}).get_json()
+    assert len(body["players"]) == 150
+    assert body["not_found"] == ["missing1"]
+    assert sorted(len(batch) for batch in fake.summary_batches[1:]) == [50, 100]  # "0" was cached
+    # Single lookups now hit the entries the batch stored, including the miss
+    assert client.get("/steam/user/149").status_code == 200
+    assert client.get("/steam/user/missing1").status_code == 404
+    assert len(fake.summary_batches) == 3
+
+
+def test_single_lookups_are_micro_batched(steam_api):
+    module, fake = steam_api(STEAM_PROFILE_BATCH_WINDOW_MS="50")
+    client = module.app.test_client()
+    statuses = []
+    threads = [threading.Thread(target=lambda i=i: statuses.append(client.get(f"/steam/user/{i}").status_code))
+               for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert statuses == [200] * 10
+    assert len(fake.summary_batches) < 10
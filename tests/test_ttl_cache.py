@@ -0,0 +1,175 @@
+import threading
+import time
+
+import pytest
+
+from cache import CachedError, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class NotFound(Exception):
+    status = 404
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_fresh_hit_does_not_fetch():
+    cache = TTLCache(clock=Clock())
+    calls = []
+    assert cache.get_or_fetch("k", 10, lambda: calls.append(1) or "v") == "v"
+    assert cache.get_or_fetch("k", 10, lambda: calls.append(1) or "other") == "v"
+    assert len(calls) == 1
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_stale_value_is_served_while_refreshing():
+    clock = Clock()
+    cache = TTLCache(stale_seconds=30, clock=clock)
+    cache.get_or_fetch("k", 10, lambda: "old")
+    clock.now += 15  # expired, inside the stale window
+
+    release = threading.Event()
+
+    def slow_fetch():
+        release.wait(2)
+        return "new"
+
+    assert cache.get_or_fetch("k", 10, slow_fetch) == "old"
+    assert cache.get_or_fetch("k", 10, slow_fetch) == "old"
+    assert cache.stats["stale_hits"] == 2
+    release.set()
+    wait_for(lambda: cache.stats["refreshes"] == 1)
+    assert cache.get_or_fetch("k", 10, lambda: "unused") == "new"
+
+
+def test_failed_refresh_keeps_stale_value():
+    clock = Clock()
+    cache = TTLCache(stale_seconds=30, clock=clock)
+    cache.get_or_fetch("k", 10, lambda: "old")
+    clock.now += 15
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    assert cache.get_or_fetch("k", 10, failing) == "old"
+    wait_for(lambda: cache.stats["refresh_errors"] == 1)
+    assert cache.get_or_fetch("k", 10, failing) == "old"
+
+
+def test_past_stale_window_fetches_again():
+    clock = Clock()
+    cache = TTLCache(stale_seconds=30, clock=clock)
+    cache.get_or_fetch("k", 10, lambda: "old")
+    clock.now += 41
+    assert cache.get_or_fetch("k", 10, lambda: "new") == "new"
+    assert cache.stats["stale_hits"] == 0
+
+
+def test_negative_entries_are_cached_for_negative_ttl():
+    clock = Clock()
+    cache = TTLCache(negative_ttl=5, clock=clock)
+    calls = []
+
+    def missing():
+        calls.append(1)
+        raise NotFound("no such player")
+
+    for _ in range(2):
+        with pytest.raises(CachedError) as e:
+            cache.get_or_fetch("k", 60, missing, negative=(NotFound,))
+        assert e.value.status == 404
+    assert len(calls) == 1
+    assert cache.stats["negative_hits"] == 1
+
+    clock.now += 6
+    assert cache.get_or_fetch("k", 60, lambda: "found", negative=(NotFound,)) == "found"
+
+
+def test_other_errors_are_not_cached():
+    cache = TTLCache(clock=Clock())
+
+    def broken():
+        raise RuntimeError("timeout")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", 60, broken, negative=(NotFound,))
+    assert cache.get_or_fetch("k", 60, lambda: "v", negative=(NotFound,)) == "v"
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return "v"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", 60, fetch)))
+    first.start()
+    started.wait(2)
+    others = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", 60, fetch)))
+              for _ in range(4)]
+    for t in others:
+        t.start()
+    wait_for(lambda: cache.stats["coalesced"] == 4)
+    release.set()
+    for t in [first, *others]:
+        t.join(2)
+    assert results == ["v"] * 5
+    assert len(calls) == 1
+
+
+def test_coalesced_waiters_see_the_fetch_error():
+    cache = TTLCache()
+    started, release = threading.Event(), threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(2)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_fetch("k", 60, fetch)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    first = threading.Thread(target=call)
+    first.start()
+    started.wait(2)
+    second = threading.Thread(target=call)
+    second.start()
+    wait_for(lambda: cache.stats["coalesced"] == 1)
+    release.set()
+    first.join(2)
+    second.join(2)
+    assert errors == ["boom", "boom"]
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, clock=Clock())
+    cache.put("a", 1, 60)
+    cache.put("b", 2, 60)
+    assert cache.peek("a") == (True, 1)
+    cache.put("c", 3, 60)
+    assert cache.peek("b") == (False, None)
+    assert cache.peek("a") == (True, 1)
+    assert cache.stats["evictions"] == 1